@@ -2,34 +2,93 @@
 import uasyncio as asyncio
 from machine import UART, Pin
 import utime
-import collections
-from status_codes import get_imd_state, get_vifc_state
+from telemetry import TelemetryRecord
+from rs485_framer import (
+    RingFramer, calculate_checksum, PACKET_LENGTH, START_BYTE, END_BYTE, RX_RING_SIZE
+)
 
 # --- Konstanten ---
 DEBUG_LEVEL = 1
-PACKET_LENGTH = 17
-START_BYTE = 0xAA
-END_BYTE = 0x55
 RS485_BAUDRATE = 115200
-UART_READ_TIMEOUT_MS = 10
+UART_READ_TIMEOUT_MS = 0           # Non-blocking: the StreamReader waits for data, not the UART
 DATA_BUFFER_MAX_SIZE = 10
 
-def calculate_checksum(data):
-    checksum = 0
-    for byte in data:
-        checksum ^= byte
-    return checksum
+
+class TelemetryQueue:
+    """
+    Bounded handoff between the RS485 receiver and the telemetry consumer.
+    Holds a fixed pool of preallocated TelemetryRecord slots used as a ring:
+    the producer fills reserve() in place and calls commit(), the consumer
+    takes get_nowait() – a returned record stays valid until the next await.
+    Drop policy: keep latest – when full, the oldest frame is discarded and counted.
+    The consumer sleeps on an asyncio.Event that the producer sets per frame.
+    No lock needed: both sides run in the same uasyncio loop and never await
+    while touching the ring.
+    """
+
+    def __init__(self, size=DATA_BUFFER_MAX_SIZE):
+        self.size = size
+        self._slots = [TelemetryRecord() for _ in range(size)]
+        self._head = 0
+        self._count = 0
+        self._event = asyncio.Event()
+        self.pushed = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._count
+
+    def reserve(self):
+        """Slot for the next frame; drops the oldest queued frame if full."""
+        if self._count == self.size:
+            self._head = (self._head + 1) % self.size
+            self._count -= 1
+            self.dropped += 1
+        return self._slots[(self._head + self._count) % self.size]
+
+    def commit(self):
+        """Publish the slot returned by the last reserve()."""
+        self._count += 1
+        self.pushed += 1
+        self._event.set()
+
+    def get_nowait(self):
+        """Oldest queued record, or None if empty."""
+        if not self._count:
+            return None
+        rec = self._slots[self._head]
+        self._head = (self._head + 1) % self.size
+        self._count -= 1
+        return rec
+
+    async def wait(self):
+        """Wait until at least one record is queued."""
+        while not self._count:
+            self._event.clear()
+            await self._event.wait()
+        self._event.clear()
+
+    def snapshot(self):
+        return [self._slots[(self._head + i) % self.size] for i in range(self._count)]
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
 
 class CanBusController:
     def __init__(self, shared_data):
         self.shared_data = shared_data
-        self.data_buffer = collections.deque([], DATA_BUFFER_MAX_SIZE)
+        self.data_buffer = TelemetryQueue(DATA_BUFFER_MAX_SIZE)
         self.rs485_error_count = 0
         self.last_data_receive_time = 0
+        self.framer = RingFramer(RX_RING_SIZE)
+        self.alloc = None               # memory.AllocBudget: bytes per received chunk (test mode)
 
         try:
             self.uart = UART(0, baudrate=RS485_BAUDRATE, tx=Pin(0), rx=Pin(1),
-                           bits=8, parity=None, stop=1, timeout=UART_READ_TIMEOUT_MS)
+                           bits=8, parity=None, stop=1,
+                           timeout=UART_READ_TIMEOUT_MS, timeout_char=UART_READ_TIMEOUT_MS)
             self.shared_data.debug_print("UART initialisiert (async)", level=1)
         except Exception as e:
             self.uart = None
@@ -40,68 +99,44 @@ class CanBusController:
         asyncio.create_task(self._receiver_task())
 
     async def _receiver_task(self):
-        buffer = bytearray()
+        """Sleeps in the poller until the UART is readable – no busy polling."""
+        framer = self.framer
+        reader = asyncio.StreamReader(self.uart)
         while True:
-            if self.uart.any():
-                buffer.extend(self.uart.read())
-            
-            while len(buffer) >= 17 and buffer[0] == 0xAA:
-                packet = buffer[:17]
-                if packet[-1] != 0x55:
-                    break
-                if packet[15] != calculate_checksum(packet[1:15]):
-                    break
-                
-                data = self._parse_packet(packet)
-                if data:
-                    if len(self.data_buffer) == DATA_BUFFER_MAX_SIZE:
-                        self.data_buffer.popleft()
-                    self.data_buffer.append(data)
+            try:
+                region = framer.write_region()
+                if region is None:
+                    # Ring full of undecodable bytes → start over
+                    framer.reset()
+                    continue
+                n = await reader.readinto(region)
+                alloc = self.alloc
+                if alloc is not None:
+                    alloc.start()
+                framer.commit(n)
+
+                while True:
+                    packet = framer.next_frame()
+                    if packet is None:
+                        break
+                    self._parse_packet(packet, self.data_buffer.reserve())
+                    self.data_buffer.commit()
                     self.last_data_receive_time = utime.ticks_ms()
-                
-                buffer = buffer[17:]
-                continue
-                
-            buffer = buffer[1:] if buffer and buffer[0] != 0xAA else buffer
-            await asyncio.sleep_ms(1)
+                if alloc is not None:
+                    alloc.stop()
 
             except Exception as e:
                 self.shared_data.debug_print(f"ERROR in receiver_task: {e}", level=0)
                 self.rs485_error_count += 1
+                framer.reset()
                 await asyncio.sleep_ms(10)
 
-    def _parse_packet(self, packet):
-        try:
-            motor_rpm = (packet[1] << 8) | packet[2]
-            motor_temp = int.from_bytes(packet[3:4], 'big', signed=True)
-            mcu_temp = int.from_bytes(packet[4:5], 'big', signed=True)
-            mcu_flags = (packet[5] << 8) | packet[6]
-            mcu_fault = packet[7]
-            imd_iso_r = (packet[8] << 8) | packet[9]
-            imd_status = (packet[10] << 8) | packet[11]
-            vifc_status = (packet[12] << 8) | packet[13]
-            valid_byte = packet[14]
-
-            return {
-                'type': 'telemetry',
-                'motorRPM': motor_rpm,
-                'motorTemp': motor_temp,
-                'mcuTemp': mcu_temp,
-                'mcuFlags': mcu_flags,
-                'mcuFaultLevel': mcu_fault,
-                'imdIsoR': imd_iso_r,
-                'imdState': get_imd_state(imd_status),
-                'vifcStatus': get_vifc_state(vifc_status),
-                'motorDataValid': bool(valid_byte & 0x02),
-                'imdDataValid': bool(valid_byte & 0x01),
-                'selfTestFailed': bool(valid_byte & 0x80)
-            }
-        except Exception as e:
-            self.shared_data.debug_print(f"ERROR parse: {e}", level=0)
-            return None
+    def _parse_packet(self, packet, record):
+        """Decode a validated frame in place into a preallocated TelemetryRecord."""
+        return record.unpack(packet)
 
     def get_data_buffer(self):
-        return list(self.data_buffer)
+        return self.data_buffer.snapshot()
 
     def clear_data_buffer(self):
-        self.data_buffer.clear()
\ No newline at end of file
+        self.data_buffer.clear()
\ No newline at end of file
@@ -0,0 +1,138 @@
+# debuglog.py
+# Level-gated binary event log: check first, format later (or never)
+# Hot paths call
+#     if debuglog.level >= 2: debuglog.event(2, debuglog.ODO_TARGET, a, b, c)
+# → below the level nothing is evaluated. event() stores (ticks_ms, id, level,
+# 4 int args) into a preallocated ring (no allocation); the text is only built
+# when the event is echoed to the REPL or decoded on the host
+# (tools/log_decode.py, same MESSAGES table).
+#
+# REPL:  import debuglog; debuglog.dump()      (hex records, capture + decode)
+#        debuglog.save("/data/log.bin")         (binary file, fetch + decode)
+
+from array import array
+from micropython import const
+import utime
+
+RING_SIZE = const(128)     # Records (power of two)
+_RING_MASK = const(RING_SIZE - 1)
+NARGS = const(4)
+RECORD_FORMAT = "<IHBxllll"  # ticks_ms, id, level, pad, 4 args
+RECORD_SIZE = const(24)
+DUMP_VERSION = 1
+
+# --- Thresholds (main.py sets them from LOG_LEVEL / DEBUG_LEVEL) ---
+level = 2                  # Events up to this level go into the ring
+echo = 1                   # ... and up to this level are also printed (formatted)
+
+# --- Message catalogue: id → format (args are ints; units in the text) ---
+ODO_FULL = const(1)
+ODO_DIRTY = const(2)
+CENTRAL_ROW = const(3)
+RND_GEAR = const(4)
+SHOW_FULL = const(5)
+ODO_TARGET = const(6)
+SPEED = const(7)
+RPM_OUT = const(8)
+TEMP_TARGET = const(9)
+FONT_MISSING = const(10)
+BOOT_TIME = const(11)
+
+MESSAGES = {
+    ODO_FULL: "Odometer: full screen update",
+    ODO_DIRTY: "Odometer: dirty rect ({}, {})-({}, {})",
+    CENTRAL_ROW: "Central: top row updated ({}, {})-({}, {})",
+    RND_GEAR: "RND: gear updated, dirty rect ({}, {})-({}, {})",
+    SHOW_FULL: "show() → full pages {}-{}, cols {}-{}",
+    ODO_TARGET: "Odometer: {} x0.1 km/h → {} steps (at {})",
+    SPEED: "Speed: {} x0.1 km/h, +{} mm",
+    RPM_OUT: "RPM output: {} → {} x0.1 % duty",
+    TEMP_TARGET: "Temp gauge → {} °C ({} steps)",
+    FONT_MISSING: "Font: no glyph for char code {}",
+    BOOT_TIME: "Boot: main.py at {} ms, modules loaded {} ms, first show {} ms, displays ready {} ms",
+}
+
+# --- Ring ---
+_ticks = array('L', [0] * RING_SIZE)
+_ids = array('H', [0] * RING_SIZE)
+_levels = array('B', [0] * RING_SIZE)
+_args = array('l', [0] * (RING_SIZE * NARGS))
+_head = 0
+written = 0                # Total events (written - RING_SIZE = overwritten)
+
+
+def configure(log_level, echo_level):
+    global level, echo
+    level = log_level
+    echo = echo_level if echo_level < log_level else log_level
+
+
+def event(lvl, msg, a=0, b=0, c=0, d=0):
+    """Record one event (ints only). Callers check `level` first on hot paths."""
+    global _head, written
+    if lvl > level:
+        return
+    i = _head
+    _ticks[i] = utime.ticks_ms()
+    _ids[i] = msg
+    _levels[i] = lvl
+    j = i * NARGS
+    _args[j] = a
+    _args[j + 1] = b
+    _args[j + 2] = c
+    _args[j + 3] = d
+    _head = (i + 1) & _RING_MASK
+    written += 1
+    if lvl <= echo:
+        print(f"DEBUG: {format_event(msg, a, b, c, d)}")
+
+
+def format_event(msg, a=0, b=0, c=0, d=0):
+    fmt = MESSAGES.get(msg)
+    if fmt is None:
+        return f"event {msg}: {a} {b} {c} {d}"
+    return fmt.format(a, b, c, d)
+
+
+def clear():
+    global _head, written
+    _head = 0
+    written = 0
+
+
+def records():
+    """Binary records, oldest first (allocates; for dump/save only)."""
+    import struct
+    n = written if written < RING_SIZE else RING_SIZE
+    start = (_head - n) & _RING_MASK
+    out = bytearray()
+    for k in range(n):
+        i = (start + k) & _RING_MASK
+        j = i * NARGS
+        out += struct.pack(RECORD_FORMAT, _ticks[i], _ids[i], _levels[i],
+                           _args[j], _args[j + 1], _args[j + 2], _args[j + 3])
+    return out
+
+
+def dump(out=None):
+    """Hex dump of the ring (print if out is None, else out.write)."""
+    def emit(line):
+        if out is None:
+            print(line)
+        else:
+            out.write(line + "\r\n")
+
+    from binascii import hexlify
+    data = records()
+    emit(f"#LOG v{DUMP_VERSION} records={len(data) // RECORD_SIZE} written={written} t={utime.ticks_ms()}")
+    for k in range(0, len(data), RECORD_SIZE):
+        emit(hexlify(data[k:k + RECORD_SIZE]).decode())
+    emit("#END")
+
+
+def save(path):
+    """Write the ring as a binary file (header line + records)."""
+    data = records()
+    with open(path, "wb") as f:
+        f.write(f"#LOGBIN v{DUMP_VERSION} records={len(data) // RECORD_SIZE} written={written}\n".encode())
+        f.write(data)
@@ -0,0 +1,162 @@
+# display_flush.py
+# Chunked, cooperative display flush for the SSD1306 panels
+# A plain show() keeps the event loop busy for the whole transfer (several ms
+# on the SoftI2C panels). FlushScheduler sends the changed windows one by one
+# (SSD1306.show_async) and yields between them; a window that would still be on
+# the bus when the pointer tick is due is held back until block1 has run, so
+# pointer and stepper work keep their period.
+# Panels on one bus share the bus lock (i2c_bus.Bus); a flush requested while
+# the same panel is still waiting for the bus is merged into the waiting one.
+# Per-panel stats: flushes, windows, bytes, deferrals, coalesced requests,
+# latency, longest chunk (+ allocations per chunk via memory.attach_tasks)
+
+import uasyncio as asyncio
+import utime
+
+# --- Bus timing estimate ---
+BITS_PER_BYTE = 9          # 8 data bits + ACK
+WINDOW_OVERHEAD_US = 150   # Window command transaction + call overhead
+GUARD_US = 1000            # Keep this much free in front of the pointer tick
+MAX_DEFER_MS = 100         # Upper bound for holding one window back (no starvation)
+
+
+class PanelFlush:
+    """Flush state and stats of one panel (one transfer per bus at a time)."""
+    __slots__ = ('name', 'panel', 'sched', 'lock', 'us_per_byte16', 'pause',
+                 'waiting', 'x0', 'y0', 'x1', 'y1', 'full',
+                 'count', 'windows', 'bytes', 'deferrals', 'coalesced',
+                 'last_us', 'max_us', 'total_us', 'max_chunk_us', '_chunk_start', 'alloc')
+
+    def __init__(self, sched, name, panel, freq, lock=None):
+        self.name = name
+        self.panel = panel
+        self.sched = sched
+        self.lock = lock or asyncio.Lock()
+        # Rect of the flush waiting for the bus (merged while waiting)
+        self.waiting = False
+        self.x0 = self.y0 = self.x1 = self.y1 = 0
+        self.full = False
+        self.us_per_byte16 = (BITS_PER_BYTE * 16_000_000) // freq   # 1/16 µs per byte
+        self.pause = self._pause                                     # Bound once
+        self.count = 0
+        self.windows = 0
+        self.bytes = 0
+        self.deferrals = 0
+        self.coalesced = 0
+        self.last_us = 0
+        self.max_us = 0
+        self.total_us = 0
+        self.max_chunk_us = 0
+        self._chunk_start = None
+        self.alloc = None                  # memory.AllocBudget: bytes per window sent (test mode)
+
+    async def _pause(self, nbytes):
+        """Called by show_async() before each window: yield, defer near the pointer tick."""
+        self._end_chunk()
+        await asyncio.sleep_ms(0)          # Ready tasks (an overdue pointer tick) run first
+        chunk_us = ((nbytes * self.us_per_byte16) >> 4) + WINDOW_OVERHEAD_US
+        waited = 0
+        while waited < MAX_DEFER_MS:
+            left = self.sched.time_to_tick_us()
+            if left <= 0 or left > chunk_us + GUARD_US:
+                break
+            self.deferrals += 1
+            ms = left // 1000 + 1
+            await asyncio.sleep_ms(ms)
+            waited += ms
+        self.windows += 1
+        self._chunk_start = utime.ticks_us()
+        if self.alloc is not None:
+            self.alloc.start()
+
+    def _end_chunk(self):
+        if self._chunk_start is not None:
+            t = utime.ticks_diff(utime.ticks_us(), self._chunk_start)
+            if t > self.max_chunk_us:
+                self.max_chunk_us = t
+            self._chunk_start = None
+            if self.alloc is not None:
+                self.alloc.stop()
+
+    def reset_stats(self):
+        self.count = self.windows = self.bytes = self.deferrals = self.coalesced = 0
+        self.last_us = self.max_us = self.total_us = self.max_chunk_us = 0
+
+
+class FlushScheduler:
+    """
+    Owns the flushes of all panels. block1 calls pointer_tick() after each
+    pointer update; flush() then avoids putting a window on the bus across the
+    next tick. Panels not registered with add() are flushed synchronously.
+    """
+
+    def __init__(self, pointer_period_ms=50, debug_print=None):
+        self.pointer_period_us = pointer_period_ms * 1000
+        self.debug_print = debug_print or (lambda *args, **kwargs: None)
+        self.panels = {}                   # panel → PanelFlush
+        self._next_tick_us = None
+
+    def add(self, name, panel, freq=400_000, lock=None):
+        """Register a panel; panels on one bus pass the same lock (Bus.lock)."""
+        if panel is None:
+            return None
+        pf = PanelFlush(self, name, panel, freq, lock)
+        self.panels[panel] = pf
+        return pf
+
+    def pointer_tick(self):
+        """Pointer work done; the next tick is one period from now."""
+        self._next_tick_us = utime.ticks_add(utime.ticks_us(), self.pointer_period_us)
+
+    def time_to_tick_us(self):
+        if self._next_tick_us is None:
+            return 0
+        return utime.ticks_diff(self._next_tick_us, utime.ticks_us())
+
+    async def flush(self, panel, x0=0, y0=0, x1=None, y1=None, full=False):
+        """
+        show() the panel in chunks. Returns the pixel bytes sent (0 if the
+        request was merged into a flush of the same panel waiting for the bus).
+        """
+        pf = self.panels.get(panel)
+        if pf is None:
+            return panel.show(x0, y0, x1, y1, full)
+        if x1 is None: x1 = panel.width - 1
+        if y1 is None: y1 = panel.height - 1
+        if pf.waiting:
+            # Coalesce: the waiting flush diffs the union rect
+            if x0 < pf.x0: pf.x0 = x0
+            if y0 < pf.y0: pf.y0 = y0
+            if x1 > pf.x1: pf.x1 = x1
+            if y1 > pf.y1: pf.y1 = y1
+            pf.full = pf.full or full
+            pf.coalesced += 1
+            return 0
+        pf.waiting = True
+        pf.x0, pf.y0, pf.x1, pf.y1, pf.full = x0, y0, x1, y1, full
+        start = utime.ticks_us()
+        async with pf.lock:                # One transfer per bus (driver scan state per panel)
+            pf.waiting = False
+            try:
+                sent = await panel.show_async(pf.pause, pf.x0, pf.y0, pf.x1, pf.y1, pf.full)
+            finally:
+                pf._end_chunk()
+        t = utime.ticks_diff(utime.ticks_us(), start)
+        pf.count += 1
+        pf.bytes += sent
+        pf.last_us = t
+        pf.total_us += t
+        if t > pf.max_us:
+            pf.max_us = t
+        return sent
+
+    def report(self, level=2, reset=False):
+        """Per-panel latency summary via debug_print."""
+        for pf in self.panels.values():
+            mean = pf.total_us // pf.count if pf.count else 0
+            self.debug_print(f"Flush {pf.name}: n={pf.count} win={pf.windows} {pf.bytes} B "
+                             f"lat last={pf.last_us} mean={mean} max={pf.max_us} us "
+                             f"chunk max={pf.max_chunk_us} us defer={pf.deferrals} "
+                             f"merged={pf.coalesced}", level=level)
+            if reset:
+                pf.reset_stats()
@@ -5,11 +5,14 @@
 
 import utime
 import myfont
+import debuglog
+import distance
 
 # --- Global Display Objects (set in main.py) ---
 central = None
 rnd = None
 odometer = None
+flusher = None   # display_flush.FlushScheduler (set in main.py); None → plain show()
 
 # --- Display Dimensions ---
 central_width = 128
@@ -35,14 +38,45 @@ R_ISO_ERROR = 250
 # --- Central Subtext: Permanent labels (drawn once) ---
 _subtext_drawn = False  # Local flag: ensures subtext is drawn only once
 
+# --- Last drawn text boxes (cleared area must be sent even if the new text is shorter) ---
+_odo_last_box = None
+_central_last_box = None
+_rnd_last_box = None
+
+
+# === Dirty-Rect helpers ===
+def _union(a, b):
+    """Bounding box (x0, y0, x1, y1) covering both boxes; either may be None."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (a[0] if a[0] < b[0] else b[0], a[1] if a[1] < b[1] else b[1],
+            a[2] if a[2] > b[2] else b[2], a[3] if a[3] > b[3] else b[3])
+
+
+def _text(fb, text, x, y, width, height):
+    """Built-in 8x8 text; returns its dirty box like myfont.draw_12x16_font()."""
+    fb.text(text, x, y)
+    x1 = x + 8 * len(text) - 1
+    y1 = y + 7
+    return (x, y, x1 if x1 < width else width - 1, y1 if y1 < height else height - 1)
+
+
+async def _show(panel, x0=0, y0=0, x1=None, y1=None):
+    """show() through the flush scheduler (chunked, yields) if there is one."""
+    if flusher is not None:
+        return await flusher.flush(panel, x0, y0, x1, y1)
+    return panel.show(x0, y0, x1, y1)
+
 
 # === ODOMETER DISPLAY ===
 async def update_odometer_display(shared_data):
     """
     Update the Odometer display (128x32) with speed, total km, trip, or temp source.
-    Uses Dirty-Rect to update only the changed text region (y=8 to y=23).
+    Uses Dirty-Rect to update only the boxes the renderer reports as touched.
     """
-    global odometer
+    global odometer, _odo_last_box
     if odometer is None:
         shared_data.debug_print("ERROR: Odometer display object is None", level=0)
         return
@@ -55,13 +89,12 @@ async def update_odometer_display(shared_data):
 
     # --- 2. Prepare data strings ---
     speed_str = f"{shared_data.digital_speed:>3}"
-    km_str = f"{int(shared_data.total_km):06d}"
+    km_str = f"{distance.whole_km(shared_data.total_pulses):06d}"
 
     # --- 3. Mode handling ---
     mode = shared_data.current_display_mode
     char_changed = False
-    dirty_x0, dirty_y0 = 128, 32  # Start with invalid rect
-    dirty_x1, dirty_y1 = 0, 0
+    drawn = None  # Box of the text drawn in this update
 
     # Force full redraw on mode change
     if mode != shared_data.last_displayed_mode:
@@ -73,56 +106,54 @@ async def update_odometer_display(shared_data):
             if shared_data.odo_dirty_flag or speed_str != shared_data.last_displayed_speed_str:
                 char_changed = True
                 odometer.fill_rect(0, 8, 128, 16, 0)  # Clear middle row
-                myfont.draw_12x16_font(odometer, speed_str, 52, 8, odo_width, odo_height, shared_data.debug_print)
-                odometer.text("km/h", 94, 17)
+                drawn = myfont.draw_12x16_font(odometer, speed_str, 52, 8, odo_width, odo_height, shared_data.debug_print)
+                drawn = _union(drawn, _text(odometer, "km/h", 94, 17, odo_width, odo_height))
                 shared_data.last_displayed_speed_str = speed_str
-                dirty_x0, dirty_x1 = 52, 127  # From speed digits to end of "km/h"
-                dirty_y0, dirty_y1 = 8, 23
 
         elif mode == DISPLAY_MODE_TOTAL:
             if shared_data.odo_dirty_flag or km_str != shared_data.last_displayed_km_str:
                 char_changed = True
                 odometer.fill_rect(0, 8, 128, 16, 0)
-                myfont.draw_12x16_font(odometer, km_str, 16, 8, odo_width, odo_height, shared_data.debug_print)
-                odometer.text("km", 94, 17)
+                drawn = myfont.draw_12x16_font(odometer, km_str, 16, 8, odo_width, odo_height, shared_data.debug_print)
+                drawn = _union(drawn, _text(odometer, "km", 94, 17, odo_width, odo_height))
                 shared_data.last_displayed_km_str = km_str
-                dirty_x0, dirty_x1 = 16, 115  # From km digits to end of "km"
-                dirty_y0, dirty_y1 = 8, 23
 
         elif mode == DISPLAY_MODE_TRIP:
-            trip_val = shared_data.trip_km
-            trip_str = f"{trip_val:.1f}" if trip_val >= 1000 else f"{trip_val:05.1f}"
+            trip_km, trip_tenth = divmod(distance.tenths_km(shared_data.trip_pulses), 10)
+            trip_str = f"{trip_km}.{trip_tenth}" if trip_km >= 1000 else f"{trip_km:03d}.{trip_tenth}"
             if shared_data.odo_dirty_flag or trip_str != shared_data.last_displayed_trip_str:
                 char_changed = True
                 odometer.fill_rect(0, 8, 128, 16, 0)
-                myfont.draw_12x16_font(odometer, trip_str, 28, 8, odo_width, odo_height, shared_data.debug_print)
-                odometer.text("km", 94, 17)
+                drawn = myfont.draw_12x16_font(odometer, trip_str, 28, 8, odo_width, odo_height, shared_data.debug_print)
+                drawn = _union(drawn, _text(odometer, "km", 94, 17, odo_width, odo_height))
                 shared_data.last_displayed_trip_str = trip_str
-                dirty_x0, dirty_x1 = 28, 115
-                dirty_y0, dirty_y1 = 8, 23
 
         elif mode == DISPLAY_MODE_TEMP:
             source_changed = (shared_data.temp_show != shared_data.last_displayed_temp_source)
             if shared_data.odo_dirty_flag or source_changed:
                 temp_source_str = "MOTOR" if shared_data.temp_show == 1 else "MCU"
                 odometer.fill_rect(0, 8, 128, 16, 0)
-                myfont.draw_12x16_font(odometer, temp_source_str, 40, 8, odo_width, odo_height, shared_data.debug_print)
+                drawn = myfont.draw_12x16_font(odometer, temp_source_str, 40, 8, odo_width, odo_height, shared_data.debug_print)
                 shared_data.last_displayed_temp_source = shared_data.temp_show
                 char_changed = True
-                dirty_x0, dirty_x1 = 40, 100
-                dirty_y0, dirty_y1 = 8, 23
 
         # --- 4. Show only if changed, using Dirty-Rect ---
-        if shared_data.odo_dirty_flag or char_changed:
+        # New text box plus the previous one (its pixels were just cleared)
+        dirty = _union(drawn, _odo_last_box) if char_changed else None
+        if char_changed:
+            _odo_last_box = drawn
+        if shared_data.odo_dirty_flag or dirty is not None:
             try:
                 if shared_data.odo_dirty_flag:
                     # Full screen redraw (e.g., contrast or mode change)
-                    odometer.show()
-                    shared_data.debug_print("Odometer: full screen update", level=2)
+                    await _show(odometer)
+                    if debuglog.level >= 2:
+                        debuglog.event(2, debuglog.ODO_FULL)
                 else:
                     # Only update the text region
-                    odometer.show(x0=dirty_x0, y0=dirty_y0, x1=dirty_x1, y1=dirty_y1)
-                    shared_data.debug_print(f"Odometer: dirty rect ({dirty_x0},{dirty_y0},{dirty_x1},{dirty_y1})", level=3)
+                    await _show(odometer, dirty[0], dirty[1], dirty[2], dirty[3])
+                    if debuglog.level >= 3:
+                        debuglog.event(3, debuglog.ODO_DIRTY, dirty[0], dirty[1], dirty[2], dirty[3])
                 shared_data.odo_dirty_flag = False
             except OSError as e:
                 shared_data.debug_print(f"ERROR: I2C error in odometer.show(): {e}", level=0)
@@ -139,7 +170,7 @@ async def update_central_display(shared_data):
     Subtext ("MOTOR", "MCU", "ISO-R") is drawn once and preserved.
     Only the top row (y=0–15) is updated → no flicker.
     """
-    global central, _subtext_drawn
+    global central, _subtext_drawn, _central_last_box
     if central is None:
         return
 
@@ -166,7 +197,7 @@ async def update_central_display(shared_data):
             shared_data.central_init_step = 2
             shared_data.central_dirty_flag = True
         elif shared_data.central_init_step == 2:
-            central.show()
+            await _show(central)
             shared_data.central_init_step = 0
             shared_data.central_dirty_flag = False
         return
@@ -186,7 +217,7 @@ async def update_central_display(shared_data):
         _subtext_drawn = True
         # Show bottom row once
         try:
-            central.show(x0=0, y0=16, x1=127, y1=31)
+            await _show(central, 0, 16, 127, 31)
             shared_data.debug_print("Central: subtext drawn permanently", level=2)
         except OSError as e:
             shared_data.debug_print(f"ERROR: I2C error in central subtext show(): {e}", level=0)
@@ -210,21 +241,25 @@ async def update_central_display(shared_data):
         central.fill_rect(0, 0, 128, 16, 0)  # Clear top row only
 
         motor_text = f"{motor_temp:>2d}C" if motor_valid else "--C"
-        myfont.draw_12x16_font(central, motor_text, 0, 0, central_width, central_height, shared_data.debug_print)
+        drawn = myfont.draw_12x16_font(central, motor_text, 0, 0, central_width, central_height, shared_data.debug_print)
         shared_data.last_displayed_motor_temp = motor_temp
 
         mcu_text = f"{mcu_temp:>2d}C" if motor_valid else "--C"
-        myfont.draw_12x16_font(central, mcu_text, 44, 0, central_width, central_height, shared_data.debug_print)
+        drawn = _union(drawn, myfont.draw_12x16_font(central, mcu_text, 44, 0, central_width, central_height, shared_data.debug_print))
         shared_data.last_displayed_mcu_temp = mcu_temp
 
         iso_text = f"{imd_iso_r // 1000:>2d}M" if imd_valid else "--M"
-        myfont.draw_12x16_font(central, iso_text, 93, 0, central_width, central_height, shared_data.debug_print)
+        drawn = _union(drawn, myfont.draw_12x16_font(central, iso_text, 93, 0, central_width, central_height, shared_data.debug_print))
         shared_data.last_displayed_imd_iso_r = imd_iso_r
 
-        # Show only top row
+        # Show only the touched part of the top row
+        dirty = _union(drawn, _central_last_box)
+        _central_last_box = drawn
         try:
-            central.show(x0=0, y0=0, x1=127, y1=15)
-            shared_data.debug_print("Central: top row updated", level=2)
+            if dirty is not None:
+                await _show(central, dirty[0], dirty[1], dirty[2], dirty[3])
+                if debuglog.level >= 2:
+                    debuglog.event(2, debuglog.CENTRAL_ROW, dirty[0], dirty[1], dirty[2], dirty[3])
         except OSError as e:
             shared_data.debug_print(f"ERROR: I2C error in central.show(): {e}", level=0)
 
@@ -238,7 +273,7 @@ async def update_rnd_display(shared_data):
     Uses Dirty-Rect to update only the 12x16 character region.
     Inverted background when in Reverse.
     """
-    global rnd
+    global rnd, _rnd_last_box
     if rnd is None:
         return
 
@@ -265,14 +300,18 @@ async def update_rnd_display(shared_data):
     char_changed = (rnd_char != shared_data.rnd_last_displayed_char)
 
     if char_changed or shared_data.rnd_dirty_flag:
-        myfont.draw_12x16_font(rnd, rnd_char, 14, 8, rnd_width, rnd_height, shared_data.debug_print)
+        drawn = myfont.draw_12x16_font(rnd, rnd_char, 14, 8, rnd_width, rnd_height, shared_data.debug_print)
         shared_data.rnd_last_displayed_char = rnd_char
         shared_data.rnd_dirty_flag = False
 
         # Show only the 12x16 character region
+        dirty = _union(drawn, _rnd_last_box)
+        _rnd_last_box = drawn
         try:
-            rnd.show(x0=14, y0=8, x1=25, y1=23)
-            shared_data.debug_print("RND: gear updated (dirty rect)", level=2)
+            if dirty is not None:
+                await _show(rnd, dirty[0], dirty[1], dirty[2], dirty[3])
+                if debuglog.level >= 2:
+                    debuglog.event(2, debuglog.RND_GEAR, dirty[0], dirty[1], dirty[2], dirty[3])
         except OSError as e:
             shared_data.debug_print(f"ERROR: I2C error in rnd.show(): {e}", level=0)
             rnd = None
\ No newline at end of file
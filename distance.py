@@ -0,0 +1,30 @@
+# distance.py
+# Integer distance: wheel pulses end to end, mm/km only at the edges
+# The pulse counter adds whole pulses, SharedTelemetryData keeps total/trip as
+# pulse counts, store_km journals mm, display_manager formats km. Pulses stay
+# small ints (no heap) up to 2^30 pulses (~2 million km at 1884 mm); a float32
+# km total stops counting single pulses beyond ~32,768 km
+# (see tools/sim_odometer.py).
+
+# --- Configuration ---
+PULSES_PER_REVOLUTION = 1    # Adjust to your sensor
+WHEEL_CIRCUMFERENCE_MM = 1884  # e.g., 60 cm tire → 1884 mm
+MM_PER_KM = 1_000_000
+MM_PER_TENTH_KM = 100_000
+
+# --- Conversions (exact integer math; large totals become long ints, display/save only) ---
+def pulses_to_mm(pulses):
+    """Distance in mm (rounded down) of a pulse count."""
+    return pulses * WHEEL_CIRCUMFERENCE_MM // PULSES_PER_REVOLUTION
+
+def mm_to_pulses(mm):
+    """Nearest pulse count; mm_to_pulses(pulses_to_mm(p)) == p."""
+    return (mm * PULSES_PER_REVOLUTION + WHEEL_CIRCUMFERENCE_MM // 2) // WHEEL_CIRCUMFERENCE_MM
+
+def whole_km(pulses):
+    """Completed km (odometers round down)."""
+    return pulses_to_mm(pulses) // MM_PER_KM
+
+def tenths_km(pulses):
+    """Completed 0.1 km units (trip display)."""
+    return pulses_to_mm(pulses) // MM_PER_TENTH_KM
@@ -0,0 +1,191 @@
+# filters.py
+# Allocation-free signal filters for the gauge inputs (speed, RPM, temperatures)
+# Integer / fixed-point state only (small ints on the RP2040 → no heap objects
+# per sample); each channel = filter stages + deadband with hysteresis
+# Pure Python (no machine import) → also runs on the host (tools/bench_filters.py)
+
+from array import array
+
+try:
+    from micropython import const
+except ImportError:                # CPython host
+    def const(x):
+        return x
+
+FRAC_BITS = const(8)               # Fixed point: 1.0 == 256
+_HALF = const(1 << (FRAC_BITS - 1))
+
+# Inputs must stay below ~2**21 in magnitude so that gain * (value << FRAC_BITS)
+# fits a MicroPython small int (31 bit): RPM 12000, speed 2250 (0.1 km/h) are fine.
+
+# --- Channel configuration ---
+# name → (stages, deadband, zero_snap); stage = (kind, param)
+#   ('ema', shift)               alpha = 1 / 2**shift
+#   ('alphabeta', (alpha, beta)) gains in 1/256, one time step per sample
+#   ('median', n)                median of the last n samples (n odd)
+# zero_snap: a raw 0 is trusted (pulsecounter timeout) → output 0, history cleared
+# Units: speed 0.1 km/h, motorRPM rpm, temperatures °C
+CHANNEL_CONFIG = {
+    'speed': ((('alphabeta', (64, 8)),), 4, True),   # Pointer step = 0.47 km/h
+    'motorRPM': ((('median', 3), ('ema', 1)), 20, False),
+    'motorTemp': ((('median', 5),), 1, False),       # Gauge step = 0.42 °C
+    'mcuTemp': ((('median', 5),), 1, False),
+}
+
+
+class EmaFilter:
+    """Exponential moving average with alpha = 1 / 2**shift (shift 0 = pass-through)."""
+    __slots__ = ('shift', '_acc', '_primed')
+
+    def __init__(self, shift=2):
+        self.shift = shift
+        self._acc = 0
+        self._primed = False
+
+    def reset(self):
+        self._primed = False
+
+    def update(self, x):
+        if not self._primed:
+            self._acc = x << FRAC_BITS
+            self._primed = True
+            return x
+        self._acc += ((x << FRAC_BITS) - self._acc) >> self.shift
+        return (self._acc + _HALF) >> FRAC_BITS
+
+
+class AlphaBetaFilter:
+    """
+    Alpha-beta tracker (value + rate per sample), fixed-point gains in 1/256.
+    Follows ramps without the steady lag of an EMA of similar smoothing.
+    """
+    __slots__ = ('alpha', 'beta', '_x', '_v', '_primed')
+
+    def __init__(self, alpha=128, beta=32):
+        self.alpha = alpha
+        self.beta = beta
+        self._x = 0
+        self._v = 0
+        self._primed = False
+
+    def reset(self):
+        self._primed = False
+
+    def update(self, z):
+        if not self._primed:
+            self._x = z << FRAC_BITS
+            self._v = 0
+            self._primed = True
+            return z
+        xp = self._x + self._v
+        r = (z << FRAC_BITS) - xp
+        self._x = xp + ((self.alpha * r) >> FRAC_BITS)
+        self._v += (self.beta * r) >> FRAC_BITS
+        return (self._x + _HALF) >> FRAC_BITS
+
+
+class MedianFilter:
+    """
+    Median of the last n samples (n odd, small). Removes single-frame spikes.
+    Window ring and sort buffer are preallocated; insertion sort in place.
+    """
+    __slots__ = ('_ring', '_sorted', '_n', '_i', '_primed')
+
+    def __init__(self, n=5):
+        if n < 1 or not n & 1:
+            raise ValueError("Median window must be odd")
+        self._ring = array('i', [0] * n)
+        self._sorted = array('i', [0] * n)
+        self._n = n
+        self._i = 0
+        self._primed = False
+
+    def reset(self):
+        self._primed = False
+
+    def update(self, x):
+        ring = self._ring
+        n = self._n
+        if not self._primed:
+            for k in range(n):
+                ring[k] = x
+            self._i = 0
+            self._primed = True
+            return x
+        ring[self._i] = x
+        self._i = (self._i + 1) % n
+        s = self._sorted
+        for k in range(n):
+            v = ring[k]
+            j = k
+            while j and s[j - 1] > v:
+                s[j] = s[j - 1]
+                j -= 1
+            s[j] = v
+        return s[n >> 1]
+
+
+class FilterChannel:
+    """
+    One input channel: filter stages, then a deadband with hysteresis.
+    The output only moves when the filtered value leaves ±deadband around the
+    last output. With zero_snap a raw 0 parks the needle exactly at once.
+    `changes` counts output moves → a direct measure of stepper retargets.
+    """
+    __slots__ = ('name', 'stages', 'deadband', 'zero_snap', 'output', 'samples',
+                 'changes', '_primed')
+
+    def __init__(self, name, stages=(), deadband=0, zero_snap=False):
+        self.name = name
+        self.stages = stages
+        self.deadband = deadband
+        self.zero_snap = zero_snap
+        self.output = 0
+        self.samples = 0
+        self.changes = 0
+        self._primed = False
+
+    def reset(self):
+        """Forget the history (e.g. after invalid data); next sample passes through."""
+        for stage in self.stages:
+            stage.reset()
+        self._primed = False
+
+    def update(self, x):
+        self.samples += 1
+        if x == 0 and self.zero_snap:
+            self.reset()
+        else:
+            for stage in self.stages:
+                x = stage.update(x)
+        if not self._primed:
+            self._primed = True
+        else:
+            d = x - self.output
+            if -self.deadband <= d <= self.deadband:
+                return self.output
+        if x != self.output:
+            self.output = x
+            self.changes += 1
+        return x
+
+
+def make_stage(kind, param):
+    if kind == 'ema':
+        return EmaFilter(param)
+    if kind == 'alphabeta':
+        return AlphaBetaFilter(param[0], param[1])
+    if kind == 'median':
+        return MedianFilter(param)
+    raise ValueError(f"Unknown filter kind: {kind}")
+
+
+def make_channel(name, config=CHANNEL_CONFIG):
+    stages, deadband, zero_snap = config[name]
+    return FilterChannel(name, tuple(make_stage(kind, param) for kind, param in stages),
+                         deadband, zero_snap)
+
+
+def make_channels(config=CHANNEL_CONFIG):
+    """All configured channels as dict name → FilterChannel (built once at startup)."""
+    return {name: make_channel(name, config) for name in config}
@@ -0,0 +1,153 @@
+# i2c_bus.py
+# Bus manager for the display I2C buses
+# Creates one bus object per SCL/SDA pair: the RP2040 hardware controller
+# (I2C0/I2C1) when the pins allow it, SoftI2C otherwise. Several panels can
+# share a hardware bus via a TCA9548A mux (all SSD1306 sit at 0x3C) or via
+# different addresses (0x3C/0x3D strap). Each bus has one lock → transactions
+# and chunked flushes are serialized per bus (display_flush uses it).
+# Per-bus stats: transactions, bytes, errors, busy time, utilisation
+
+import uasyncio as asyncio
+import utime
+from machine import Pin, I2C, SoftI2C
+
+MUX_ADDR = 0x70            # TCA9548A default address
+
+
+def hw_i2c_id(scl, sda):
+    """RP2040 controller that can drive these GPIOs (0 or 1), or None."""
+    # I2C0: SDA = 4n, SCL = 4n+1; I2C1: SDA = 4n+2, SCL = 4n+3 (GPIO 0-29)
+    if not (0 <= scl <= 29 and 0 <= sda <= 29):
+        return None
+    if sda % 4 == 0 and scl % 4 == 1:
+        return 0
+    if sda % 4 == 2 and scl % 4 == 3:
+        return 1
+    return None
+
+
+class Bus:
+    """One physical bus (hardware or soft) plus its lock, mux state and stats."""
+
+    def __init__(self, name, i2c, hw, freq):
+        self.name = name
+        self.i2c = i2c
+        self.hw = hw
+        self.freq = freq
+        self.lock = asyncio.Lock()
+        self.mux_channel = -1          # Currently selected mux channel (-1: unknown)
+        self._mux_buf = bytearray(1)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.transactions = 0
+        self.bytes = 0
+        self.errors = 0
+        self.busy_us = 0
+        self.since = utime.ticks_us()
+
+    def select(self, channel):
+        """Route the bus through mux `channel` (one byte, only when it changes)."""
+        if channel == self.mux_channel:
+            return
+        self._mux_buf[0] = 1 << channel
+        self.mux_channel = -1
+        self.i2c.writeto(MUX_ADDR, self._mux_buf)
+        self.mux_channel = channel
+        self.transactions += 1
+        self.bytes += 2
+
+    def utilisation(self):
+        """Busy share since the last reset_stats(), in percent."""
+        elapsed = utime.ticks_diff(utime.ticks_us(), self.since)
+        return self.busy_us * 100 // elapsed if elapsed > 0 else 0
+
+
+class BusPort:
+    """
+    What a driver sees as its I2C object: writeto()/writevto() on a shared Bus,
+    optionally behind a mux channel, with byte/time accounting.
+    """
+
+    def __init__(self, bus, channel=None):
+        self.bus = bus
+        self.channel = channel
+
+    def writeto(self, addr, buf, stop=True):
+        bus = self.bus
+        start = utime.ticks_us()
+        try:
+            if self.channel is not None:
+                bus.select(self.channel)
+            return bus.i2c.writeto(addr, buf, stop)
+        except OSError:
+            bus.errors += 1
+            bus.mux_channel = -1
+            raise
+        finally:
+            bus.transactions += 1
+            bus.bytes += 1 + len(buf)
+            bus.busy_us += utime.ticks_diff(utime.ticks_us(), start)
+
+    def writevto(self, addr, vector, stop=True):
+        bus = self.bus
+        start = utime.ticks_us()
+        try:
+            if self.channel is not None:
+                bus.select(self.channel)
+            return bus.i2c.writevto(addr, vector, stop)
+        except OSError:
+            bus.errors += 1
+            bus.mux_channel = -1
+            raise
+        finally:
+            n = 1
+            for b in vector:
+                if b is not None:
+                    n += len(b)
+            bus.transactions += 1
+            bus.bytes += n
+            bus.busy_us += utime.ticks_diff(utime.ticks_us(), start)
+
+    def scan(self):
+        if self.channel is not None:
+            self.bus.select(self.channel)
+        return self.bus.i2c.scan()
+
+
+class BusManager:
+    """Creates and shares the buses; port() hands out per-device views."""
+
+    def __init__(self, debug_print=None):
+        self.debug_print = debug_print or (lambda *args, **kwargs: None)
+        self.buses = {}                # (scl, sda) → Bus
+        self._hw_used = set()
+
+    def bus(self, scl, sda, freq=400_000):
+        key = (scl, sda)
+        bus = self.buses.get(key)
+        if bus is not None:
+            return bus
+        hw_id = hw_i2c_id(scl, sda)
+        if hw_id is not None and hw_id not in self._hw_used:
+            i2c = I2C(hw_id, scl=Pin(scl), sda=Pin(sda), freq=freq)
+            self._hw_used.add(hw_id)
+            bus = Bus(f"I2C{hw_id}", i2c, True, freq)
+        else:
+            i2c = SoftI2C(scl=Pin(scl), sda=Pin(sda), freq=freq)
+            bus = Bus(f"Soft{scl}/{sda}", i2c, False, freq)
+            self.debug_print(f"I2C: SCL {scl}/SDA {sda} not on a free hardware controller "
+                             f"→ SoftI2C (CPU-driven)", level=1)
+        self.buses[key] = bus
+        return bus
+
+    def port(self, scl, sda, freq=400_000, mux_channel=None):
+        return BusPort(self.bus(scl, sda, freq), mux_channel)
+
+    def report(self, level=2, reset=False):
+        for bus in self.buses.values():
+            self.debug_print(f"Bus {bus.name}: {bus.transactions} tx {bus.bytes} B "
+                             f"busy {bus.busy_us // 1000} ms ({bus.utilisation()}%) "
+                             f"err={bus.errors}", level=level)
+            if reset:
+                bus.reset_stats()
@@ -1,9 +1,10 @@
 # main.py
 # Version 10.0 - Complete, English, async, store_km, debug_print
 
-import uasyncio as asyncio
-from machine import Pin, I2C, SoftI2C, WDT, reset
 import utime
+BOOT_START_MS = utime.ticks_ms()   # Reset → here: firmware init + boot.py (ticks_ms starts at reset)
+import uasyncio as asyncio
+from machine import WDT, reset
 import micropython
 import gc
 
@@ -14,15 +15,32 @@ from status_codes import (
     get_rnd_status, get_mcu_state, get_imd_state, get_vifc_state
 )
 from temp import TempGauge, TEMP_MIN
+from telemetry import (
+    validate_telemetry_data, publish_telemetry, VALID_MOTOR, VALID_IMD,
+    R_ISO_MAX, R_ISO_WARNING
+)
 import store_km
+import persist
+import powerfail
+import filters
 import rpm2
 import pulsecounter
+import distance
 import odometer_motor
 import button_controller
 import display_manager
+import display_flush
+import i2c_bus
+import scheduler
+import profiler
+import memory
+import debuglog
+import myfont
 from display_manager import (
     DISPLAY_MODE_SPEED, DISPLAY_MODE_TOTAL, DISPLAY_MODE_TRIP, DISPLAY_MODE_TEMP
 )
+import ssd1306
+MODULES_LOADED_MS = utime.ticks_ms()   # Compiled from source or loaded as .mpy/frozen (tools/build_mpy.py)
 
 # --- Global Instances ---
 odometer = None
@@ -31,38 +49,69 @@ rnd = None
 can_controller = None
 watchdog = None
 temp_gauge = None
+flusher = None
+buses = None
+saver = None
+power_monitor = None
+collector = None
 
 # --- Constants ---
 STATUS_UPDATE_PERIOD_MS = 200
 DISPLAY_UPDATE_PERIOD_MS = 1000
 RND_UPDATE_PERIOD_MS = 1000
 POINTER_UPDATE_PERIOD_MS = 50
+POINTER_DEADLINE_MS = 20   # Pointer job must finish within 20 ms of its release
+CAN_DEADLINE_MS = 20       # Frame queued → published
+BUTTON_POLL_PERIOD_MS = 10
+SAVE_CHECK_PERIOD_MS = 500
+TIMEOUT_CHECK_PERIOD_MS = 1000
+GC_CHECK_PERIOD_MS = 10000      # Allocation rate → collection step and gc.threshold (memory.py)
+GC_SLOT_DEADLINE_MS = 30        # Collection after the pointer tick, done before the next one
+WATCHDOG_FEED_PERIOD_MS = 1000
+SPEED_FILTER_SCALE = 10    # Speed filter channel works in 0.1 km/h (integers)
 TEMP_GAUGE_UPDATE_PERIOD_MS = 1000
 DATA_TIMEOUT_MS = 4000
 WATCHDOG_TIMEOUT_MS = 5000
 
-DEBUG_LEVEL = 1
-
-R_ISO_MAX = 50000          # Used in validation and default telemetry
-R_ISO_WARNING = 400        # TODO: Implement warning threshold (e.g., flash, icon)
+STATS_REPORT_PERIOD_MS = 60000   # Job, display flush and bus stats (debug level 2)
+
+# --- Display wiring: (SCL, SDA, I2C freq, mux channel or None), all panels at 0x3C ---
+# i2c_bus uses the hardware controller when the pins allow it (I2C0: SDA 4n,
+# SCL 4n+1; I2C1: SDA 4n+2, SCL 4n+3), SoftI2C otherwise. Central and RND are
+# not on hardware pin pairs yet; to take them off the CPU either
+#   - move them to I2C0 (e.g. SCL 17 / SDA 16, RND strapped to 0x3D), or
+#   - put all three behind a TCA9548A on I2C1: (7, 6, 400000, 0/1/2)
+ODOMETER_I2C = (7, 6, 400000, None)     # I2C1
+CENTRAL_I2C = (22, 21, 400000, None)    # SoftI2C
+RND_I2C = (24, 23, 400000, None)        # SoftI2C
+
+POWER_MONITOR = True       # 12 V rail on ADC2 (powerfail.py): last-gasp odometer save
+PROFILE = False            # Latency histograms (profiler.py), dumped with the stats
+ALLOC_BUDGET = False       # Test mode: fail jobs/tasks that allocate in steady state (memory.py)
+ALLOC_BUDGETS = {          # Job/task name → bytes per run allowed in that mode (default 0)
+    "stats": 16384,        # Report text (DEBUG_LEVEL 2) and profiler dump (PROFILE)
+}
+
+DEBUG_LEVEL = 1            # Text messages (debug_print) and echo of binary events
+LOG_LEVEL = 2              # Binary event ring (debuglog.py), decode with tools/log_decode.py
+
+# R_ISO_MAX, R_ISO_WARNING: see telemetry.py
+# TODO: Implement warning threshold R_ISO_WARNING (e.g., flash, icon)
 R_ISO_ERROR = 250          # TODO: Implement error threshold (e.g., shutdown, alert)
 
 # --- Shared Data ---
 class SharedTelemetryData:
     def __init__(self):
         # General
-        self.last_gc_time = utime.ticks_ms()
         self.last_debug_output_time = 0
         self.current_contrast = 255
         self.rs485_error_count = 0
+        self.rs485_dropped_frames = 0
 
         # Pointer & sensors
         self.last_pointer_update_time = utime.ticks_ms()
-        self.last_critical_update_time = utime.ticks_ms()
-        self.last_temp_gauge_update_time = utime.ticks_ms()
 
         # Odometer display
-        self.last_odometer_display_update_time = utime.ticks_ms()
         self.current_display_mode = DISPLAY_MODE_SPEED
         self.temp_show = 1  # 1 = MOTOR, 0 = MCU
         self.odo_last_contrast = -1
@@ -74,11 +123,13 @@ class SharedTelemetryData:
         self.last_displayed_mode = None
         self.digital_speed = 0
         self.speed = 0.0
-        self.total_km = 0.0
-        self.trip_km = 0.0
+        self.total_pulses = 0   # Wheel pulses (distance.py) – ints, km only for display
+        self.trip_pulses = 0
+
+        # Input filters (filters.CHANNEL_CONFIG): speed, motorRPM, motorTemp, mcuTemp
+        self.filters = filters.make_channels()
 
         # RND display
-        self.last_rnd_update_time = utime.ticks_ms()
         self.rnd_last_contrast = -1
         self.rnd_dirty_flag = False
         self.rnd_last_invert_state = -1
@@ -86,7 +137,6 @@ class SharedTelemetryData:
         self.current_rnd_status_char = ' '
 
         # Central display
-        self.last_central_display_update_time = utime.ticks_ms()
         self.central_boot_active = True
         self.central_ok_start_time = utime.ticks_ms()
         self.central_dirty_flag = False
@@ -95,17 +145,10 @@ class SharedTelemetryData:
         self.central_init_step = 0
         self.central_status_stack = []
         self.central_display_index = 0
-        self.central_last_cycle_time = utime.ticks_ms()
         self.last_displayed_motor_temp = -999
         self.last_displayed_mcu_temp = -999
         self.last_displayed_imd_iso_r = -999
 
-        # Odometer saving
-        self.last_speed = 0.0
-        self.last_save_time = 0
-        self.stop_start_time = None
-        self.odometer_saved_in_stop = False
-
         # Data validation
         self.last_valid_data_time = utime.ticks_ms()
         self.last_valid_motor_time = utime.ticks_ms()
@@ -116,7 +159,10 @@ class SharedTelemetryData:
             'mcuFlags': 0,
             'mcuFaultLevel': 0,
             'imdIsoR': R_ISO_MAX,
-            'imdState': "IMD NDT",
+            'imdStatusRaw': 0,
+            'vifcStatusRaw': 0,
+            'mcuStatus': "MCU NDT",
+            'imdStatus': "IMD NDT",
             'vifcStatus': "VI NDT",
             'motorTemp': 0,
             'mcuTemp': 0,
@@ -133,10 +179,15 @@ class SharedTelemetryData:
 
 # --- Init Displays ---
 def init_displays(shared_data):
-    global odometer, central, rnd
+    global odometer, central, rnd, flusher, buses
+    try:
+        myfont.get_font('small', shared_data.debug_print)  # Build + validate glyph cache once
+    except Exception as e:
+        shared_data.debug_print(f"ERROR: Font init failed: {e}", level=0)
+
+    buses = i2c_bus.BusManager(shared_data.debug_print)
     try:
-        i2c1 = I2C(1, scl=Pin(7), sda=Pin(6), freq=400000)
-        odometer = SSD1306_I2C(128, 32, i2c1, addr=0x3c)
+        odometer = SSD1306_I2C(128, 32, buses.port(*ODOMETER_I2C), addr=0x3c)
         odometer.rotate(0)
         display_manager.odometer = odometer
         shared_data.debug_print("Odometer display initialized.")
@@ -144,8 +195,7 @@ def init_displays(shared_data):
         shared_data.debug_print(f"ERROR: Odometer display init failed: {e}", level=0)
 
     try:
-        i2c2 = SoftI2C(scl=Pin(22), sda=Pin(21), freq=400000)
-        central = SSD1306_I2C(128, 32, i2c2, addr=0x3c)
+        central = SSD1306_I2C(128, 32, buses.port(*CENTRAL_I2C), addr=0x3c)
         central.rotate(0)
         display_manager.central = central
         shared_data.debug_print("Central display initialized.")        
@@ -153,14 +203,21 @@ def init_displays(shared_data):
         shared_data.debug_print(f"ERROR: Central display init failed: {e}", level=0)
 
     try:
-        i2c3 = SoftI2C(scl=Pin(24), sda=Pin(23), freq=400000)
-        rnd = SSD1306_I2C(64, 32, i2c3, addr=0x3c)
+        rnd = SSD1306_I2C(64, 32, buses.port(*RND_I2C), addr=0x3c)
         rnd.rotate(0)
         display_manager.rnd = rnd
         shared_data.debug_print("RND display initialized.")
     except Exception as e:
         shared_data.debug_print(f"ERROR: RND display init failed: {e}", level=0)
 
+    # Chunked flushes: displays yield to the pointer tick between windows,
+    # panels sharing a bus are serialized by its lock
+    flusher = display_flush.FlushScheduler(POINTER_UPDATE_PERIOD_MS, shared_data.debug_print)
+    for name, panel in (("odometer", odometer), ("central", central), ("rnd", rnd)):
+        if panel:
+            flusher.add(name, panel, panel.i2c.bus.freq, panel.i2c.bus.lock)
+    display_manager.flusher = flusher
+
 # --- Init Hardware ---
 def init_hardware(shared_data):
     global can_controller, temp_gauge, watchdog
@@ -206,294 +263,296 @@ def init_hardware(shared_data):
     except Exception as e:
         shared_data.debug_print(f"ERROR: Watchdog init failed: {e}", level=0)
 
-# --- Validate Telemetry ---
-def validate_telemetry_data(data):
-    if not data or data.get('type') != 'telemetry':
-        return False
-    motor_valid = data.get('motorDataValid', False)
-    imd_valid = data.get('imdDataValid', False)
-    if not (motor_valid or imd_valid):
-        return False
-    if motor_valid:
-        if not (0 <= data.get('motorRPM', 0) < 12000):
-            return False
-        if not (-40 <= data.get('motorTemp', 0) <= 150):
-            return False
-        if not (-40 <= data.get('mcuTemp', 0) <= 150):
-            return False
-    if imd_valid:
-        if not (0 <= data.get('imdIsoR', 0) < R_ISO_MAX):
-            return False
-    return True
+# --- Init Memory (last: every hot-path buffer exists by now) ---
+def init_memory(shared_data):
+    global collector
+    try:
+        collector = memory.Collector(lambda: not odometer_motor.moving(), ALLOC_BUDGET, shared_data.debug_print)
+        collector.startup()
+    except Exception as e:
+        collector = None
+        shared_data.debug_print(f"ERROR: Memory manager init failed: {e}", level=0)
+
+# --- Power Fail ---
+def power_fail_shed():
+    """Loads dropped first on power fail: stepper coils, tach output, OLEDs."""
+    shed = [odometer_motor.halt, rpm2.off]
+    if temp_gauge:
+        shed.append(temp_gauge.halt)
+    for panel in (odometer, central, rnd):
+        if panel:
+            shed.append(panel.poweroff)
+    return shed
 
 # --- Main Async Loop ---
 async def main_loop_logic(shared_data):
+    # Job bodies run once per release; scheduler.py does the timing (absolute
+    # releases, priorities, deadlines) and keeps per-job stats.
+    global saver, power_monitor
+    saver = persist.OdometerSaver(shared_data, flusher, shared_data.debug_print)
+
+    # Supply monitor: timer callback, preempts the jobs; brown-out recovery → clean reboot
+    if POWER_MONITOR:
+        try:
+            power_monitor = powerfail.PowerMonitor(power_fail_shed(), saver.final, reset,
+                                                   debug_print=shared_data.debug_print)
+            power_monitor.start()
+        except Exception as e:
+            power_monitor = None
+            shared_data.debug_print(f"ERROR: Power monitor init failed: {e}", level=0)
 
     # BLOCK 1: Critical sensors & pointers
-    async def block1_task():
-        while True:
-            current_time = utime.ticks_ms()
-            if utime.ticks_diff(current_time, shared_data.last_critical_update_time) >= POINTER_UPDATE_PERIOD_MS:
-                try:
-                    raw_speed, distance_increment = await pulsecounter.calculate_speed_and_distance(shared_data)
-                    shared_data.speed = raw_speed
-                    shared_data.digital_speed = int(round(raw_speed))
-                    shared_data.total_km += distance_increment
-                    shared_data.trip_km += distance_increment
-                except Exception as e:
-                    shared_data.debug_print(f"ERROR in pulse counter: {e}", level=1)
-
-                try:
-                    odometer_motor.odometer_pointer(shared_data.speed, shared_data.debug_print)
-                except Exception as e:
-                    shared_data.debug_print(f"ERROR in odometer motor: {e}", level=1)
-
-                try:
-                    system_status = shared_data.internal_telemetry_data.get('systemStatus', 'UNKNOWN')
-                    motor_data_valid = shared_data.internal_telemetry_data.get('motorDataValid', False)
-                    current_rpm = shared_data.internal_telemetry_data.get('motorRPM', 0) if system_status == 'OK' and motor_data_valid else 0
-                    rpm2.set_rpm_output(current_rpm, debug_func=shared_data.debug_print)
-                except Exception as e:
-                    shared_data.debug_print(f"ERROR in RPM output: {e}", level=1)
-
-                shared_data.last_critical_update_time = current_time
-            await asyncio.sleep_ms(POINTER_UPDATE_PERIOD_MS)
+    async def block1_job():
+        try:
+            raw_speed, pulses = await pulsecounter.calculate_speed_and_distance(shared_data)
+            speed_filter = shared_data.filters['speed']
+            speed = speed_filter.update(int(raw_speed * SPEED_FILTER_SCALE)) / SPEED_FILTER_SCALE
+            shared_data.speed = speed
+            shared_data.digital_speed = int(round(speed))
+            shared_data.total_pulses += pulses
+            shared_data.trip_pulses += pulses
+        except Exception as e:
+            shared_data.debug_print(f"ERROR in pulse counter: {e}", level=1)
+
+        try:
+            odometer_motor.odometer_pointer(shared_data.speed, shared_data.debug_print)
+        except Exception as e:
+            shared_data.debug_print(f"ERROR in odometer motor: {e}", level=1)
+
+        try:
+            system_status = shared_data.internal_telemetry_data.get('systemStatus', 'UNKNOWN')
+            motor_data_valid = shared_data.internal_telemetry_data.get('motorDataValid', False)
+            current_rpm = shared_data.internal_telemetry_data.get('motorRPM', 0) if system_status == 'OK' and motor_data_valid else 0
+            rpm2.set_rpm_output(current_rpm, debug_func=shared_data.debug_print)
+        except Exception as e:
+            shared_data.debug_print(f"ERROR in RPM output: {e}", level=1)
+
+        if flusher:
+            flusher.pointer_tick()
+        if collector:
+            collector.pointer_tick()
 
     # BLOCK 2: Odometer display
-    async def block2_task():
-        while True:
-            current_time = utime.ticks_ms()
-            if utime.ticks_diff(current_time, shared_data.last_odometer_display_update_time) >= DISPLAY_UPDATE_PERIOD_MS:
-                try:
-                    await display_manager.update_odometer_display(shared_data)
-                    shared_data.last_odometer_display_update_time = current_time
-                except Exception as e:
-                    shared_data.debug_print(f"ERROR in odometer display: {e}", level=0)
-            await asyncio.sleep_ms(DISPLAY_UPDATE_PERIOD_MS)
-
-    # BLOCK 3: Central display
-    async def block3_task():
-        while True:
-            current_time = utime.ticks_ms()
-            if utime.ticks_diff(current_time, shared_data.central_last_cycle_time) >= 1000:
-                stack_len = len(shared_data.central_status_stack)
-                if stack_len > 0:
-                    new_index = (shared_data.central_display_index + 1) % (stack_len + 1)
-                    if new_index != shared_data.central_display_index:
-                        shared_data.central_display_index = new_index
-                        shared_data.central_dirty_flag = True
-                else:
-                    if shared_data.central_display_index != 0:
-                        shared_data.central_display_index = 0
-                        shared_data.central_dirty_flag = True
-                shared_data.central_last_cycle_time = current_time
-
-            if utime.ticks_diff(current_time, shared_data.last_central_display_update_time) >= DISPLAY_UPDATE_PERIOD_MS or shared_data.central_dirty_flag:
-                try:
-                    await display_manager.update_central_display(shared_data)
-                    shared_data.last_central_display_update_time = current_time
-                except Exception as e:
-                    shared_data.debug_print(f"ERROR in central display: {e}", level=0)
-            await asyncio.sleep_ms(DISPLAY_UPDATE_PERIOD_MS)
+    async def block2_job():
+        try:
+            await display_manager.update_odometer_display(shared_data)
+        except Exception as e:
+            shared_data.debug_print(f"ERROR in odometer display: {e}", level=0)
+
+    # BLOCK 3: Central display (status stack cycles once per period)
+    async def block3_job():
+        stack_len = len(shared_data.central_status_stack)
+        if stack_len > 0:
+            new_index = (shared_data.central_display_index + 1) % (stack_len + 1)
+            if new_index != shared_data.central_display_index:
+                shared_data.central_display_index = new_index
+                shared_data.central_dirty_flag = True
+        else:
+            if shared_data.central_display_index != 0:
+                shared_data.central_display_index = 0
+                shared_data.central_dirty_flag = True
+
+        try:
+            await display_manager.update_central_display(shared_data)
+        except Exception as e:
+            shared_data.debug_print(f"ERROR in central display: {e}", level=0)
 
     # BLOCK RND: RND display
-    async def block_rnd_task():
-        while True:
-            current_time = utime.ticks_ms()
-            if utime.ticks_diff(current_time, shared_data.last_rnd_update_time) >= RND_UPDATE_PERIOD_MS:
-                try:
-                    await display_manager.update_rnd_display(shared_data)
-                    shared_data.last_rnd_update_time = current_time
-                except Exception as e:
-                    shared_data.debug_print(f"ERROR in RND display: {e}", level=0)
-            await asyncio.sleep_ms(RND_UPDATE_PERIOD_MS)
-
-    # BLOCK STATUS: Derive status strings
-    async def block_status_task():
-        while True:
-            await asyncio.sleep_ms(STATUS_UPDATE_PERIOD_MS)
-            telemetry = shared_data.internal_telemetry_data
-            mcu_flags = telemetry.get('mcuFlags', 0)
-            imd_raw = telemetry.get('imdStatusRaw', 0)
-            vifc_raw = telemetry.get('vifcStatusRaw', 0)
-
-            new_mcu = get_mcu_state(mcu_flags)
-            new_imd = get_imd_state(imd_raw)
-            new_vifc = get_vifc_state(vifc_raw)
-
-            if (telemetry.get('mcuStatus') != new_mcu or
-                telemetry.get('imdStatus') != new_imd or
-                telemetry.get('vifcStatus') != new_vifc):
-
-                telemetry['mcuStatus'] = new_mcu
-                telemetry['imdStatus'] = new_imd
-                telemetry['vifcStatus'] = new_vifc
-
-                new_stack = []
-                if "OK" not in new_mcu and "NDT" not in new_mcu: new_stack.append(new_mcu)
-                if "OK" not in new_imd and "NDT" not in new_imd: new_stack.append(new_imd)
-                if "OK" not in new_vifc and "NDT" not in new_vifc: new_stack.append(new_vifc)
-
-                if new_stack != shared_data.central_status_stack:
-                    shared_data.central_status_stack = new_stack
-                    shared_data.central_display_index = 0
-                    shared_data.central_dirty_flag = True
-
-                shared_data.current_rnd_status_char = get_rnd_status(mcu_flags)
-                shared_data.rnd_dirty_flag = True
-
-    # BLOCK 5: CAN processing
-    async def block5_task():
-        while True:
-            current_time = utime.ticks_ms()
-            if can_controller and len(can_controller.data_buffer) > 0:
-                try:
-                    if can_controller.data_buffer_lock.acquire(timeout=5000):
-                        last_valid = None
-                        processed = 0
-                        while can_controller.data_buffer and processed < 10:
-                            data = can_controller.data_buffer.popleft()
-                            processed += 1
-                            if validate_telemetry_data(data):
-                                last_valid = data
-                        if last_valid and last_valid.get('type') == 'telemetry':
-                            t = shared_data.internal_telemetry_data
-                            get = last_valid.get
-                            motor_valid = get('motorDataValid', False)
-                            imd_valid = get('imdDataValid', False)
-                            t['motorRPM'] = get('motorRPM', 0) if motor_valid else 0
-                            t['motorTemp'] = get('motorTemp', 0) if motor_valid else 0
-                            t['mcuTemp'] = get('mcuTemp', 0) if motor_valid else 0
-                            t['mcuFlags'] = get('mcuFlags', 0) if motor_valid else 0
-                            t['mcuFaultLevel'] = get('mcuFaultLevel', 0) if motor_valid else 0
-                            t['imdIsoR'] = get('imdIsoR', 0) if imd_valid else 0
-                            t['imdState'] = get('imdState', "IMD NDT") if imd_valid else "IMD NDT"
-                            t['vifcStatus'] = get('vifcStatus', 0) if imd_valid else 0
-                            t['motorDataValid'] = motor_valid
-                            t['imdDataValid'] = imd_valid
-                            is_ok = (motor_valid or imd_valid) and get('imdIsoR', R_ISO_MAX) >= R_ISO_WARNING
-                            t['systemStatus'] = 'OK' if is_ok else 'ISO_ERROR'
-                            shared_data.last_valid_motor_time = current_time if motor_valid else shared_data.last_valid_motor_time
-                            shared_data.last_valid_imd_time = current_time if imd_valid else shared_data.last_valid_imd_time
-                            shared_data.last_valid_data_time = current_time
-                finally:
-                    can_controller.data_buffer_lock.release()
-            await asyncio.sleep_ms(100)
-
-    # BLOCK 6: Odometer saving (only when stopped)
-    async def block6_task():
-        while True:
-            current_time_us = utime.ticks_us()
-            if shared_data.speed == 0:
-                if shared_data.last_speed != 0:
-                    shared_data.stop_start_time = current_time_us
-                    shared_data.odometer_saved_in_stop = False
-                    shared_data.debug_print("Vehicle stopped – save timer started.", level=2)
-                elif (shared_data.stop_start_time and
-                      utime.ticks_diff(current_time_us, shared_data.stop_start_time) > 2_000_000 and
-                      not shared_data.odometer_saved_in_stop):
-                    try:
-                        store_km.save_odometer(shared_data.total_km, shared_data.trip_km, shared_data.debug_print)
-                        shared_data.odometer_saved_in_stop = True
-                        shared_data.stop_start_time = None
-                        shared_data.last_save_time = current_time_us
-                        shared_data.debug_print("Odometer saved during stop.", level=1)
-                    except Exception as e:
-                        shared_data.debug_print(f"ERROR saving odometer: {e}", level=0)
-            else:
-                shared_data.stop_start_time = None
-                shared_data.odometer_saved_in_stop = False
-            shared_data.last_speed = shared_data.speed
-            await asyncio.sleep_ms(500)
+    async def block_rnd_job():
+        try:
+            await display_manager.update_rnd_display(shared_data)
+        except Exception as e:
+            shared_data.debug_print(f"ERROR in RND display: {e}", level=0)
+
+    # BLOCK STATUS: Derive status strings (only when a raw status word changed)
+    telemetry = shared_data.internal_telemetry_data
+    last_status = [-1, -1, -1]             # mcuFlags, imdStatusRaw, vifcStatusRaw
+
+    async def block_status_job():
+        mcu_flags = telemetry['mcuFlags']
+        imd_raw = telemetry['imdStatusRaw']
+        vifc_raw = telemetry['vifcStatusRaw']
+        if mcu_flags == last_status[0] and imd_raw == last_status[1] and vifc_raw == last_status[2]:
+            return
+        last_status[0], last_status[1], last_status[2] = mcu_flags, imd_raw, vifc_raw
+
+        new_mcu = get_mcu_state(mcu_flags)
+        new_imd = get_imd_state(imd_raw)
+        new_vifc = get_vifc_state(vifc_raw)
+
+        if (telemetry['mcuStatus'] != new_mcu or
+            telemetry['imdStatus'] != new_imd or
+            telemetry['vifcStatus'] != new_vifc):
+
+            telemetry['mcuStatus'] = new_mcu
+            telemetry['imdStatus'] = new_imd
+            telemetry['vifcStatus'] = new_vifc
+
+            new_stack = []
+            if "OK" not in new_mcu and "NDT" not in new_mcu: new_stack.append(new_mcu)
+            if "OK" not in new_imd and "NDT" not in new_imd: new_stack.append(new_imd)
+            if "OK" not in new_vifc and "NDT" not in new_vifc: new_stack.append(new_vifc)
+
+            if new_stack != shared_data.central_status_stack:
+                shared_data.central_status_stack = new_stack
+                shared_data.central_display_index = 0
+                shared_data.central_dirty_flag = True
+
+            shared_data.current_rnd_status_char = get_rnd_status(mcu_flags)
+            shared_data.rnd_dirty_flag = True
+
+    # BLOCK 5: CAN processing (sporadic: released as soon as a frame is queued)
+    async def block5_job():
+        queue = can_controller.data_buffer
+        t = shared_data.internal_telemetry_data
+        current_time = utime.ticks_ms()
+        try:
+            last_valid = None
+            rec = queue.get_nowait()
+            while rec is not None:
+                if validate_telemetry_data(rec):
+                    last_valid = rec
+                rec = queue.get_nowait()
+            if last_valid is not None:
+                publish_telemetry(last_valid, t)
+                # Filter stage: gauges and displays only see smoothed values
+                f = shared_data.filters
+                if last_valid.valid & VALID_MOTOR:
+                    t['motorRPM'] = f['motorRPM'].update(t['motorRPM'])
+                    t['motorTemp'] = f['motorTemp'].update(t['motorTemp'])
+                    t['mcuTemp'] = f['mcuTemp'].update(t['mcuTemp'])
+                    shared_data.last_valid_motor_time = current_time
+                else:
+                    f['motorRPM'].reset()
+                    f['motorTemp'].reset()
+                    f['mcuTemp'].reset()
+                if last_valid.valid & VALID_IMD:
+                    shared_data.last_valid_imd_time = current_time
+                shared_data.last_valid_data_time = current_time
+        except Exception as e:
+            shared_data.debug_print(f"ERROR in CAN processing: {e}", level=0)
+        if queue.dropped != shared_data.rs485_dropped_frames:
+            shared_data.rs485_dropped_frames = queue.dropped
+            shared_data.debug_print(f"RS485: {queue.dropped} frames dropped (queue full)", level=2)
+
+    # BLOCK 6: Odometer saving (persist.py: stop, distance/time while driving, budget, slot)
+    async def block6_job():
+        await saver.check()
 
     # BLOCK 7: Button handling
-    async def block7_task():
-        while True:
-            action = button_controller.get_button_action_and_clear()
-            if action == "long":
-                if shared_data.current_display_mode == DISPLAY_MODE_SPEED:
-                    try:
-                        odometer_motor.odometer_pointer_zero(shared_data.debug_print)
-                        shared_data.debug_print("Odometer pointer zeroed.")
-                    except Exception as e:
-                        shared_data.debug_print(f"ERROR zeroing pointer: {e}")
-                elif shared_data.current_display_mode == DISPLAY_MODE_TRIP:
-                    shared_data.trip_km = 0.0
-                    store_km.save_odometer(shared_data.total_km, shared_data.trip_km, shared_data.debug_print)
-                    shared_data.debug_print("Trip reset and saved.")
-                elif shared_data.current_display_mode == DISPLAY_MODE_TOTAL:
-                    shared_data.current_contrast = 42 if shared_data.current_contrast == 255 else 255
-                    shared_data.debug_print("Contrast toggled.")
-                elif shared_data.current_display_mode == DISPLAY_MODE_TEMP:
-                    shared_data.temp_show = 1 - shared_data.temp_show
-                    shared_data.debug_print(f"Temp source: {'MOTOR' if shared_data.temp_show == 1 else 'MCU'}")
-            elif action == "short":
-                shared_data.current_display_mode = (shared_data.current_display_mode + 1) % 4
-                shared_data.debug_print(f"Mode changed to {shared_data.current_display_mode}")
-                await display_manager.update_odometer_display(shared_data)
-            await asyncio.sleep_ms(10)
+    async def block7_job():
+        action = button_controller.get_button_action_and_clear()
+        if action == "long":
+            if shared_data.current_display_mode == DISPLAY_MODE_SPEED:
+                try:
+                    odometer_motor.odometer_pointer_zero(shared_data.debug_print)
+                    shared_data.debug_print("Odometer pointer zeroed.")
+                except Exception as e:
+                    shared_data.debug_print(f"ERROR zeroing pointer: {e}")
+            elif shared_data.current_display_mode == DISPLAY_MODE_TRIP:
+                shared_data.trip_pulses = 0
+                saver.request()
+                shared_data.debug_print("Trip reset (saved at the next check).")
+            elif shared_data.current_display_mode == DISPLAY_MODE_TOTAL:
+                shared_data.current_contrast = 42 if shared_data.current_contrast == 255 else 255
+                shared_data.debug_print("Contrast toggled.")
+            elif shared_data.current_display_mode == DISPLAY_MODE_TEMP:
+                shared_data.temp_show = 1 - shared_data.temp_show
+                shared_data.debug_print(f"Temp source: {'MOTOR' if shared_data.temp_show == 1 else 'MCU'}")
+        elif action == "short":
+            shared_data.current_display_mode = (shared_data.current_display_mode + 1) % 4
+            shared_data.debug_print(f"Mode changed to {shared_data.current_display_mode}")
+            await display_manager.update_odometer_display(shared_data)
 
     # BLOCK 8: Temp gauge
-    async def block8_task():
-        while True:
-            current_time = utime.ticks_ms()
-            if utime.ticks_diff(current_time, shared_data.last_temp_gauge_update_time) >= TEMP_GAUGE_UPDATE_PERIOD_MS:
-                temp = shared_data.internal_telemetry_data.get('motorTemp' if shared_data.temp_show == 1 else 'mcuTemp', TEMP_MIN)
-                if temp_gauge:
-                    try:
-                        await temp_gauge.update(temp)
-                        shared_data.last_temp_gauge_update_time = current_time
-                    except Exception as e:
-                        shared_data.debug_print(f"ERROR in temp gauge: {e}", level=0)
-            await asyncio.sleep_ms(TEMP_GAUGE_UPDATE_PERIOD_MS)
-
-    # BLOCK 9a: GC
-    async def block9a_task():
-        while True:
-            if utime.ticks_diff(utime.ticks_ms(), shared_data.last_gc_time) >= 10000:
-                if gc.mem_free() < 30720:
-                    shared_data.debug_print(f"Low memory: {gc.mem_free()} bytes. Running GC.")
-                    gc.collect()
-                shared_data.last_gc_time = utime.ticks_ms()
-            await asyncio.sleep_ms(10000)
+    async def block8_job():
+        temp = shared_data.internal_telemetry_data.get('motorTemp' if shared_data.temp_show == 1 else 'mcuTemp', TEMP_MIN)
+        if temp_gauge:
+            try:
+                await temp_gauge.update(temp)
+            except Exception as e:
+                shared_data.debug_print(f"ERROR in temp gauge: {e}", level=0)
+
+    # BLOCK 9a: GC in the idle slot after the pointer tick (released by collector.pointer_tick)
+    async def block9a_job():
+        collector.collect_in_slot()
+
+    # BLOCK 9d: Allocation rate → collection step and threshold
+    async def block9d_job():
+        if collector:
+            collector.tune()
+        elif gc.mem_free() < 30720:
+            shared_data.debug_print(f"Low memory: {gc.mem_free()} bytes. Running GC.")
+            gc.collect()
 
     # BLOCK 9b: Timeout check
-    async def block9b_task():
-        while True:
-            current_time = utime.ticks_ms()
-            if utime.ticks_diff(current_time, shared_data.last_valid_motor_time) > DATA_TIMEOUT_MS:
-                shared_data.internal_telemetry_data['motorDataValid'] = False
-            if utime.ticks_diff(current_time, shared_data.last_valid_imd_time) > DATA_TIMEOUT_MS:
-                shared_data.internal_telemetry_data['imdDataValid'] = False
-            if utime.ticks_diff(current_time, shared_data.last_valid_data_time) > DATA_TIMEOUT_MS:
-                shared_data.internal_telemetry_data['systemStatus'] = 'NO_DATA_TIMEOUT'
-            await asyncio.sleep_ms(1000)
-
-    # Watchdog task
-    async def watchdog_task():
-        while True:
-            if watchdog:
-                watchdog.feed()
-            await asyncio.sleep_ms(1000)
-
-    # Start all tasks
-    loop = asyncio.get_event_loop()
-    loop.create_task(block1_task())
-    loop.create_task(block2_task())
-    loop.create_task(block3_task())
-    loop.create_task(block_rnd_task())
-    loop.create_task(block_status_task())
-    loop.create_task(block5_task())
-    loop.create_task(block6_task())
-    loop.create_task(block7_task())
-    loop.create_task(block8_task())
-    loop.create_task(block9a_task())
-    loop.create_task(block9b_task())
-    loop.create_task(watchdog_task())
-    loop.run_forever()
+    async def block9b_job():
+        current_time = utime.ticks_ms()
+        if utime.ticks_diff(current_time, shared_data.last_valid_motor_time) > DATA_TIMEOUT_MS:
+            shared_data.internal_telemetry_data['motorDataValid'] = False
+        if utime.ticks_diff(current_time, shared_data.last_valid_imd_time) > DATA_TIMEOUT_MS:
+            shared_data.internal_telemetry_data['imdDataValid'] = False
+        if utime.ticks_diff(current_time, shared_data.last_valid_data_time) > DATA_TIMEOUT_MS:
+            shared_data.internal_telemetry_data['systemStatus'] = 'NO_DATA_TIMEOUT'
+
+    # BLOCK 9c: Job, display flush and bus stats
+    async def block9c_job():
+        # The reports format their text before debug_print checks the level
+        if DEBUG_LEVEL >= 2:
+            sched.report(level=2, reset=True)
+            if flusher:
+                flusher.report(level=2)
+            if buses:
+                buses.report(level=2, reset=True)
+            saver.report(level=2)
+            if collector:
+                collector.report(level=2)
+            if power_monitor:
+                power_monitor.report(level=2)
+        if PROFILE:
+            profiler.dump(reset=True)
+
+    # Watchdog (lowest priority: only fed while every other job still gets its turn)
+    async def watchdog_job():
+        if watchdog:
+            watchdog.feed()
+
+    # --- Job table: name, body, period ms, priority (0 = most urgent), deadline ms, offset ms ---
+    sched = scheduler.Scheduler(shared_data.debug_print)
+    sched.add("pointer", block1_job, POINTER_UPDATE_PERIOD_MS, 0, POINTER_DEADLINE_MS)
+    if can_controller:
+        sched.add("can", block5_job, 0, 1, CAN_DEADLINE_MS, trigger=can_controller.data_buffer.wait)
+    sched.add("buttons", block7_job, BUTTON_POLL_PERIOD_MS, 2, 50)
+    sched.add("status", block_status_job, STATUS_UPDATE_PERIOD_MS, 3)
+    sched.add("save", block6_job, SAVE_CHECK_PERIOD_MS, 4)
+    sched.add("odometer", block2_job, DISPLAY_UPDATE_PERIOD_MS, 5, offset_ms=0)
+    sched.add("central", block3_job, DISPLAY_UPDATE_PERIOD_MS, 6, offset_ms=250)
+    sched.add("rnd", block_rnd_job, RND_UPDATE_PERIOD_MS, 7, offset_ms=500)
+    sched.add("temp", block8_job, TEMP_GAUGE_UPDATE_PERIOD_MS, 8, offset_ms=750)
+    if collector:
+        sched.add("gc", block9a_job, 0, 1, GC_SLOT_DEADLINE_MS, trigger=collector.wait)
+    sched.add("timeout", block9b_job, TIMEOUT_CHECK_PERIOD_MS, 9)
+    sched.add("gctune", block9d_job, GC_CHECK_PERIOD_MS, 10)
+    sched.add("stats", block9c_job, STATS_REPORT_PERIOD_MS, 11, 1000)
+    sched.add("watchdog", watchdog_job, WATCHDOG_FEED_PERIOD_MS, 12)
+    if PROFILE:
+        profiler.attach_scheduler(sched)
+    if collector and ALLOC_BUDGET:
+        memory.attach_scheduler(sched, collector, ALLOC_BUDGETS)
+        tasks = [("stepper odo", odometer_motor.engine()), ("rs485 rx", can_controller)]
+        if temp_gauge:
+            tasks.append(("stepper temp", temp_gauge.engine))
+        if flusher:
+            tasks += [("flush " + pf.name, pf) for pf in flusher.panels.values()]
+        memory.attach_tasks(collector, tasks, ALLOC_BUDGETS)
+    sched.start()
+    while True:
+        await asyncio.sleep_ms(60000)
 
 # --- Boot ---
-if __name__ == "__main__":
+def boot():
+    """Filesystem + odometer, displays, hardware, then the job loop (never returns)."""
+    debuglog.configure(LOG_LEVEL, DEBUG_LEVEL)
     shared_data = SharedTelemetryData()
 
     # Init filesystem & load odometer
@@ -502,15 +561,21 @@ if __name__ == "__main__":
         reset()
 
     try:
-        shared_data.total_km, shared_data.trip_km = store_km.load_odometer(shared_data.debug_print)
-        shared_data.debug_print(f"Odometer loaded: total={shared_data.total_km:.3f} km, trip={shared_data.trip_km:.3f} km")
+        shared_data.total_pulses, shared_data.trip_pulses = store_km.load_odometer(shared_data.debug_print)
+        shared_data.debug_print(f"Odometer loaded: total={distance.whole_km(shared_data.total_pulses)} km, "
+                                f"trip={shared_data.trip_pulses} pulses")
     except Exception as e:
-        shared_data.debug_print(f"ERROR loading odometer: {e} → using 0.0", level=0)
-        shared_data.total_km = 0.0
-        shared_data.trip_km = 0.0
+        shared_data.debug_print(f"ERROR loading odometer: {e} → using 0", level=0)
+        shared_data.total_pulses = 0
+        shared_data.trip_pulses = 0
 
+    if PROFILE:
+        profiler.install(debug_print=shared_data.debug_print)   # Before any driver is used
     init_displays(shared_data)
+    debuglog.event(1, debuglog.BOOT_TIME, BOOT_START_MS, MODULES_LOADED_MS,
+                   ssd1306.first_show_ms, utime.ticks_ms())
     init_hardware(shared_data)
+    init_memory(shared_data)
     shared_data.debug_print("Starting main loop.")
     try:
         asyncio.run(main_loop_logic(shared_data))
@@ -520,4 +585,7 @@ if __name__ == "__main__":
             rnd.fill(0)
             rnd.invert(1)
             rnd.text("CRASH", 0, 8)
-            rnd.show()
\ No newline at end of file
+            rnd.show()
+
+if __name__ == "__main__":
+    boot()
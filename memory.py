@@ -0,0 +1,224 @@
+# memory.py
+# Heap management: boot baseline, collections in idle slots, threshold tuning
+# MicroPython collects when an allocation finds the heap full or gc.threshold
+# bytes allocated – inside whatever code allocates, e.g. in the middle of a
+# needle move or between two display windows. Here instead:
+#   - startup(): boot is done (drivers constructed, their hot-path buffers
+#     allocated in the constructors); one full collection frees the boot
+#     garbage (font parsing, driver setup), the live heap is the baseline
+#   - Collector.pointer_tick() at the end of each pointer job: once `step`
+#     bytes were allocated since the last collection it releases the gc job,
+#     which collects right after the pointer tick – the longest idle slot –
+#     unless the needle is stepping from Python (then a later slot, up to
+#     URGENT_STEPS steps of garbage)
+#   - tune(): allocation rate → step (~1 s of allocations, bounded) and
+#     gc.threshold = BACKSTOP_STEPS steps, so the automatic collection only
+#     runs if no idle slot came up. mem_alloc() only drops in a collection:
+#     a drop not made here is counted as an unscheduled collection
+#   - allocation budget mode (test): automatic GC off, every job run and
+#     every synchronous slice of the long-lived tasks (stepper steps, RS485
+#     chunks, display windows) measured with gc.mem_alloc(); after the warm-up
+#     one allocating more than its budget (default 0 B per run) fails the
+#     check → report(), budget_ok()
+
+import gc
+import micropython
+import uasyncio as asyncio
+import utime
+
+# --- Collection policy ---
+STEP_MIN = 2048            # Collect after at least this many bytes ...
+STEP_MAX = 16384           # ... and at most this many (bounds the pause)
+STEP_WINDOW_MS = 1000      # Aim: one collection per second of allocations
+BACKSTOP_STEPS = 4         # gc.threshold in steps: automatic GC only without idle slots
+LOW_MEMORY = 30720         # Below this free heap: next slot, needle moving or not
+URGENT_STEPS = 2           # This many steps pending: collect even with the needle moving
+WARMUP_MS = 10000          # Budget mode: allocations before this are boot work
+EMERGENCY_BUF = 100        # Exception buffer for IRQ handlers
+
+
+class AllocBudget:
+    """Bytes allocated per run of one job or task slice (budget mode), attached as .alloc."""
+    __slots__ = ('name', 'budget', 'collector', 'runs', 'violations', 'last', 'max', 'total', '_a0')
+
+    def __init__(self, collector, name, budget=0):
+        self.collector = collector
+        self.name = name
+        self.budget = budget
+        self._a0 = 0
+        self.reset()
+
+    def reset(self):
+        self.runs = self.violations = self.last = self.max = self.total = 0
+
+    def start(self):
+        self._a0 = self.collector.allocated()
+
+    def stop(self):
+        """Allocations during the run (includes jobs interleaved at its awaits)."""
+        if not self.collector.steady:
+            return
+        n = self.collector.allocated() - self._a0
+        self.runs += 1
+        self.last = n
+        self.total += n
+        if n > self.max:
+            self.max = n
+        if n > self.budget:
+            self.violations += 1
+
+
+class Collector:
+    """
+    Scheduled collections: pointer_tick() from the pointer job, wait() as the
+    gc job's trigger, collect_in_slot() as its body, tune() periodically.
+    quiet: fn() → False while a collection would stall something (needle).
+    """
+
+    def __init__(self, quiet=None, budget=False, debug_print=None):
+        self.quiet = quiet
+        self.budget = budget
+        self.debug_print = debug_print or (lambda *args, **kwargs: None)
+        self.step = STEP_MIN
+        self.live = 0                      # mem_alloc() after the last collection
+        self.boot_live = 0
+        self.freed = 0                     # Freed by collections → allocated() is monotonic
+        self.rate = 0                      # Measured allocation rate, B/s
+        self.collections = 0
+        self.unscheduled = 0               # Collections not made here (threshold / heap full)
+        self.skips = 0
+        self.last_us = self.max_us = self.total_us = 0
+        self.steady = False
+        self.budgets = []
+        self._slot = asyncio.Event()
+        self._last_alloc = 0
+        self._start_ms = utime.ticks_ms()
+        self._rate_ms = self._start_ms
+        self._rate_alloc = 0
+
+    def startup(self):
+        """Boot done: free the boot garbage, take the baseline, set the threshold."""
+        micropython.alloc_emergency_exception_buf(EMERGENCY_BUF)
+        self.collect()
+        self.boot_live = self.live
+        self._rate_alloc = self.allocated()
+        self._rate_ms = self._start_ms = utime.ticks_ms()
+        if self.budget:
+            gc.disable()                   # mem_alloc() only drops in our collections
+        else:
+            gc.threshold(self.step * BACKSTOP_STEPS)
+        self.debug_print(f"Memory: {self.live} B live after boot, {gc.mem_free()} B free"
+                         f"{', allocation budget mode' if self.budget else ''}", level=1)
+
+    def allocated(self):
+        """Bytes allocated since boot (exact while only this collector collects)."""
+        return gc.mem_alloc() + self.freed
+
+    # --- Idle slots ---
+    def pointer_tick(self):
+        """End of the pointer job: release the gc job if a collection is due."""
+        used = gc.mem_alloc()
+        if used < self._last_alloc:
+            # Heap shrank without us: an automatic collection ran somewhere
+            self.unscheduled += 1
+            self.freed += self._last_alloc - used
+            self.live = used
+        self._last_alloc = used
+        if used - self.live >= self.step or gc.mem_free() < LOW_MEMORY:
+            self._slot.set()
+
+    async def wait(self):
+        """gc job trigger."""
+        await self._slot.wait()
+        self._slot.clear()
+
+    def collect_in_slot(self):
+        """gc job body: collect now, unless the needle is stepping and it can wait."""
+        if (self.quiet is not None and not self.quiet()
+                and gc.mem_alloc() - self.live < URGENT_STEPS * self.step
+                and gc.mem_free() >= LOW_MEMORY):
+            self.skips += 1                # Next slot (released again at the next tick)
+            return False
+        self.collect()
+        return True
+
+    def collect(self):
+        before = gc.mem_alloc()
+        t0 = utime.ticks_us()
+        gc.collect()
+        t = utime.ticks_diff(utime.ticks_us(), t0)
+        after = gc.mem_alloc()
+        self.freed += before - after
+        self.live = self._last_alloc = after
+        self.collections += 1
+        self.last_us = t
+        self.total_us += t
+        if t > self.max_us:
+            self.max_us = t
+
+    # --- Tuning ---
+    def tune(self):
+        """Periodic: allocation rate → step and gc.threshold; budget warm-up."""
+        now = utime.ticks_ms()
+        dt = utime.ticks_diff(now, self._rate_ms)
+        if dt <= 0:
+            return
+        allocated = self.allocated()
+        self.rate = (allocated - self._rate_alloc) * 1000 // dt
+        self._rate_ms = now
+        self._rate_alloc = allocated
+        step = self.rate * STEP_WINDOW_MS // 1000
+        step = STEP_MIN if step < STEP_MIN else STEP_MAX if step > STEP_MAX else step
+        free = gc.mem_free()
+        if step > free // 4:
+            step = max(free // 4, 1024)    # Low memory: smaller, earlier collections
+        if step != self.step:
+            self.step = step
+            if not self.budget:
+                gc.threshold(step * BACKSTOP_STEPS)
+        if free < LOW_MEMORY:
+            self.debug_print(f"Low memory: {free} bytes. GC in next slot.")
+        if self.budget and not self.steady and utime.ticks_diff(now, self._start_ms) >= WARMUP_MS:
+            self.steady = True
+            for b in self.budgets:
+                b.reset()
+            self.debug_print("Allocation budget: steady state, checking jobs.", level=1)
+
+    # --- Budget mode ---
+    def failing(self):
+        """Budgets of the jobs that allocated more than allowed (steady state)."""
+        return [b for b in self.budgets if b.violations]
+
+    def budget_ok(self):
+        return self.steady and not self.failing()
+
+    # --- Stats ---
+    def report(self, level=2):
+        n = self.collections or 1
+        self.debug_print(f"GC: {self.collections} collections (unscheduled {self.unscheduled}), "
+                         f"pause mean={self.total_us // n} max={self.max_us} us, "
+                         f"alloc {self.rate} B/s, step {self.step} B, live {self.live} B "
+                         f"(boot {self.boot_live}), free {gc.mem_free()} B", level=level)
+        for b in self.failing():
+            self.debug_print(f"ALLOC BUDGET FAIL: job {b.name} {b.violations}/{b.runs} runs over "
+                             f"{b.budget} B (max {b.max} B, total {b.total} B)", level=0)
+
+
+def attach_scheduler(sched, collector, budgets=None):
+    """Budget mode: measure every job's allocations (budgets: name → B per run, default 0)."""
+    for job in sched.jobs:
+        job.alloc = AllocBudget(collector, job.name, (budgets or {}).get(job.name, 0))
+        collector.budgets.append(job.alloc)
+
+
+def attach_tasks(collector, tasks, budgets=None):
+    """
+    Budget mode for the long-lived tasks outside the scheduler: tasks is
+    (name, owner) pairs whose loops start()/stop() owner.alloc around the code
+    between their awaits (StepperEngine, CanBusController, PanelFlush).
+    """
+    for name, owner in tasks:
+        if owner is None:
+            continue
+        owner.alloc = AllocBudget(collector, name, (budgets or {}).get(name, 0))
+        collector.budgets.append(owner.alloc)
@@ -5,6 +5,7 @@
 
 import machine
 import utime
+import uasyncio as asyncio
 
 
 class Motor:
@@ -49,24 +50,32 @@ class Motor:
         """Reset internal position counter to 0"""
         self._pos = 0
 
+    def release(self):
+        """De-energize all coils (no holding torque, no coil current)"""
+        for pin in self.pins:
+            pin.value(0)
+
     def _step(self, dir):
         """
         Perform one microstep in the given direction.
-        Updates pins and internal state/position.
+        Updates internal state/position, then energizes the new state, so a
+        direction change takes effect on the very first step.
         """
-        state = self.states[self._state]
-        for i, val in enumerate(state):
-            self.pins[i].value(val)
-
         # Advance state index
         self._state = (self._state + dir) % len(self.states)
         # Update position (wrap around)
         self._pos = (self._pos + dir) % self.maxpos
 
+        state = self.states[self._state]
+        pins = self.pins
+        for i in range(len(state)):        # No enumerate object per step
+            pins[i].value(state[i])
+
     def step(self, steps):
         """
         Move the motor by a given number of steps.
-        Handles direction, timing, and prevents blocking.
+        Handles direction and timing. Blocks for steps * stepms –
+        inside the uasyncio loop use StepperEngine instead.
         """
         dir = 1 if steps >= 0 else -1
         steps = abs(steps)
@@ -138,4 +147,278 @@ class HalfStepMotor(Motor):
         [0, 0, 1, 1],
         [0, 0, 0, 1],
         [1, 0, 0, 1],
-    ]
\ No newline at end of file
+    ]
+
+
+class PythonPhaseBackend:
+    """
+    Phase output from Python: one Motor._step() per emit(), timed by the caller.
+    Fallback for stepper_pio.PioPhaseBackend (same interface).
+    """
+    lead_us = 0                  # Steps are emitted exactly when due
+
+    def __init__(self, motor):
+        self.motor = motor
+
+    def room(self):
+        return True
+
+    def emit(self, direction, period_us, count=1):
+        for _ in range(count):
+            self.motor._step(direction)
+
+    def release(self):
+        self.motor.release()
+
+    def halt(self):
+        self.motor.release()
+
+
+def make_phase_backend(motor, gpios=None, sm_id=None, debug_print=None):
+    """
+    PIO backend if `gpios` (consecutive) and `sm_id` are given and the state
+    table allows it, else PythonPhaseBackend.
+    """
+    if gpios is not None and sm_id is not None:
+        try:
+            import stepper_pio
+            backend = stepper_pio.PioPhaseBackend(sm_id, gpios, motor.states, motor._state)
+            if debug_print:
+                debug_print(f"Stepper phases via PIO SM{sm_id} (GPIO {gpios[0]}-{gpios[-1]}).", level=1)
+            return backend
+        except Exception as e:
+            if debug_print:
+                debug_print(f"PIO stepper unavailable ({e}) → Python phases.", level=1)
+    return PythonPhaseBackend(motor)
+
+
+def _isqrt(n, guess):
+    """floor(sqrt(n)) for n >= 1 by Newton from `guess` (> 0, e.g. the last result)."""
+    x = (guess + n // guess) >> 1          # One step from anywhere lands >= the root
+    y = (x + n // x) >> 1
+    while y < x:
+        x = y
+        y = (x + n // x) >> 1
+    return x
+
+
+class MotionPlanner:
+    """
+    Trapezoidal velocity profile, evaluated once per step.
+    Accelerates at `accel` up to `max_rate`, brakes as soon as the remaining
+    distance is within the stopping distance, so the needle never passes its
+    target. A new target is picked up on the next step: moving toward it the
+    profile just continues, moving away it brakes first and then reverses.
+    Integer math only (rp2 floats are heap objects, this runs every step):
+    the state is the squared speed, which changes by 2·accel per step; the
+    speed for the interval is its integer root in 1/16 steps/s.
+    """
+    SPEED_SHIFT = 4                        # Root taken of v² << 2·SPEED_SHIFT
+    MAX_RATE = 2047                        # v² << 8 stays a small int (< 2^30)
+
+    def __init__(self, max_rate, accel):
+        """
+        :param max_rate: Max step rate in steps/s (motor limit, integer)
+        :param accel: Acceleration/deceleration in steps/s² (integer)
+        """
+        if max_rate > self.MAX_RATE:
+            raise ValueError(f"MotionPlanner: max_rate {max_rate} > {self.MAX_RATE} steps/s")
+        self.max_rate = max_rate
+        self.accel = accel
+        self.max_v2 = max_rate * max_rate
+        self.min_v2 = 2 * accel                # Speed² after the first step from rest
+        if self.min_v2 > self.max_v2:
+            self.min_v2 = self.max_v2
+        self.v2 = 0                            # Speed², steps²/s²
+        self.direction = 0                     # Of the last step: 1, -1, 0 = at rest
+        self._root = 1                         # Last root (Newton start)
+
+    def reset(self):
+        self.v2 = 0
+        self.direction = 0
+
+    def next_step(self, pos, target):
+        """
+        Plan the next step from `pos` toward `target`.
+        Returns interval_us and sets self.direction (0: at rest, interval 0) –
+        no tuple, nothing allocated.
+        """
+        dist = target - pos
+        if dist == 0:
+            self.v2 = 0
+            self.direction = 0
+            return 0
+
+        v2 = self.v2
+        two_a = 2 * self.accel
+        direction = self.direction
+
+        if direction != 0 and (direction > 0) != (dist > 0):
+            # Moving away from the target: brake, reverse once slow enough
+            v2 -= two_a
+            if v2 <= self.min_v2:
+                direction = -direction
+                v2 = self.min_v2
+        else:
+            direction = 1 if dist > 0 else -1
+            remaining = (dist if dist > 0 else -dist) - 1      # After this step
+            if remaining * two_a > v2:
+                v2 += two_a                                    # Accelerate / cruise
+                if v2 > self.max_v2:
+                    v2 = self.max_v2
+            else:
+                v2 -= two_a                                    # Decelerate
+                if v2 < self.min_v2:
+                    v2 = self.min_v2
+
+        self.v2 = v2
+        self.direction = direction
+        root = _isqrt(v2 << (2 * self.SPEED_SHIFT), self._root)
+        self._root = root
+        return (1_000_000 << self.SPEED_SHIFT) // root
+
+
+class StepperEngine:
+    """
+    Non-blocking stepping engine for a Motor.
+    The needle has a linear target position (steps, may go below 0 for homing);
+    a background uasyncio task emits phase changes until the target is
+    reached, then sleeps on an Event until a new target is set.
+    Step timing: a MotionPlanner profile if given, else one step per stepms.
+    Phases go out through a backend (PythonPhaseBackend or PIO); a backend with
+    lead_us > 0 times the steps itself and is fed that far ahead.
+    Callers only set targets – nothing in the event loop waits on the motor.
+    """
+
+    def __init__(self, motor, stepms=None, planner=None, release_when_idle=False, backend=None):
+        """
+        :param planner: Optional MotionPlanner (acceleration-profiled motion)
+        :param release_when_idle: De-energize the coils once the target is reached
+        :param backend: Phase output backend (default: PythonPhaseBackend)
+        """
+        self.motor = motor
+        self.backend = backend or PythonPhaseBackend(motor)
+        self.stepms = stepms if stepms is not None else motor.stepms
+        self.planner = planner
+        self.release_when_idle = release_when_idle
+        self.pos = 0                 # Linear position in steps (not wrapped)
+        self.target = 0
+        self.steps_done = 0          # Total phase changes emitted
+        self._homing = False
+        self._pending_target = None
+        self._wake = asyncio.Event()
+        self._task = None
+        self.halted = False          # halt(): no more steps until reset
+        self.alloc = None            # memory.AllocBudget: bytes allocated per step (test mode)
+
+    def start(self):
+        """Start the background stepping task (idempotent)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    @property
+    def busy(self):
+        return self.pos != self.target
+
+    def set_target(self, target):
+        """Move toward absolute step position `target` (returns immediately)."""
+        if self.halted:
+            return
+        if self._homing:
+            self._pending_target = target
+            return
+        if target != self.target:
+            self.target = target
+            self._wake.set()
+
+    def move_by(self, steps):
+        self.set_target(self.target + steps)
+
+    def home(self, overtravel):
+        """
+        Drive `overtravel` steps backward; positions below 0 are treated as
+        the mechanical stop and clamped to 0 on arrival. Targets set while
+        homing are applied afterwards.
+        """
+        self._pending_target = None
+        self._homing = True
+        self.target = self.pos - overtravel
+        self._wake.set()
+
+    def halt(self):
+        """
+        Power fail: stop at the current step and de-energize the coils now
+        (also a backend with queued steps). Targets are ignored afterwards.
+        """
+        self.halted = True
+        self._homing = False
+        self._pending_target = None
+        self.target = self.pos
+        self.backend.halt()
+
+    def zero(self):
+        """Declare the current position as 0 (no movement)."""
+        self.pos = 0
+        self.target = 0
+        self.motor.zero()
+
+    def _arrived(self):
+        if self._homing:
+            self._homing = False
+            if self.pos < 0:
+                self.pos = 0
+            self.target = self.pos
+            if self._pending_target is not None:
+                self.target = self._pending_target
+                self._pending_target = None
+
+    async def _run(self):
+        backend = self.backend
+        planner = self.planner
+        next_us = utime.ticks_us()
+        while True:
+            if self.pos == self.target:
+                self._arrived()
+                if self.pos == self.target:
+                    if planner:
+                        planner.reset()
+                    if self.release_when_idle:
+                        # Let a buffering backend finish the last phase first
+                        delay_us = utime.ticks_diff(next_us, utime.ticks_us())
+                        if delay_us > 0:
+                            await asyncio.sleep_ms(delay_us // 1000)
+                        if self.pos != self.target:
+                            continue
+                        backend.release()
+                    self._wake.clear()
+                    await self._wake.wait()
+                    next_us = utime.ticks_us()
+                continue
+
+            while not backend.room():
+                await asyncio.sleep_ms(1)
+            if self.pos == self.target:
+                continue                 # Retargeted (or halted) while waiting for room
+            alloc = self.alloc
+            if alloc is not None:
+                alloc.start()
+            if planner:
+                interval_us = planner.next_step(self.pos, self.target)
+                direction = planner.direction
+            else:
+                direction = 1 if self.target > self.pos else -1
+                interval_us = self.stepms * 1000
+            backend.emit(direction, interval_us)
+            self.pos += direction
+            self.steps_done += 1
+
+            # Absolute deadlines: sleep_ms rounding does not accumulate
+            now = utime.ticks_us()
+            if utime.ticks_diff(next_us, now) < -backend.lead_us:
+                next_us = now            # Fell behind (or idle) → restart the timeline
+            next_us = utime.ticks_add(next_us, interval_us)
+            delay_us = utime.ticks_diff(next_us, now) - backend.lead_us
+            if alloc is not None:
+                alloc.stop()
+            await asyncio.sleep_ms(delay_us // 1000 if delay_us > 0 else 0)
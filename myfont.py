@@ -1,6 +1,7 @@
 # myfont.py - Enthält beide Font-Groessen im MONO_VLSB Format
 
 import framebuf
+import debuglog
 
 # --- FONT 1: 12x16 (24 Bytes/Zeichen) ---
 
@@ -89,3 +90,89 @@ class MyFont:
 
     def get_text_width(self, text):
         return len(text) * self.width
+
+
+# --- GLYPH-CACHE RENDERER (blit statt Pixel-Schleifen) ---
+
+class GlyphFont:
+    """
+    One blit source per glyph, validated once at build time: a
+    (data, width, height, MONO_VLSB) tuple straight over the font bytes
+    (MicroPython >= 1.20 blits from read-only buffers). No bytearray copy:
+    with myfont frozen into the firmware (tools/build_mpy.py) the glyph
+    pixels stay in flash and only the tuples take heap.
+    draw() is one blit per character and returns the exact dirty box.
+    Glyph background is blitted too (no key) → the character cell is cleared.
+    """
+    def __init__(self, font_data, width, height, fallback=' ', debug_print=None):
+        self.width = width
+        self.height = height
+        self.byte_count = width * ((height + 7) // 8)
+        self.glyphs = {}
+        self.invalid = []
+        self.missing = 0  # Characters drawn with the fallback glyph
+
+        for char, data in font_data.items():
+            if len(data) != self.byte_count:
+                self.invalid.append(char)
+                continue
+            self.glyphs[char] = (data, width, height, framebuf.MONO_VLSB)
+
+        if fallback not in self.glyphs:
+            raise ValueError(f"Font {width}x{height}: Ersatzzeichen '{fallback}' fehlt.")
+        self.fallback = self.glyphs[fallback]
+        if self.invalid and debug_print:
+            debug_print(f"Font {width}x{height}: {len(self.invalid)} glyphs with wrong size skipped: "
+                        f"{''.join(self.invalid)}", level=1)
+
+    def draw(self, fb, text, x, y, width, height, debug_print=None):
+        """
+        Blit `text` at (x, y) into fb (width x height).
+        Returns the touched box (x0, y0, x1, y1), inclusive and clipped to the
+        display, or None if nothing visible was drawn. Missing glyphs are
+        logged as debuglog.FONT_MISSING (debug_print kept for compatibility).
+        """
+        glyphs = self.glyphs
+        w = self.width
+        cx = x
+        for char in text:
+            if cx >= width:
+                break
+            glyph = glyphs.get(char)
+            if glyph is None:
+                glyph = self.fallback
+                self.missing += 1
+                if debuglog.level >= 3:
+                    debuglog.event(3, debuglog.FONT_MISSING, ord(char))
+            fb.blit(glyph, cx, y)
+            cx += w
+
+        x0 = x if x > 0 else 0
+        y0 = y if y > 0 else 0
+        x1 = cx - 1 if cx <= width else width - 1
+        y1 = y + self.height - 1
+        if y1 >= height:
+            y1 = height - 1
+        if x0 > x1 or y0 > y1:
+            return None
+        return x0, y0, x1, y1
+
+
+_font_cache = {}
+
+def get_font(size='small', debug_print=None):
+    """GlyphFont for 'small' (12x16) or 'large' (16x21), built on first use."""
+    font = _font_cache.get(size)
+    if font is None:
+        if size == 'small':
+            font = GlyphFont(font_12x16_packed, 12, 16, debug_print=debug_print)
+        elif size == 'large':
+            font = GlyphFont(font_16x21_packed, 16, 21, debug_print=debug_print)
+        else:
+            raise ValueError("Ungültige Font-Größe. Wähle 'small' (12x16) oder 'large' (16x21).")
+        _font_cache[size] = font
+    return font
+
+def draw_12x16_font(fb, text, x, y, width, height, debug_print=None):
+    """Draw text in the 12x16 font. Returns the dirty box (x0, y0, x1, y1) or None."""
+    return get_font('small', debug_print).draw(fb, text, x, y, width, height, debug_print)
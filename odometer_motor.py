@@ -1,19 +1,27 @@
 # odometer_motor.py
 # Controls the analog odometer pointer using FullStepMotor from motor.py
-# Smooth movement with STEPS_PER_MOVEMENT, clamping, and zero calibration
+# Non-blocking: sets the target of a StepperEngine, stepping runs in the background
+# Trapezoidal velocity profile (motor.MotionPlanner), retargeted every update
 # Uses original parameters: MAX_SPEED_KMH=225, MAX_STEPS=480, etc.
 
 import motor
+import debuglog
 from machine import Pin
 
 # --- Configuration (EXACTLY as in your original) ---
 MAX_SPEED_KMH = 225               # Maximum speed on the gauge (225 km/h)
 MAX_STEPS = 480                   # Total steps for full scale (0 → 225 km/h)
-STEPS_PER_MOVEMENT = 4            # Smooth movement: 4 steps per update (~1.5°)
+STEP_PERIOD_MS = 5                # Fastest step period of the motor
+MAX_STEP_RATE = 1000 // STEP_PERIOD_MS  # 200 steps/s → full scale in ~2.6 s
+ACCEL_STEPS_S2 = 800              # 0 → max rate in 0.25 s
+ODOMETER_GPIOS = (10, 20, 19, 29) # A, B, A', B' – PIO needs 4 consecutive GPIOs,
+                                  # so this wiring falls back to Python phases
+ODOMETER_PIO_SM = 0               # PIO state machine if the wiring allows it
+ZERO_OVERTRAVEL_STEPS = 40        # ~15° below zero to hit the end stop
 
 # --- Global State ---
 _stepper = None                   # Instance of FullStepMotor
-_current_steps = 0                # Current position in steps (0 to MAX_STEPS)
+_engine = None                    # motor.StepperEngine driving _stepper
 
 
 # --- Helper: Linear mapping with clamping ---
@@ -30,7 +38,7 @@ def init(debug_print):
     Initialize the odometer stepper motor using motor.py's FullStepMotor.
     Pins: A=GP10, B=GP20, A'=GP19, B'=GP29
     """
-    global _stepper, _current_steps
+    global _stepper, _engine
     try:
         _stepper = motor.FullStepMotor.frompins(
             Pin(10),   # Phase A
@@ -38,22 +46,25 @@ def init(debug_print):
             Pin(19),   # Phase A'
             Pin(29)    # Phase B'
         )
-        _current_steps = 0
+        planner = motor.MotionPlanner(MAX_STEP_RATE, ACCEL_STEPS_S2)
+        backend = motor.make_phase_backend(_stepper, ODOMETER_GPIOS, ODOMETER_PIO_SM, debug_print)
+        _engine = motor.StepperEngine(_stepper, stepms=STEP_PERIOD_MS, planner=planner, backend=backend)
+        _engine.start()
         debug_print("Odometer motor initialized (FullStep, 4-phase, pins 10,20,19,29).", level=1)
     except Exception as e:
         debug_print(f"ERROR: Odometer motor init failed: {e}", level=0)
         _stepper = None
+        _engine = None
 
 
 # --- Update pointer position ---
 def odometer_pointer(speed_kmh, debug_print=None):
     """
-    Move the odometer pointer smoothly toward target speed.
-    Uses incremental steps (STEPS_PER_MOVEMENT) to avoid jerking.
+    Set the pointer target for the given speed.
+    Returns immediately; the StepperEngine task follows the target with an
+    acceleration-limited profile (retargets smoothly while moving).
     """
-    global _current_steps, _stepper
-
-    if _stepper is None:
+    if _engine is None:
         if debug_print:
             debug_print("ERROR: Odometer motor not initialized!", level=0)
         return
@@ -61,48 +72,55 @@ def odometer_pointer(speed_kmh, debug_print=None):
     try:
         speed_kmh = max(0, min(speed_kmh, MAX_SPEED_KMH))
         target_steps = _map(speed_kmh, 0, MAX_SPEED_KMH, 0, MAX_STEPS)
-        diff = target_steps - _current_steps
-
-        if diff > 0:
-            steps = min(diff, STEPS_PER_MOVEMENT)
-        elif diff < 0:
-            steps = max(diff, -STEPS_PER_MOVEMENT)
-        else:
-            steps = 0
-
-        if steps != 0:
-            _stepper.step(steps)
-            _current_steps += steps
 
-            if debug_print:
-                debug_print(f"Odometer: {speed_kmh:.1f} km/h → {target_steps} steps (+{steps})", level=2)
+        if target_steps != _engine.target:
+            _engine.set_target(target_steps)
+            if debuglog.level >= 2:
+                debuglog.event(2, debuglog.ODO_TARGET, int(speed_kmh * 10), target_steps, _engine.pos)
 
     except Exception as e:
         if debug_print:
             debug_print(f"ERROR in odometer_pointer: {e}", level=0)
 
 
+def engine():
+    """The needle's StepperEngine (None if the motor failed to init)."""
+    return _engine
+
+
+def moving():
+    """
+    Needle steps timed from Python in progress (a gc.collect() now would stall
+    them); a PIO backend is fed ahead and rides out a collection.
+    """
+    return _engine is not None and _engine.busy and not _engine.backend.lead_us
+
+
+# --- Power fail ---
+def halt():
+    """Coils off at once, no further steps (powerfail shed list)."""
+    if _engine is not None:
+        _engine.halt()
+
+
 # --- Zero calibration ---
 def odometer_pointer_zero(debug_print=None):
     """
     Move pointer to zero position (calibration).
     Applies -40 steps (~15° below zero) to ensure needle rests at 0.
+    Non-blocking: the engine runs the homing move in the background.
     """
-    global _stepper
-
-    if _stepper is None:
+    if _engine is None:
         if debug_print:
             debug_print("ERROR: Odometer motor not initialized!", level=0)
         return
 
     try:
-        # Move 40 steps backward to go below zero
-        _stepper.step(-40)
-        _current_steps = max(_current_steps - 40, 0)  # Prevent negative steps
+        _engine.home(ZERO_OVERTRAVEL_STEPS)
 
         if debug_print:
-            debug_print("Odometer zeroed: moved -40 steps for calibration.", level=1)
+            debug_print(f"Odometer zeroing: -{ZERO_OVERTRAVEL_STEPS} steps for calibration.", level=1)
 
     except Exception as e:
         if debug_print:
-            debug_print(f"ERROR in odometer_pointer_zero: {e}", level=0)
\ No newline at end of file
+            debug_print(f"ERROR in odometer_pointer_zero: {e}", level=0)
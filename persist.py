@@ -0,0 +1,198 @@
+# persist.py
+# Odometer persistence policy: when to write (store_km does the how)
+# Saves
+#   - at a stop (speed 0 for STOP_SAVE_MS, once per stop), as before
+#   - while driving, every SAVE_DISTANCE_M travelled, or SAVE_INTERVAL_MS
+#     after the last save if anything was travelled since
+#   - on request (trip reset) and as a final save on power fail
+# Flash writes are limited to WRITES_PER_HOUR (token bucket, BURST writes in
+# advance); requested and final saves are never refused. A write waits for the
+# background slot right after a pointer tick (FlushScheduler.time_to_tick_us),
+# so it does not hold the CPU when the pointer job is released.
+# Stats: saves per reason, budget refusals, slot deferrals, write time
+
+import uasyncio as asyncio
+import utime
+import store_km
+from distance import mm_to_pulses
+
+# --- Policy ---
+STOP_SAVE_MS = 2000        # Stopped this long → save once
+SAVE_DISTANCE_M = 1000     # Save while driving after this distance ...
+SAVE_INTERVAL_MS = 120000  # ... or this long after the last save (if moved)
+WRITES_PER_HOUR = 60       # Flash-write budget (one metadata commit each, a 4 KB erase every ~40)
+BURST = 4                  # Writes the budget allows back to back
+
+# --- Slot ---
+SLOT_MIN_US = 3000         # Assumed write time until one was measured
+GUARD_US = 1000            # Keep this much free in front of the pointer tick
+MAX_DEFER_MS = 200         # Upper bound for waiting for a slot
+
+_COST_MS = 3_600_000 // WRITES_PER_HOUR
+
+# Reasons (index into OdometerSaver.saves)
+STOP = 0
+DISTANCE = 1
+TIME = 2
+REQUEST = 3
+FINAL = 4
+REASONS = ("stop", "distance", "time", "request", "final")
+
+
+class OdometerSaver:
+    """
+    check() is the body of the periodic "save" job; request() asks for a save
+    at the next check (trip reset); final() writes at once (power fail).
+    ticker: the FlushScheduler (pointer_tick/time_to_tick_us) or None.
+    """
+
+    def __init__(self, shared_data, ticker=None, debug_print=None):
+        self.shared_data = shared_data
+        self.ticker = ticker
+        self.debug_print = debug_print or (lambda *args, **kwargs: None)
+        self.distance_pulses = mm_to_pulses(SAVE_DISTANCE_M * 1000)
+        self.saved_total = shared_data.total_pulses
+        self.saved_trip = shared_data.trip_pulses
+        now = utime.ticks_ms()
+        self.last_save_ms = now
+        self.stop_start_ms = None          # Speed 0 since (None = moving)
+        self.saved_in_stop = True          # Nothing to save right after boot
+        self.requested = False
+        self.failed = False                # Power fail: no more writes
+        self.credit_ms = BURST * _COST_MS  # Token bucket, in ms of budget
+        self._credit_at = now
+        self.saves = [0] * len(REASONS)
+        self.refused = 0
+        self.deferrals = 0
+        self.errors = 0
+        self.write_last_us = 0
+        self.write_max_us = 0
+
+    def request(self):
+        """Save at the next check, regardless of the budget."""
+        self.requested = True
+
+    def _refill(self, now):
+        self.credit_ms += utime.ticks_diff(now, self._credit_at)
+        self._credit_at = now
+        if self.credit_ms > BURST * _COST_MS:
+            self.credit_ms = BURST * _COST_MS
+
+    def _due(self, now):
+        """Reason for a save now, or None."""
+        sd = self.shared_data
+        if self.requested:
+            return REQUEST
+        moved = sd.total_pulses - self.saved_total
+        if sd.speed == 0:
+            if self.stop_start_ms is None:
+                self.stop_start_ms = now
+                self.saved_in_stop = False
+            elif (not self.saved_in_stop and
+                  utime.ticks_diff(now, self.stop_start_ms) > STOP_SAVE_MS):
+                self.saved_in_stop = True
+                if moved or sd.trip_pulses != self.saved_trip:
+                    return STOP
+            return None
+        self.stop_start_ms = None
+        if moved >= self.distance_pulses:
+            return DISTANCE
+        if moved and utime.ticks_diff(now, self.last_save_ms) >= SAVE_INTERVAL_MS:
+            return TIME
+        return None
+
+    async def check(self):
+        if self.failed:
+            return
+        now = utime.ticks_ms()
+        self._refill(now)
+        reason = self._due(now)
+        if reason is None:
+            return
+        if reason != REQUEST:
+            if self.credit_ms < _COST_MS:
+                self.refused += 1          # Retried at the next check once credit is back
+                if reason == STOP:
+                    self.saved_in_stop = False
+                return
+        await self._slot()
+        if self.failed:
+            return                         # final() ran while waiting
+        self._save(reason)
+
+    async def _slot(self):
+        """Wait until the next pointer tick is far enough away for one write."""
+        ticker = self.ticker
+        if ticker is None:
+            return
+        need = (self.write_max_us if self.write_max_us > SLOT_MIN_US else SLOT_MIN_US) + GUARD_US
+        longest = ticker.pointer_period_us - 2 * GUARD_US
+        if need > longest:
+            need = longest                 # Longer writes (compaction): right after the tick
+        waited = 0
+        while waited < MAX_DEFER_MS:
+            left = ticker.time_to_tick_us()
+            if left > need:
+                return
+            # Tick close or overdue: let the pointer job run first, then retry
+            self.deferrals += 1
+            ms = left // 1000 + 1 if left > 0 else 1
+            await asyncio.sleep_ms(ms)
+            waited += ms
+
+    def _save(self, reason):
+        sd = self.shared_data
+        total, trip = sd.total_pulses, sd.trip_pulses
+        if self.failed and reason != FINAL:
+            return False                   # final() preempted this save and wrote newer totals
+        t0 = utime.ticks_us()
+        try:
+            ok = store_km.save_odometer(total, trip, self.debug_print, reason == FINAL)
+        except Exception as e:
+            ok = False
+            self.debug_print(f"ERROR saving odometer: {e}", level=0)
+        t = utime.ticks_diff(utime.ticks_us(), t0)
+        self.write_last_us = t
+        if t > self.write_max_us and reason != FINAL:
+            self.write_max_us = t
+        if not ok:
+            if not self.failed:            # Else refused by store_km after the final save
+                self.errors += 1
+            return False
+        now = utime.ticks_ms()
+        self.credit_ms -= _COST_MS
+        if self.credit_ms < 0:
+            self.credit_ms = 0
+        self.saved_total = total
+        self.saved_trip = trip
+        self.last_save_ms = now
+        self.requested = False
+        self.saves[reason] += 1
+        self.debug_print(f"Odometer saved ({REASONS[reason]}).", level=2 if reason in (DISTANCE, TIME) else 1)
+        return True
+
+    def final(self):
+        """Power fail: write now if anything is unsaved, then stop writing."""
+        if self.failed:
+            return False
+        sd = self.shared_data
+        ok = True
+        if sd.total_pulses != self.saved_total or sd.trip_pulses != self.saved_trip:
+            ok = self._save(FINAL)
+        self.failed = True
+        return ok
+
+    def resume(self):
+        """Supply back (brown-out only): allow writes again."""
+        self.failed = False
+        store_km.resume()
+
+    def report(self, level=2, reset=False):
+        counts = " ".join(f"{REASONS[i]}={n}" for i, n in enumerate(self.saves))
+        self.debug_print(f"Odometer saves: {counts} refused={self.refused} defer={self.deferrals} "
+                         f"err={self.errors} write last={self.write_last_us} max={self.write_max_us} us "
+                         f"budget={self.credit_ms // _COST_MS}/{BURST}", level=level)
+        if reset:
+            for i in range(len(self.saves)):
+                self.saves[i] = 0
+            self.refused = self.deferrals = self.errors = 0
@@ -0,0 +1,142 @@
+# powerfail.py
+# Supply monitor: 12 V rail through a divider on an ADC input, last-gasp commit
+# A machine.Timer samples the ADC every SAMPLE_PERIOD_MS. Its callback runs
+# between bytecodes of whatever task is active (soft IRQ), so it preempts the
+# uasyncio jobs; only a C call already in progress (one I2C window, one flash
+# write) finishes first. CONFIRM_SAMPLES readings below FAIL_MV → power fail:
+#   1. shed load: stepper coils off, tach PWM off, OLEDs off (hold-up time)
+#   2. commit: one odometer save (store_km: one inline LittleFS commit),
+#      expected within COMMIT_BUDGET_US. Preempting a regular save, it is
+#      left to that save, which writes it before returning (store_km)
+# After a commit the rail has to stay above RECOVER_MV for RECOVER_MS (a
+# brown-out, not a power-off) → on_recover(), main.py resets the board.
+#
+# The divider sits in front of the reverse-polarity diode: a supply loss is
+# seen at once, while the hold-up capacitor behind the diode is still full.
+# Hold-up (board values, see tools/sim_powerfail.py): 4700 µF, 5 V buck drops
+# out below ~6.5 V → ~700 ms with the load shed (~45 mA), ~120 ms without.
+
+try:
+    from machine import ADC, Pin, Timer
+except ImportError:                # Host harness (tools/sim_powerfail.py)
+    ADC = Pin = Timer = None
+import utime
+
+# --- Configuration ---
+ADC_GPIO = 28              # ADC2
+DIVIDER_TOP_OHM = 47000    # 12 V rail → R_top → ADC → R_bottom → GND
+DIVIDER_BOTTOM_OHM = 10000 # 15.9 V full scale
+ADC_VREF_MV = 3300
+FAIL_MV = 9000             # Below → power fail (after CONFIRM_SAMPLES)
+RECOVER_MV = 10500         # Hysteresis: back above this for RECOVER_MS → recovered
+CONFIRM_SAMPLES = 3        # Consecutive low readings (ADC noise, load spikes)
+RECOVER_MS = 500
+SAMPLE_PERIOD_MS = 1
+COMMIT_BUDGET_US = 500_000 # Shed + commit: one LittleFS commit, worst case with a
+                           # metadata compaction = 4 KB erase (45 ms typ., 400 ms max),
+                           # well inside the hold-up time
+
+
+def mv_to_raw(mv):
+    """Rail voltage (mV) → ADC.read_u16() value."""
+    return mv * DIVIDER_BOTTOM_OHM * 65535 // ((DIVIDER_TOP_OHM + DIVIDER_BOTTOM_OHM) * ADC_VREF_MV)
+
+
+def raw_to_mv(raw):
+    return raw * (DIVIDER_TOP_OHM + DIVIDER_BOTTOM_OHM) * ADC_VREF_MV // (DIVIDER_BOTTOM_OHM * 65535)
+
+
+_FAIL_RAW = mv_to_raw(FAIL_MV)
+_RECOVER_RAW = mv_to_raw(RECOVER_MV)
+
+
+class PowerMonitor:
+    """
+    shed: callables run first on power fail (each guarded);
+    commit: callable returning True when the odometer is on flash;
+    on_recover: called once the supply is back after a commit (or None).
+    """
+
+    def __init__(self, shed, commit, on_recover=None, adc=None, debug_print=None):
+        self.shed = shed
+        self.commit = commit
+        self.on_recover = on_recover
+        self.adc = adc
+        self.debug_print = debug_print or (lambda *args, **kwargs: None)
+        self.timer = None
+        self.low = 0               # Consecutive readings below FAIL_MV
+        self.failed = False
+        self.recover_since = None  # ticks_ms of the first reading above RECOVER_MV
+        self.min_raw = 65535
+        self.samples = 0
+        # Last power fail: detection time, shed/commit durations (µs), result
+        self.fail_ms = 0
+        self.shed_us = 0
+        self.commit_us = 0
+        self.committed = False
+        self.overruns = 0
+
+    def start(self):
+        if self.adc is None:
+            self.adc = ADC(Pin(ADC_GPIO))
+        self.timer = Timer(period=SAMPLE_PERIOD_MS, mode=Timer.PERIODIC, callback=self.sample)
+        self.debug_print(f"Power monitor on GPIO {ADC_GPIO}: fail < {FAIL_MV} mV, "
+                         f"recover > {RECOVER_MV} mV", level=1)
+
+    def stop(self):
+        if self.timer:
+            self.timer.deinit()
+            self.timer = None
+
+    def sample(self, _timer=None):
+        """Timer callback: one ADC reading through the threshold state machine."""
+        raw = self.adc.read_u16()
+        self.samples += 1
+        if raw < self.min_raw:
+            self.min_raw = raw
+        if not self.failed:
+            if raw < _FAIL_RAW:
+                self.low += 1
+                if self.low >= CONFIRM_SAMPLES:
+                    self._last_gasp()
+            else:
+                self.low = 0
+            return
+        if raw > _RECOVER_RAW:
+            now = utime.ticks_ms()
+            if self.recover_since is None:
+                self.recover_since = now
+            elif utime.ticks_diff(now, self.recover_since) >= RECOVER_MS and self.on_recover:
+                self.stop()
+                self.on_recover()
+        else:
+            self.recover_since = None
+
+    def _last_gasp(self):
+        self.failed = True
+        self.fail_ms = utime.ticks_ms()
+        t0 = utime.ticks_us()
+        for fn in self.shed:
+            try:
+                fn()
+            except Exception:
+                pass               # Keep going: the commit matters most
+        t1 = utime.ticks_us()
+        try:
+            self.committed = bool(self.commit())
+        except Exception:
+            self.committed = False
+        t2 = utime.ticks_us()
+        self.shed_us = utime.ticks_diff(t1, t0)
+        self.commit_us = utime.ticks_diff(t2, t1)
+        if self.shed_us + self.commit_us > COMMIT_BUDGET_US:
+            self.overruns += 1
+        # Only now (the odometer is safe) spend time on output
+        self.debug_print(f"POWER FAIL: shed {self.shed_us} us, commit {self.commit_us} us "
+                         f"({'ok' if self.committed else 'FAILED'})", level=0)
+
+    def report(self, level=2):
+        self.debug_print(f"Supply: min {raw_to_mv(self.min_raw)} mV over {self.samples} samples, "
+                         f"fail={int(self.failed)} overruns={self.overruns}", level=level)
+        self.min_raw = 65535
+        self.samples = 0
@@ -0,0 +1,222 @@
+# profiler.py
+# Built-in latency profiler: ticks_us probes with fixed-size histograms
+# Probes record into preallocated log-linear histograms (4 buckets per power
+# of two, ~25 % resolution) → no allocation per sample. install() wraps the
+# hot functions (SSD1306.show/_send_window, Motor.step/_step, _parse_packet,
+# store_km.save_odometer) and the scheduler jobs; nothing is timed until then.
+# dump() writes all histograms as text (REPL or a debug UART);
+# tools/profile_report.py turns a dump into p50/p99/max. Periodic dumps reset
+# the probes (main.py's stats job): a total that only grows passes 2^30 µs
+# after ~18 min of samples and becomes a bigint → every record() allocates.
+#
+# REPL:  import profiler; profiler.dump()
+# UART:  profiler.dump(uart)         (anything with write(str))
+# Stats: profiler.dump(reset=True)   (each dump covers one interval)
+
+from array import array
+import utime
+
+BUCKETS = 80               # Last bucket starts at 1.8 s (values above land there)
+DUMP_VERSION = 1
+
+
+def bucket_of(us):
+    """Histogram bucket of a duration: exact below 8 µs, then 4 per octave."""
+    if us < 8:
+        return us if us > 0 else 0
+    e = 0
+    while us >= 8:
+        us >>= 1
+        e += 1
+    idx = 4 * e + us
+    return idx if idx < BUCKETS else BUCKETS - 1
+
+
+def bucket_low(idx):
+    """Smallest duration (µs) that falls into bucket idx."""
+    if idx < 8:
+        return idx
+    e = idx // 4 - 1
+    return (idx % 4 + 4) << e
+
+
+def bucket_high(idx):
+    """Largest duration (µs) of bucket idx (the last bucket is open-ended)."""
+    return bucket_low(idx + 1) - 1
+
+
+class Probe:
+    """One measured site: histogram + count/total/max."""
+    __slots__ = ('name', 'hist', 'count', 'total', 'max', '_t0')
+
+    def __init__(self, name):
+        self.name = name
+        self.hist = array('L', [0] * BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._t0 = 0
+
+    def start(self):
+        self._t0 = utime.ticks_us()
+
+    def stop(self):
+        self.record(utime.ticks_diff(utime.ticks_us(), self._t0))
+
+    def record(self, us):
+        if us < 0:
+            us = 0
+        self.hist[bucket_of(us)] += 1
+        self.count += 1
+        self.total += us
+        if us > self.max:
+            self.max = us
+
+    def reset(self):
+        hist = self.hist
+        for i in range(BUCKETS):
+            hist[i] = 0
+        self.count = self.total = self.max = 0
+
+
+# --- Registry ---
+probes = {}                # name → Probe (created at install time)
+installed = False
+
+
+def probe(name):
+    p = probes.get(name)
+    if p is None:
+        p = probes[name] = Probe(name)
+    return p
+
+
+def reset():
+    for p in probes.values():
+        p.reset()
+
+
+def dump(out=None, reset=False):
+    """
+    Write all probes as text lines (print if out is None, else out.write);
+    reset: clear each probe once written.
+    """
+    def emit(line):
+        if out is None:
+            print(line)
+        else:
+            out.write(line + "\r\n")
+
+    emit(f"#PROFILE v{DUMP_VERSION} buckets={BUCKETS} t={utime.ticks_ms()}"
+         f"{' reset' if reset else ''}")
+    for p in probes.values():
+        parts = [f"P {p.name} {p.count} {p.total} {p.max}"]
+        hist = p.hist
+        for i in range(BUCKETS):
+            if hist[i]:
+                parts.append(f"{i}:{hist[i]}")
+        emit(" ".join(parts))
+        if reset:
+            p.reset()
+    emit("#END")
+
+
+# --- Hooks ---
+def _wrap_show(cls):
+    p = probe("ssd1306.show")
+    orig = cls.show
+
+    def show(self, x0=0, y0=0, x1=None, y1=None, full=False):
+        t0 = utime.ticks_us()
+        try:
+            return orig(self, x0, y0, x1, y1, full)
+        finally:
+            p.record(utime.ticks_diff(utime.ticks_us(), t0))
+    cls.show = show
+
+    pw = probe("ssd1306.window")
+    orig_window = cls._send_window
+
+    def _send_window(self, c0, c1, p0, p1):
+        t0 = utime.ticks_us()
+        try:
+            return orig_window(self, c0, c1, p0, p1)
+        finally:
+            pw.record(utime.ticks_diff(utime.ticks_us(), t0))
+    cls._send_window = _send_window
+
+
+def _wrap_motor(cls):
+    p = probe("motor.step")
+    orig = cls.step
+
+    def step(self, steps):
+        t0 = utime.ticks_us()
+        try:
+            return orig(self, steps)
+        finally:
+            p.record(utime.ticks_diff(utime.ticks_us(), t0))
+    cls.step = step
+
+    pp = probe("motor.phase")
+    orig_phase = cls._step
+
+    def _step(self, dir):
+        t0 = utime.ticks_us()
+        try:
+            return orig_phase(self, dir)
+        finally:
+            pp.record(utime.ticks_diff(utime.ticks_us(), t0))
+    cls._step = _step
+
+
+def _wrap_parse(cls):
+    p = probe("rs485.parse")
+    orig = cls._parse_packet
+
+    def _parse_packet(self, packet, record):
+        t0 = utime.ticks_us()
+        try:
+            return orig(self, packet, record)
+        finally:
+            p.record(utime.ticks_diff(utime.ticks_us(), t0))
+    cls._parse_packet = _parse_packet
+
+
+def _wrap_save(module):
+    p = probe("store_km.save")
+    orig = module.save_odometer
+
+    def save_odometer(total_pulses, trip_pulses, debug_print=None, final=False):
+        t0 = utime.ticks_us()
+        try:
+            return orig(total_pulses, trip_pulses, debug_print, final)
+        finally:
+            p.record(utime.ticks_diff(utime.ticks_us(), t0))
+    module.save_odometer = save_odometer
+
+
+def attach_scheduler(sched):
+    """Per job: 'job.<name>' execution time, 'late.<name>' release → start."""
+    for job in sched.jobs:
+        job.probe = probe("job." + job.name)
+        job.late_probe = probe("late." + job.name)
+
+
+def install(sched=None, debug_print=None):
+    """Wrap the hot functions once (before the objects are used) and the jobs."""
+    global installed
+    if not installed:
+        import ssd1306
+        import motor
+        import RS485_RX
+        import store_km
+        _wrap_show(ssd1306.SSD1306)
+        _wrap_motor(motor.Motor)
+        _wrap_parse(RS485_RX.CanBusController)
+        _wrap_save(store_km)
+        installed = True
+    if sched is not None:
+        attach_scheduler(sched)
+    if debug_print:
+        debug_print(f"Profiler: {len(probes)} probes installed", level=1)
@@ -1,30 +1,49 @@
 # pulsecounter.py
 # Async pulse counter for speed & distance calculation
-# Uses hardware interrupt + async timing, shared_data integration
+# Uses hardware interrupt + edge timestamps, shared_data integration
+# Speed from the period between wheel pulses (resolves city speeds even at
+# 1 pulse/rev), averaged over all edges of a window at high speed
 
 import uasyncio as asyncio
-from machine import Pin
+from machine import Pin, disable_irq, enable_irq
+from array import array
 import utime
+import debuglog
+from distance import PULSES_PER_REVOLUTION, WHEEL_CIRCUMFERENCE_MM, pulses_to_mm
 
 # --- Configuration ---
 PULSE_PIN_GPIO = 20          # GPIO for wheel sensor
-PULSES_PER_REVOLUTION = 1    # Adjust to your sensor
-WHEEL_CIRCUMFERENCE_MM = 1884  # e.g., 60 cm tire → 1884 mm
-MM_PER_KM = 1_000_000
+# Wheel: distance.PULSES_PER_REVOLUTION / WHEEL_CIRCUMFERENCE_MM
+DEBOUNCE_US = 1000           # Ignore edges closer than this
+EDGE_RING_SIZE = 8           # Edge timestamps kept by the ISR (power of two)
+COUNT_MODE_MIN_EDGES = 3     # ≥ this many edges per window → average their periods
+SPEED_TIMEOUT_MS = 2000      # No edge for this long → 0 km/h (~3.4 km/h at 1884 mm)
+# Smoothing: filters.CHANNEL_CONFIG['speed'] (applied in main block1)
+
+_EDGE_RING_MASK = EDGE_RING_SIZE - 1
+_MM_PER_PULSE = WHEEL_CIRCUMFERENCE_MM / PULSES_PER_REVOLUTION
+_KMH_US_PER_MM = 3600.0      # 1 mm/µs = 3600 km/h
+_SPEED_TIMEOUT_US = SPEED_TIMEOUT_MS * 1000
 
 # --- Global Variables ---
 pulse_count = 0
 last_pulse_time = 0
 last_calc_time = 0
+_edge_times = array('L', [0] * EDGE_RING_SIZE)   # Preallocated, written by the ISR
+_edge_total = 0              # Accepted edges since boot (ring index = total & mask)
+_last_edge_total = 0         # _edge_total at the previous calculation
+_period_us = 0               # Last measured pulse period (0 = unknown)
 
 def pulse_isr(pin):
-    """ISR: Count pulses from wheel sensor (rising edge)"""
-    global pulse_count, last_pulse_time
+    """ISR: Count pulses and timestamp edges from wheel sensor (rising edge)"""
+    global pulse_count, last_pulse_time, _edge_total
     current_time = utime.ticks_us()
-    # Simple debounce: ignore if < 1000 µs since last pulse
-    if utime.ticks_diff(current_time, last_pulse_time) > 1000:
+    # Simple debounce: ignore if < DEBOUNCE_US since last pulse
+    if utime.ticks_diff(current_time, last_pulse_time) > DEBOUNCE_US:
         pulse_count += 1
         last_pulse_time = current_time
+        _edge_times[_edge_total & _EDGE_RING_MASK] = current_time
+        _edge_total += 1
 
 def init(shared_data):
     """Initialize pulse input with interrupt"""
@@ -34,38 +53,73 @@ def init(shared_data):
     last_calc_time = utime.ticks_ms()
     shared_data.debug_print("Pulse counter initialized on GPIO 20.", level=1)
 
+def _measure_period(total, new_edges):
+    """
+    Pulse period in µs from the edge ring, or 0 if unknown.
+    Many edges in this window → average over them (counting mode),
+    otherwise the time between the last two edges (period mode).
+    """
+    if total < 2:
+        return 0
+    periods = new_edges if new_edges < EDGE_RING_SIZE else EDGE_RING_SIZE - 1
+    if periods < COUNT_MODE_MIN_EDGES:
+        periods = 1
+    if periods > total - 1:
+        periods = total - 1
+    t_last = _edge_times[(total - 1) & _EDGE_RING_MASK]
+    t_first = _edge_times[(total - 1 - periods) & _EDGE_RING_MASK]
+    span = utime.ticks_diff(t_last, t_first)
+    if span <= 0 or span > _SPEED_TIMEOUT_US * periods:
+        return 0                 # First edge after a stop: no valid period yet
+    return span // periods
+
 async def calculate_speed_and_distance(shared_data):
     """
-    Async task: Calculate speed (km/h) and distance increment (km)
-    Called periodically from main loop
+    Async task: Calculate unfiltered speed (km/h) and distance increment
+    (whole pulses, see distance.py). Called periodically from main loop
     """
-    global pulse_count, last_pulse_time, last_calc_time
+    global pulse_count, last_calc_time, _last_edge_total, _period_us
 
     current_time = utime.ticks_ms()
     time_diff_ms = utime.ticks_diff(current_time, last_calc_time)
     if time_diff_ms <= 0:
         await asyncio.sleep_ms(10)
-        return 0.0, 0.0
+        return speed_kmh(), 0
 
     # Capture and reset pulse count atomically
+    state = disable_irq()
     pulses = pulse_count
     pulse_count = 0
+    total = _edge_total
+    last_edge = last_pulse_time
+    enable_irq(state)
     last_calc_time = current_time
 
-    if pulses == 0:
-        # No pulses → speed = 0
-        return 0.0, 0.0
-
-    # --- Calculate distance ---
-    distance_mm = pulses * WHEEL_CIRCUMFERENCE_MM / PULSES_PER_REVOLUTION
-    distance_km = distance_mm / MM_PER_KM
+    new_edges = total - _last_edge_total
+    _last_edge_total = total
+    if new_edges:
+        period = _measure_period(total, new_edges)
+        if period:
+            _period_us = period
 
     # --- Calculate speed ---
-    time_diff_sec = time_diff_ms / 1000.0
-    speed_kmh = (distance_km / time_diff_sec) * 3600.0 if time_diff_sec > 0 else 0.0
+    if utime.ticks_diff(utime.ticks_us(), last_edge) > _SPEED_TIMEOUT_US:
+        _period_us = 0           # Stopped: clean zero, restart needs two fresh edges
+    speed = speed_kmh(last_edge)
 
     # Debug output (only if speed changed significantly)
-    if abs(speed_kmh - shared_data.speed) > 0.5:
-        shared_data.debug_print(f"Speed: {speed_kmh:.1f} km/h, +{distance_km:.6f} km", level=2)
+    if debuglog.level >= 2 and abs(speed - shared_data.speed) > 0.5:
+        debuglog.event(2, debuglog.SPEED, int(speed * 10), pulses_to_mm(pulses))
+
+    return speed, pulses
 
-    return speed_kmh, distance_km
\ No newline at end of file
+def speed_kmh(last_edge=None):
+    """Speed from the last period; bounded by the time since the last edge."""
+    if _period_us == 0:
+        return 0.0
+    if last_edge is None:
+        last_edge = last_pulse_time
+    # Waiting longer than one period → the vehicle is at most this fast
+    since_edge = utime.ticks_diff(utime.ticks_us(), last_edge)
+    period = _period_us if _period_us > since_edge else since_edge
+    return _MM_PER_PULSE * _KMH_US_PER_MM / period
@@ -4,6 +4,7 @@
 
 from machine import Pin, PWM
 import utime
+import debuglog
 
 # --- Configuration ---
 RPM_PIN = 15
@@ -13,6 +14,7 @@ MAX_RPM = 8000
 
 # --- Global PWM ---
 pwm = None
+_last_logged_rpm = 0
 
 def init(debug_print):
     """Initialize PWM output for RPM"""
@@ -22,21 +24,26 @@ def init(debug_print):
     pwm.duty_u16(0)
     debug_print("RPM PWM output initialized on GPIO 15.")
 
+def off():
+    """Output to 0 % duty (powerfail shed list)."""
+    if pwm:
+        pwm.duty_u16(0)
+
 def set_rpm_output(rpm, debug_func=None):
     """
     Set PWM duty cycle based on RPM
     0 RPM → 0% duty, MAX_RPM → 100% duty
     """
-    global pwm
+    global _last_logged_rpm
+    rpm = int(rpm)
     if rpm < MIN_RPM:
         rpm = MIN_RPM
     elif rpm > MAX_RPM:
         rpm = MAX_RPM
 
-    duty_percent = (rpm / MAX_RPM) * 100
-    duty_u16 = int((duty_percent / 100) * 65535)
-    pwm.duty_u16(duty_u16)
+    # Integer math: called every pointer tick, floats would allocate each time
+    pwm.duty_u16(rpm * 65535 // MAX_RPM)
 
-    if debug_func and abs(rpm - getattr(set_rpm_output, 'last_rpm', 0)) > 50:
-        debug_func(f"RPM output: {rpm} → {duty_percent:.1f}% duty")
-        set_rpm_output.last_rpm = rpm
\ No newline at end of file
+    if debuglog.level >= 1 and debug_func and abs(rpm - _last_logged_rpm) > 50:
+        debuglog.event(1, debuglog.RPM_OUT, rpm, rpm * 1000 // MAX_RPM)
+        _last_logged_rpm = rpm
\ No newline at end of file
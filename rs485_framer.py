@@ -0,0 +1,164 @@
+# rs485_framer.py
+# Zero-copy ring-buffer framer for the RS485 telemetry stream
+# Preallocated circular buffer, readinto() from the UART, one-pass resync
+# Pure Python (no machine import) → also runs on the host for benchmarks
+
+try:
+    from micropython import const
+except ImportError:                # CPython host
+    def const(x):
+        return x
+
+# --- Frame layout ---
+# [0] START | [1..14] payload | [15] XOR checksum of [1..14] | [16] END
+PACKET_LENGTH = const(17)
+START_BYTE = const(0xAA)
+END_BYTE = const(0x55)
+CHECKSUM_INDEX = const(15)
+
+RX_RING_SIZE = const(256)          # Must be a power of two (index masking)
+
+
+def calculate_checksum(data):
+    checksum = 0
+    for byte in data:
+        checksum ^= byte
+    return checksum
+
+
+class RingFramer:
+    """
+    Circular receive buffer with in-place frame detection.
+    No per-frame or per-resync allocation: bytes are read into the ring,
+    validated by index arithmetic and copied into one reusable frame buffer.
+    """
+
+    def __init__(self, size=RX_RING_SIZE):
+        if size & (size - 1) or size < PACKET_LENGTH:
+            raise ValueError("Ring size must be a power of two >= PACKET_LENGTH")
+        self.buf = bytearray(size)
+        self._mv = memoryview(self.buf)
+        self._size = size
+        self._mask = size - 1
+        self._head = 0                      # Index of oldest unread byte
+        self._count = 0                     # Number of unread bytes
+        self.frame = bytearray(PACKET_LENGTH)
+
+        # Statistics
+        self.frames = 0                     # Valid frames delivered
+        self.skipped_bytes = 0              # Garbage bytes before a start byte
+        self.bad_frames = 0                 # Start byte found, but END/checksum wrong
+        self.overruns = 0                   # Reads/feeds refused because the ring was full
+
+    def __len__(self):
+        return self._count
+
+    def free(self):
+        return self._size - self._count
+
+    def reset(self):
+        self._head = 0
+        self._count = 0
+
+    # --- Input ---
+    def write_region(self, limit=None):
+        """
+        Memoryview of the largest contiguous free region of the ring
+        (None if the ring is full). Fill it, then call commit(n).
+        :param limit: Optional max byte count
+        """
+        free = self._size - self._count
+        if free == 0:
+            self.overruns += 1
+            return None
+        tail = (self._head + self._count) & self._mask
+        n = self._size - tail
+        if n > free:
+            n = free
+        if limit is not None and n > limit:
+            n = limit
+        return self._mv[tail:tail + n]
+
+    def commit(self, n):
+        """Mark n bytes of the last write_region() as received."""
+        if n:
+            self._count += n
+
+    def fill_from(self, stream, limit=None):
+        """
+        readinto() the largest contiguous free region of the ring.
+        :param limit: Optional max byte count (e.g. uart.any(), so a blocking
+                      UART never waits for bytes that have not arrived yet)
+        Returns the number of bytes read (0 if ring full or nothing available).
+        """
+        region = self.write_region(limit)
+        if region is None:
+            return 0
+        got = stream.readinto(region)
+        if not got:
+            return 0
+        self._count += got
+        return got
+
+    def feed(self, data):
+        """Copy bytes into the ring (host benchmarks, replayed captures)."""
+        mask = self._mask
+        tail = (self._head + self._count) & mask
+        written = 0
+        for b in data:
+            if self._count == self._size:
+                self.overruns += 1
+                break
+            self.buf[tail] = b
+            tail = (tail + 1) & mask
+            self._count += 1
+            written += 1
+        return written
+
+    # --- Framing ---
+    def next_frame(self):
+        """
+        Return the reusable frame buffer filled with the next valid packet,
+        or None if no complete valid packet is buffered.
+        The returned buffer is overwritten by the next call.
+        """
+        buf = self.buf
+        mask = self._mask
+        while True:
+            # One pass over garbage: advance head to the next start byte
+            head = self._head
+            count = self._count
+            skipped = 0
+            while count and buf[head] != START_BYTE:
+                head = (head + 1) & mask
+                count -= 1
+                skipped += 1
+            if skipped:
+                self._head = head
+                self._count = count
+                self.skipped_bytes += skipped
+
+            if count < PACKET_LENGTH:
+                return None
+
+            if buf[(head + PACKET_LENGTH - 1) & mask] == END_BYTE:
+                checksum = 0
+                i = (head + 1) & mask
+                for _ in range(CHECKSUM_INDEX - 1):
+                    checksum ^= buf[i]
+                    i = (i + 1) & mask
+                if checksum == buf[i]:
+                    frame = self.frame
+                    i = head
+                    for j in range(PACKET_LENGTH):
+                        frame[j] = buf[i]
+                        i = (i + 1) & mask
+                    self._head = i
+                    self._count = count - PACKET_LENGTH
+                    self.frames += 1
+                    return frame
+
+            # False start byte: drop it and rescan
+            self.bad_frames += 1
+            self._head = (head + 1) & mask
+            self._count = count - 1
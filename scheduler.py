@@ -0,0 +1,176 @@
+# scheduler.py
+# Declarative rate-monotonic job scheduler on top of uasyncio
+# Each job = async body + period + priority + relative deadline. Releases are
+# absolute (release += period) → no drift from "sleep, then re-check elapsed".
+# Non-preemptive: a job starts only when no higher-priority job is released
+# and waiting, and waits for an imminent one if its own deadline allows.
+# Sporadic jobs (period 0) are released by an awaitable trigger (e.g. a queue).
+# Per-job stats: runs, release jitter, execution time, deadline overruns,
+# skipped periods, errors (+ histograms via profiler.attach_scheduler,
+# allocations per run via memory.attach_scheduler)
+
+import uasyncio as asyncio
+import utime
+
+
+class Job:
+    __slots__ = ('name', 'fn', 'period_us', 'priority', 'deadline_us', 'trigger',
+                 'release', 'running', 'probe', 'late_probe', 'alloc', 'runs', 'missed', 'overruns', 'errors', 'yields',
+                 'jitter_max_us', 'jitter_total_us',
+                 'exec_last_us', 'exec_max_us', 'exec_total_us')
+
+    def __init__(self, name, fn, period_us, priority, deadline_us, trigger):
+        self.name = name
+        self.fn = fn
+        self.period_us = period_us
+        self.priority = priority           # Lower number = more urgent
+        self.deadline_us = deadline_us     # Release → completion
+        self.trigger = trigger
+        self.release = utime.ticks_us()
+        self.running = False
+        self.probe = None                  # profiler.Probe: execution time
+        self.late_probe = None             # profiler.Probe: release → start
+        self.alloc = None                  # memory.AllocBudget: bytes allocated per run
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.runs = 0
+        self.missed = 0                    # Periods skipped (job ran late by > 1 period)
+        self.overruns = 0                  # Completed after its deadline
+        self.errors = 0
+        self.yields = 0                    # Start postponed for a higher-priority job
+        self.jitter_max_us = 0
+        self.jitter_total_us = 0
+        self.exec_last_us = 0
+        self.exec_max_us = 0
+        self.exec_total_us = 0
+
+
+class Scheduler:
+    """
+    add() the jobs, then start() (creates one uasyncio task per job).
+    Priority defaults to rate-monotonic order (shorter period = more urgent).
+    """
+
+    def __init__(self, debug_print=None):
+        self.debug_print = debug_print or (lambda *args, **kwargs: None)
+        self.jobs = []
+
+    def add(self, name, fn, period_ms=0, priority=None, deadline_ms=None, offset_ms=0,
+            trigger=None):
+        """
+        Register `fn` (async, no arguments). period_ms=0 → sporadic, released
+        by `await trigger()`. deadline_ms defaults to the period.
+        """
+        if not period_ms and trigger is None:
+            raise ValueError(f"Job {name}: needs a period or a trigger")
+        if priority is None:
+            priority = period_ms if period_ms else 0
+        if deadline_ms is None:
+            deadline_ms = period_ms
+        job = Job(name, fn, period_ms * 1000, priority, deadline_ms * 1000, trigger)
+        job.release = utime.ticks_add(utime.ticks_us(), offset_ms * 1000)
+        self.jobs.append(job)
+        return job
+
+    def start(self):
+        self.jobs.sort(key=lambda j: j.priority)
+        now = utime.ticks_us()
+        for job in self.jobs:
+            if job.period_us:
+                # Offsets are relative to start(), not to add()
+                job.release = utime.ticks_add(now, max(0, utime.ticks_diff(job.release, now)))
+                asyncio.create_task(self._run_periodic(job))
+            else:
+                asyncio.create_task(self._run_sporadic(job))
+
+    # --- Job loops ---
+    async def _run_periodic(self, job):
+        period = job.period_us
+        while True:
+            delay = utime.ticks_diff(job.release, utime.ticks_us())
+            if delay > 0:
+                await asyncio.sleep_ms((delay + 999) // 1000)
+            await self._wait_turn(job)
+            await self._execute(job)
+            # Next absolute release; skip whole periods if we fell behind
+            job.release = utime.ticks_add(job.release, period)
+            late = utime.ticks_diff(utime.ticks_us(), job.release)
+            if late >= period:
+                skipped = late // period
+                job.missed += skipped
+                job.release = utime.ticks_add(job.release, skipped * period)
+
+    async def _run_sporadic(self, job):
+        while True:
+            await job.trigger()
+            job.release = utime.ticks_us()
+            await self._wait_turn(job)
+            await self._execute(job)
+
+    async def _wait_turn(self, job):
+        """Yield to released higher-priority jobs; start after imminent ones if slack allows."""
+        while True:
+            now = utime.ticks_us()
+            slack = job.deadline_us - utime.ticks_diff(now, job.release) - job.exec_max_us
+            wait_us = -1
+            for other in self.jobs:
+                if other.priority >= job.priority:
+                    break                  # Sorted by priority
+                if other.running or not other.period_us:
+                    continue
+                left = utime.ticks_diff(other.release, now)
+                if left <= 0:
+                    wait_us = 0            # Released, not started → let it go first
+                    break
+                # Would run into it → start after it (not for a job released
+                # again before we could finish: waiting never gets us a gap)
+                if (left < job.exec_max_us and left < slack and left > wait_us
+                        and other.period_us > job.exec_max_us):
+                    wait_us = left
+            if wait_us < 0:
+                return
+            job.yields += 1
+            await asyncio.sleep_ms(wait_us // 1000 + 1 if wait_us else 0)
+
+    async def _execute(self, job):
+        job.running = True
+        start = utime.ticks_us()
+        jitter = utime.ticks_diff(start, job.release)
+        if job.alloc is not None:
+            job.alloc.start()
+        try:
+            await job.fn()
+        except Exception as e:
+            job.errors += 1
+            self.debug_print(f"ERROR in job {job.name}: {e}", level=0)
+        finally:
+            job.running = False
+        if job.alloc is not None:
+            job.alloc.stop()
+        end = utime.ticks_us()
+        t = utime.ticks_diff(end, start)
+        job.runs += 1
+        job.exec_last_us = t
+        job.exec_total_us += t
+        if t > job.exec_max_us:
+            job.exec_max_us = t
+        if jitter > job.jitter_max_us:
+            job.jitter_max_us = jitter
+        job.jitter_total_us += jitter
+        if utime.ticks_diff(end, job.release) > job.deadline_us:
+            job.overruns += 1
+        if job.probe is not None:
+            job.probe.record(t)
+            job.late_probe.record(jitter)
+
+    # --- Stats ---
+    def report(self, level=2, reset=False):
+        for job in self.jobs:
+            n = job.runs or 1
+            self.debug_print(f"Job {job.name}: n={job.runs} exec mean={job.exec_total_us // n} "
+                             f"max={job.exec_max_us} us jitter mean={job.jitter_total_us // n} "
+                             f"max={job.jitter_max_us} us overrun={job.overruns} "
+                             f"missed={job.missed} yield={job.yields} err={job.errors}", level=level)
+            if reset:
+                job.reset_stats()
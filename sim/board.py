@@ -0,0 +1,298 @@
+# sim/board.py
+# The simulated board: what is wired to the RP2040 pins
+# machine/rp2 stand-ins look their peripherals up here, so a run can set up
+# the outside world before main.py creates its drivers:
+#   - SSD1306 panel models on I2C buses (by SCL/SDA pair), optional TCA9548A
+#   - ADC inputs (a value or a function of device time)
+#   - input signals: a wheel-pulse source from a speed profile, the button
+#   - UART receive data: recorded RS485 captures replayed at line rate
+#   - flash contents (sim/vfs.py) kept across simulated reboots
+# Everything driven by the firmware is recorded: pin edges (per traced GPIO),
+# PWM settings, I2C traffic per bus, watchdog feeds.
+
+from simclock import clock
+from oled import RecordingI2C, SSD1306Panel
+
+MUX_ADDR = 0x70
+
+
+class Tca9548a:
+    """I2C mux model: one control byte selects the downstream channels."""
+
+    def __init__(self):
+        self.mask = 0
+        self.channels = {}                 # channel → {addr: device}
+
+    def write(self, buf):
+        if buf:
+            self.mask = buf[-1]
+
+    def attach(self, channel, addr, device):
+        self.channels.setdefault(channel, {})[addr] = device
+        return device
+
+    def route(self, addr):
+        for channel, devices in self.channels.items():
+            if self.mask & (1 << channel) and addr in devices:
+                return devices[addr]
+        return None
+
+
+class SimBus(RecordingI2C):
+    """
+    RecordingI2C plus mux routing and wire time: every transaction advances
+    the device clock by its duration at `freq` (the CPU waits for the
+    hardware controller; SoftI2C bit-banging takes at least as long).
+    """
+
+    def __init__(self, scl, sda, freq=400_000):
+        super().__init__(freq)
+        self.scl = scl
+        self.sda = sda
+        self.mux = None
+        self.timed = True
+
+    def add_mux(self, addr=MUX_ADDR):
+        self.mux = self.attach(addr, Tca9548a())
+        return self.mux
+
+    def _deliver(self, addr, data):
+        device = self.devices.get(addr)
+        if device is None and self.mux is not None:
+            device = self.mux.route(addr)
+        if device is None:
+            raise OSError(19)              # ENODEV, like a missing ACK
+        self.transactions += 1
+        self.bytes += 1 + len(data)
+        if self.log is not None:
+            self.log.append((clock.now_us(), addr, bytes(data)))
+        with clock.excluded():
+            device.write(data)
+        if self.timed:
+            clock.advance(((1 + len(data)) * 9 + 2) * 1_000_000 // self.freq)
+
+    def scan(self):
+        found = set(self.devices)
+        if self.mux is not None:
+            for devices in self.mux.channels.values():
+                found.update(devices)
+        return sorted(found)
+
+
+class Board:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Power-on state: no peripherals, no signals (flash survives: see erase_flash)."""
+        self.pins = {}                     # gpio → machine.Pin (one object per GPIO)
+        self.pwms = {}                     # gpio → machine.PWM
+        self.buses = {}                    # (scl, sda) → SimBus
+        self.uarts = {}                    # id → machine.UART
+        self.uart_rx = {}                  # id → pending UartSource before the UART exists
+        self.adc = {}                      # gpio → value (0..65535) or fn(t_us)
+        self.state_machines = {}           # id → rp2.StateMachine
+        self.timers = []
+        self.traced = set()                # GPIOs whose edges are recorded
+        self.wdt = None
+        self.resets = 0
+        if not hasattr(self, "flash"):
+            self.erase_flash()
+
+    def erase_flash(self):
+        self.flash = {"formatted": False, "files": {}, "stats": {}}
+
+    # --- Displays ---
+    def bus(self, scl, sda, freq=400_000):
+        key = (scl, sda)
+        bus = self.buses.get(key)
+        if bus is None:
+            bus = self.buses[key] = SimBus(scl, sda, freq)
+        return bus
+
+    def add_panel(self, scl, sda, width, height, addr=0x3C, mux_channel=None):
+        panel = SSD1306Panel(width, height)
+        bus = self.bus(scl, sda)
+        if mux_channel is None:
+            bus.attach(addr, panel)
+        else:
+            mux = bus.mux or bus.add_mux()
+            mux.attach(mux_channel, addr, panel)
+        return panel
+
+    # --- Inputs ---
+    def set_adc(self, gpio, value):
+        """Constant raw value (read_u16 scale) or fn(t_us) → raw."""
+        self.adc[gpio] = value
+
+    def read_adc(self, gpio):
+        value = self.adc.get(gpio, 0)
+        if callable(value):
+            value = value(clock.now_us())
+        return max(0, min(int(value), 65535))
+
+    def pin(self, gpio):
+        import machine
+        return machine.Pin(gpio)
+
+    def trace(self, *gpios):
+        """Record (t_us, value) for every change of these GPIOs (pin.trace)."""
+        self.traced.update(gpios)
+        for gpio in gpios:
+            if gpio in self.pins:
+                self.pins[gpio].trace = []
+
+    def uart_source(self, uart_id, source):
+        uart = self.uarts.get(uart_id)
+        if uart is not None:
+            source.start(uart)
+        else:
+            self.uart_rx[uart_id] = source
+
+    # --- Outputs ---
+    def sync(self):
+        """Apply PIO pin changes up to now (they are computed ahead)."""
+        for sm in self.state_machines.values():
+            sm._sync(clock.now_us())
+
+    def report(self):
+        lines = []
+        for (scl, sda), bus in sorted(self.buses.items()):
+            lines.append(f"I2C SCL {scl}/SDA {sda} @ {bus.freq // 1000} kHz: {bus.transactions} tx, "
+                         f"{bus.bytes} B, wire {bus.wire_time_us() // 1000} ms")
+        for gpio, pwm in sorted(self.pwms.items()):
+            lines.append(f"PWM GPIO {gpio}: {pwm._freq} Hz duty {pwm._duty_u16}/65535 "
+                         f"({len(pwm.history)} changes)")
+        for sm_id, sm in sorted(self.state_machines.items()):
+            lines.append(f"PIO SM{sm_id}: {sm.words} words, {sm.steps} pin writes")
+        if self.wdt is not None:
+            w = self.wdt
+            lines.append(f"WDT {w.timeout_ms} ms: {w.feeds} feeds, longest gap {w.max_gap_us // 1000} ms"
+                         f"{' → EXPIRED' if w.expired else ''}")
+        for gpio, pin in sorted(self.pins.items()):
+            if len(pin.modes) > 1:
+                modes = "/".join(("IN", "OUT", "OD", "ALT")[m] for m in pin.modes)
+                lines.append(f"GPIO {gpio}: configured {len(pin.modes)} times ({modes}) – shared by two drivers?")
+        return lines
+
+
+board = Board()
+
+
+# --- Signal sources (asyncio tasks on the sim loop) ---
+def constant(kmh):
+    return lambda t_s: kmh
+
+
+def ramp(points):
+    """Piecewise-linear speed profile [(t_s, km/h), ...] (held after the last point)."""
+    points = sorted(points)
+
+    def profile(t_s):
+        if t_s <= points[0][0]:
+            return points[0][1]
+        for (t0, v0), (t1, v1) in zip(points, points[1:]):
+            if t_s < t1:
+                return v0 + (v1 - v0) * (t_s - t0) / (t1 - t0)
+        return points[-1][1]
+    return profile
+
+
+class PulseSource:
+    """
+    Wheel sensor on `gpio` (open collector against the pull-up): low for
+    `width_us`, then the rising edge, once per (circumference / pulses per
+    rev) travelled at profile(t_s) km/h. Edge times are integrated from the
+    profile, so speed changes are continuous.
+    """
+
+    STEP_S = 0.01                          # Integration step while below one pulse
+
+    def __init__(self, gpio, profile, mm_per_pulse, width_us=500):
+        self.gpio = gpio
+        self.profile = profile
+        self.mm_per_pulse = mm_per_pulse
+        self.width_us = width_us
+        self.edges = []                    # Device times (µs) of the rising edges
+        self.task = None
+
+    def start(self):
+        import uasyncio
+        self.task = uasyncio.create_task(self._run())
+        return self
+
+    async def _run(self):
+        import uasyncio
+        pin = board.pin(self.gpio)
+        travelled = 0.0                    # mm since the last edge
+        while True:
+            t = clock.now_us()
+            kmh = self.profile(t / 1_000_000)
+            mm_per_us = kmh / 3600.0 if kmh > 0 else 0.0
+            left = self.mm_per_pulse - travelled
+            if mm_per_us <= 0 or left / mm_per_us > self.STEP_S * 1_000_000:
+                travelled += mm_per_us * self.STEP_S * 1_000_000
+                await uasyncio.sleep(self.STEP_S)
+                continue
+            await uasyncio.sleep(left / mm_per_us / 1_000_000)
+            travelled = 0.0
+            pin.drive(0)
+            await uasyncio.sleep(self.width_us / 1_000_000)
+            self.edges.append(clock.now_us())
+            pin.drive(1)
+
+
+class UartSource:
+    """
+    Bytes for a sim UART: a recorded capture (raw bytes) replayed at line rate
+    (10 bits per byte at `baudrate`), or frames sent every `interval_ms`.
+    frames: iterable of bytes objects; a plain bytes capture is split in
+    `chunk`-byte pieces. loop=True repeats the capture.
+    """
+
+    def __init__(self, data, baudrate=115200, interval_ms=None, chunk=16, loop=False):
+        if isinstance(data, (bytes, bytearray)):
+            data = [bytes(data[i:i + chunk]) for i in range(0, len(data), chunk)]
+        self.frames = list(data)
+        self.byte_us = 10_000_000 // baudrate
+        self.interval_ms = interval_ms
+        self.loop = loop
+        self.sent = []                     # (t_us, frame index) when the last byte arrived
+        self.task = None
+
+    def start(self, uart):
+        import uasyncio
+        self.task = uasyncio.create_task(self._run(uart))
+        return self
+
+    async def _run(self, uart):
+        import uasyncio
+        while True:
+            for i, frame in enumerate(self.frames):
+                start = clock.now_us()
+                await uasyncio.sleep(len(frame) * self.byte_us / 1_000_000)
+                uart.feed(frame)
+                self.sent.append((clock.now_us(), i))
+                if self.interval_ms is not None:
+                    left = self.interval_ms * 1000 - (clock.now_us() - start)
+                    if left > 0:
+                        await uasyncio.sleep(left / 1_000_000)
+            if not self.loop:
+                return
+
+
+def press_button(gpio, hold_ms, at_s=None):
+    """Pull the (pull-up) button input low for hold_ms, now or at device time at_s."""
+    import uasyncio
+
+    async def press():
+        if at_s is not None:
+            delay = at_s - clock.now_us() / 1_000_000
+            if delay > 0:
+                await uasyncio.sleep(delay)
+        pin = board.pin(gpio)
+        pin.drive(0)
+        await uasyncio.sleep(hold_ms / 1000)
+        pin.drive(1)
+
+    return uasyncio.create_task(press())
@@ -0,0 +1,125 @@
+# sim/framebuf.py
+# Host stand-in for the MicroPython `framebuf` module (MONO_VLSB only)
+# Pure Python, pixel exact for fill/rect/line/blit; text() uses a generated
+# 8x8 pattern per character (not the firmware font, but stable, so diffs
+# and byte counts behave like on the device)
+# blit() also takes a (buffer, width, height, format[, stride]) source like
+# MicroPython >= 1.20, whose buffer may be read-only (bytes)
+
+MONO_VLSB = 0
+MONO_HLSB = 3
+MONO_HMSB = 4
+
+
+def _glyph_8x8(char):
+    """Deterministic 8x8 column pattern for `char` (row 7 blank like the real font)."""
+    code = ord(char)
+    if char == ' ':
+        return bytes(8)
+    cols = bytearray(8)
+    state = code * 2654435761 & 0xFFFFFFFF
+    for i in range(1, 7):
+        state = (state * 1103515245 + 12345) & 0xFFFFFFFF
+        cols[i] = (state >> 16) & 0x7E
+    return bytes(cols)
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format=MONO_VLSB, stride=None):
+        if format != MONO_VLSB:
+            raise ValueError("sim framebuf: only MONO_VLSB supported")
+        self._buf = buffer
+        self._w = width
+        self._h = height
+        self._stride = stride or width
+        if len(buffer) < self._stride * ((height + 7) // 8):
+            raise ValueError("buffer too small")
+
+    # --- Pixels ---
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self._w and 0 <= y < self._h):
+            return None if c is not None else 0
+        i = (y >> 3) * self._stride + x
+        m = 1 << (y & 7)
+        if c is None:
+            return 1 if self._buf[i] & m else 0
+        if c:
+            self._buf[i] |= m
+        else:
+            self._buf[i] &= ~m & 0xFF
+
+    def fill(self, c):
+        v = 0xFF if c else 0
+        for i in range(self._stride * ((self._h + 7) // 8)):
+            self._buf[i] = v
+
+    def fill_rect(self, x, y, w, h, c):
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self._w)
+        y1 = min(y + h, self._h)
+        for yy in range(y0, y1):
+            for xx in range(x0, x1):
+                self.pixel(xx, yy, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def line(self, x0, y0, x1, y1, c):
+        dx = abs(x1 - x0)
+        dy = -abs(y1 - y0)
+        sx = 1 if x0 < x1 else -1
+        sy = 1 if y0 < y1 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x0, y0, c)
+            if x0 == x1 and y0 == y1:
+                return
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x0 += sx
+            if e2 <= dx:
+                err += dx
+                y0 += sy
+
+    # --- Composition ---
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        if isinstance(fbuf, (tuple, list)):
+            fbuf = FrameBuffer(*fbuf)
+        for yy in range(fbuf._h):
+            ty = y + yy
+            if not 0 <= ty < self._h:
+                continue
+            for xx in range(fbuf._w):
+                tx = x + xx
+                if not 0 <= tx < self._w:
+                    continue
+                c = fbuf.pixel(xx, yy)
+                if c != key:
+                    self.pixel(tx, ty, c)
+
+    def scroll(self, xstep, ystep):
+        src = FrameBuffer(bytearray(self._buf), self._w, self._h, MONO_VLSB, self._stride)
+        self.blit(src, xstep, ystep)
+
+    def text(self, s, x, y, c=1):
+        for n, char in enumerate(s):
+            cols = _glyph_8x8(char)
+            for i in range(8):
+                bits = cols[i]
+                for j in range(8):
+                    if bits & (1 << j):
+                        self.pixel(x + 8 * n + i, y + j, c)
@@ -0,0 +1,328 @@
+# sim/machine.py
+# Host stand-in for the MicroPython `machine` module (RP2040 port subset)
+# Peripherals are backed by sim/board.py: one Pin object per GPIO (so an IRQ
+# handler sees the value an input source drives), PWM/Pin outputs recorded,
+# I2C on the board's SSD1306 models, UART fed by board UART sources, ADC from
+# board values, Timer callbacks on the uasyncio loop, WDT feed gaps tracked.
+#
+# Not modelled: the pad itself – writing an output does not fire that GPIO's
+# IRQ (the board report lists GPIOs configured more than once), and IRQ
+# handlers run between tasks instead of between bytecodes.
+
+from simclock import clock
+from board import board
+
+
+class SimReset(BaseException):
+    """machine.reset() / watchdog: ends the simulated run (runner reboots if asked)."""
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __new__(cls, id, mode=-1, pull=-1, value=None):
+        if isinstance(id, Pin):
+            id = id.id                     # Pin(pin) is allowed, same GPIO
+        pin = board.pins.get(id)
+        if pin is None:
+            pin = super().__new__(cls)
+            pin.id = id
+            pin.mode = None
+            pin.modes = []                 # Every explicit mode set (shared GPIOs show up twice)
+            pin.pull = None
+            pin._value = 0
+            pin._handler = None
+            pin._trigger = 0
+            pin.edges = 0
+            pin.trace = [] if id in board.traced else None
+            board.pins[id] = pin
+        return pin
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.init(mode, pull, value)
+
+    def __repr__(self):
+        return f"Pin({self.id})"
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+            self.modes.append(mode)
+        if pull != -1:
+            self.pull = pull
+            if pull == Pin.PULL_UP and self.mode == Pin.IN:
+                self._value = 1
+        if value is not None:
+            self._set(value)
+
+    def value(self, val=None):
+        if val is None:
+            return self._value
+        self._set(val)
+
+    def __call__(self, val=None):
+        return self.value(val)
+
+    def on(self):
+        self._set(1)
+
+    def off(self):
+        self._set(0)
+
+    def high(self):
+        self._set(1)
+
+    def low(self):
+        self._set(0)
+
+    def toggle(self):
+        self._set(1 - self._value)
+
+    def _set(self, val, t_us=None):
+        val = 1 if val else 0
+        if val == self._value:
+            return
+        self._value = val
+        self.edges += 1
+        if self.trace is not None:
+            self.trace.append((clock.now_us() if t_us is None else t_us, val))
+
+    def drive(self, val):
+        """Outside world drives the input: value change + IRQ per trigger."""
+        old = self._value
+        self._set(val)
+        if self._handler is None or val == old:
+            return
+        if (val and self._trigger & Pin.IRQ_RISING) or (not val and self._trigger & Pin.IRQ_FALLING):
+            self._handler(self)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+
+class PWM:
+    def __init__(self, pin, freq=0, duty_u16=0):
+        self.pin = pin
+        self._freq = freq
+        self._duty_u16 = duty_u16
+        self.history = []                  # (t_us, duty_u16) per change
+        board.pwms[pin.id] = self
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self._duty_u16
+        value = int(value)
+        if value != self._duty_u16:
+            self._duty_u16 = value
+            self.history.append((clock.now_us(), value))
+            self.pin._set(value > 0)
+
+    def duty_ns(self, value=None):
+        period_ns = 1_000_000_000 // self._freq if self._freq else 0
+        if value is None:
+            return self._duty_u16 * period_ns // 65535
+        self.duty_u16(value * 65535 // period_ns if period_ns else 0)
+
+    def deinit(self):
+        self.duty_u16(0)
+
+
+class I2C:
+    """Hardware controller: the board bus on these pins (SSD1306 models attached there)."""
+
+    def __init__(self, id=0, scl=None, sda=None, freq=400_000, timeout=50000):
+        self.id = id
+        self.bus = board.bus(scl.id if scl is not None else -1, sda.id if sda is not None else -1)
+        self.bus.freq = freq
+
+    def writeto(self, addr, buf, stop=True):
+        return self.bus.writeto(addr, buf, stop)
+
+    def writevto(self, addr, vector, stop=True):
+        return self.bus.writevto(addr, vector, stop)
+
+    def scan(self):
+        return self.bus.scan()
+
+
+class SoftI2C(I2C):
+    def __init__(self, scl, sda, freq=400_000, timeout=50000):
+        super().__init__(-1, scl, sda, freq)
+
+
+class UART:
+    """RX buffer filled by board.UartSource (feed()); TX bytes are kept in `sent`."""
+
+    def __init__(self, id, baudrate=9600, bits=8, parity=None, stop=1, tx=None, rx=None,
+                 timeout=0, timeout_char=0, rxbuf=256):
+        self.id = id
+        self.baudrate = baudrate
+        self.rxbuf = rxbuf
+        self._rx = bytearray()
+        self._readable = None
+        self.overruns = 0                  # Bytes lost to a full RX buffer
+        self.sent = bytearray()
+        board.uarts[id] = self
+        source = board.uart_rx.pop(id, None)
+        if source is not None:
+            source.start(self)
+
+    def feed(self, data):
+        room = self.rxbuf - len(self._rx)
+        if len(data) > room:
+            self.overruns += len(data) - room
+            data = data[:room]
+        self._rx += data
+        if self._readable is not None:
+            self._readable.set()
+
+    def readable(self):
+        import uasyncio
+        if self._readable is None:
+            self._readable = uasyncio.Event()
+        self._readable.clear()
+        return self._readable
+
+    def any(self):
+        return len(self._rx)
+
+    def read(self, n=None):
+        if not self._rx:
+            return None
+        n = len(self._rx) if n is None else min(n, len(self._rx))
+        data = bytes(self._rx[:n])
+        del self._rx[:n]
+        return data
+
+    def readinto(self, buf, n=None):
+        n = min(len(buf) if n is None else n, len(self._rx))
+        if not n:
+            return None
+        buf[:n] = self._rx[:n]
+        del self._rx[:n]
+        return n
+
+    def write(self, buf):
+        self.sent += buf
+        return len(buf)
+
+
+class ADC:
+    def __init__(self, pin):
+        self.gpio = pin.id if isinstance(pin, Pin) else pin
+
+    def read_u16(self):
+        return board.read_adc(self.gpio)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        self._handle = None
+        if callback is not None:
+            self.init(mode=mode, period=period, freq=freq, callback=callback)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None):
+        import uasyncio
+        self.deinit()
+        self.mode = mode
+        self.period_s = 1 / freq if freq > 0 else period / 1000
+        self.callback = callback
+        self.calls = 0
+        self._loop = uasyncio.get_event_loop()
+        self._next = self._loop.time() + self.period_s
+        self._handle = self._loop.call_at(self._next, self._fire)
+        board.timers.append(self)
+
+    def _fire(self):
+        self.calls += 1
+        if self.mode == Timer.PERIODIC:
+            self._next += self.period_s
+            now = self._loop.time()
+            if self._next < now:
+                self._next = now           # Callback overran its period: no catch-up burst
+            self._handle = self._loop.call_at(self._next, self._fire)
+        else:
+            self._handle = None
+        self.callback(self)
+
+    def deinit(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        self.timeout_ms = timeout
+        self.feeds = 0
+        self.max_gap_us = 0
+        self.expired = False
+        self._last = clock.now_us()
+        board.wdt = self
+
+    def feed(self):
+        self.check()
+        self.feeds += 1
+        self._last = clock.now_us()
+
+    def check(self):
+        """True if more than timeout passed without a feed (the device would reset)."""
+        gap = clock.now_us() - self._last
+        if gap > self.max_gap_us:
+            self.max_gap_us = gap
+        if gap > self.timeout_ms * 1000:
+            self.expired = True
+        return self.expired
+
+
+def reset():
+    board.resets += 1
+    raise SimReset("machine.reset()")
+
+
+def soft_reset():
+    reset()
+
+
+def reset_cause():
+    return 1                               # PWRON_RESET
+
+
+PWRON_RESET = 1
+WDT_RESET = 3
+
+
+def freq(hz=None):
+    return 125_000_000
+
+
+def disable_irq():
+    return 1
+
+
+def enable_irq(state=1):
+    pass
+
+
+def unique_id():
+    return b"\xe6\x61\x38\x52\x83\x2d\x4b\x2a"
+
+
+def idle():
+    pass
@@ -0,0 +1,26 @@
+# sim/micropython.py
+# Host stand-in for the MicroPython `micropython` module
+# Code emitters are no-ops on CPython, const() is the identity
+
+def const(x):
+    return x
+
+
+def native(f):
+    return f
+
+
+def viper(f):
+    return f
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(func, arg):
+    func(arg)
+
+
+def mem_info(verbose=False):
+    print("mem_info: not available on host")
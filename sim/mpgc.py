@@ -0,0 +1,109 @@
+# sim/mpgc.py
+# MicroPython `gc` API on CPython (whose gc has no mem_free/mem_alloc)
+# No heap model by default: mem_alloc() is 0, or what tracemalloc traces if
+# use_tracemalloc is set (CPython objects – only roughly MicroPython's heap),
+# mem_free() the RP2040 heap minus that. runner.py installs it as the `gc` of
+# the firmware modules that use the MicroPython calls.
+#
+# Heap model (alloc_rate > 0, B per second of device time): live_bytes stay,
+# garbage grows with time; collect() frees it and costs a mark/sweep pause on
+# the device clock (rough RP2040 figures). Past gc.threshold or a full heap an
+# automatic collection runs at the next mem_alloc()/mem_free() call – in the
+# device it would run at whatever allocation crosses the line.
+
+import gc as _gc
+import tracemalloc as _tracemalloc
+
+from simclock import clock
+
+HEAP_BYTES = 192 * 1024    # MicroPython 1.26 rp2 heap (approx.)
+MARK_US_PER_KB = 30        # Pause per KB of live objects ...
+SWEEP_US_PER_KB = 8        # ... plus per KB of heap
+
+use_tracemalloc = False
+alloc_rate = 0             # Heap model: bytes allocated per device second (0 = off)
+live_bytes = 48 * 1024
+
+_threshold = -1
+_enabled = True
+_collected_us = 0          # Device time of the last collection (heap model)
+collections = 0            # All collections (explicit + automatic)
+auto_collections = 0       # Heap model: threshold / full heap
+
+
+def reset():
+    """New run: empty garbage, counters and threshold back to power-on."""
+    global _threshold, _enabled, _collected_us, collections, auto_collections
+    _threshold = -1
+    _enabled = True
+    _collected_us = clock.now_us()
+    collections = auto_collections = 0
+
+
+def _modelled():
+    global auto_collections
+    used = live_bytes + (clock.now_us() - _collected_us) * alloc_rate // 1_000_000
+    if _enabled and (used >= HEAP_BYTES or (_threshold >= 0 and used - live_bytes > _threshold)):
+        auto_collections += 1
+        _collect()
+        used = live_bytes
+    return min(used, HEAP_BYTES)
+
+
+def _collect():
+    global _collected_us, collections
+    collections += 1
+    clock.advance((MARK_US_PER_KB * live_bytes + SWEEP_US_PER_KB * HEAP_BYTES) // 1024)
+    _collected_us = clock.now_us()
+
+
+def mem_alloc():
+    if alloc_rate:
+        return _modelled()
+    if use_tracemalloc and _tracemalloc.is_tracing():
+        return _tracemalloc.get_traced_memory()[0]
+    return 0
+
+
+def mem_free():
+    free = HEAP_BYTES - mem_alloc()
+    return free if free > 0 else 0
+
+
+def collect():
+    if alloc_rate:
+        _collect()
+        return 0
+    global collections
+    collections += 1
+    return _gc.collect()
+
+
+# enable/disable only switch the modelled automatic collection (the host's own
+# GC keeps running)
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def isenabled():
+    return _enabled
+
+
+def threshold(amount=None):
+    global _threshold
+    if amount is None:
+        return _threshold
+    _threshold = amount
+
+
+def install(*modules):
+    import sys
+    this = sys.modules[__name__]
+    for module in modules:
+        module.gc = this
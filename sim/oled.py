@@ -0,0 +1,211 @@
+# sim/oled.py
+# Host-side SSD1306 panel model and recording I2C bus
+# RecordingI2C counts transactions/bytes and forwards every write to the panel
+# model at that address; SSD1306Panel decodes the control bytes and commands
+# (horizontal + page addressing) into GDDRAM, so tests can compare what the
+# glass would show with the framebuffer and dump it as an image.
+
+# Commands with argument bytes (everything else is a single byte)
+_CMD_ARGS = {
+    0x20: 1,    # Memory addressing mode
+    0x21: 2,    # Column address
+    0x22: 2,    # Page address
+    0x81: 1,    # Contrast
+    0x8D: 1,    # Charge pump
+    0xA8: 1,    # Multiplex ratio
+    0xD3: 1,    # Display offset
+    0xD5: 1,    # Clock divide
+    0xD9: 1,    # Pre-charge
+    0xDA: 1,    # COM pins
+    0xDB: 1,    # VCOMH deselect
+}
+
+
+class SSD1306Panel:
+    """Decoded SSD1306 state: 128x64 GDDRAM, addressing window, display flags."""
+
+    COLUMNS = 128
+    PAGES = 8
+
+    def __init__(self, width=128, height=32):
+        self.width = width
+        self.height = height
+        self.col_offset = (self.COLUMNS - width) // 2 if width < self.COLUMNS else 0
+        self.ram = bytearray(self.COLUMNS * self.PAGES)
+        self.mode = 2                      # Reset default: page addressing
+        self.col_start, self.col_end = 0, self.COLUMNS - 1
+        self.page_start, self.page_end = 0, self.PAGES - 1
+        self.col = 0
+        self.page = 0
+        self.display_on = False
+        self.inverted = False
+        self.contrast = 0x7F
+        self.seg_remap = False
+        self.com_remap = False
+        self.commands = 0                  # Decoded command count
+        self.data_bytes = 0
+        self._pending = None               # (cmd, remaining args, collected)
+
+    # --- Bus side ---
+    def write(self, buf):
+        """One I2C write transaction (without the address byte)."""
+        i = 0
+        n = len(buf)
+        while i < n:
+            control = buf[i]
+            i += 1
+            continuation = control & 0x80
+            is_data = control & 0x40
+            if continuation:
+                # Exactly one byte follows, then another control byte
+                if i < n:
+                    self._byte(buf[i], is_data)
+                    i += 1
+                continue
+            while i < n:
+                self._byte(buf[i], is_data)
+                i += 1
+
+    def _byte(self, b, is_data):
+        if is_data:
+            self._data(b)
+        else:
+            self._command(b)
+
+    def _data(self, b):
+        self.data_bytes += 1
+        self.ram[self.page * self.COLUMNS + self.col] = b
+        if self.mode == 0:                 # Horizontal
+            self.col += 1
+            if self.col > self.col_end:
+                self.col = self.col_start
+                self.page += 1
+                if self.page > self.page_end:
+                    self.page = self.page_start
+        elif self.mode == 1:               # Vertical
+            self.page += 1
+            if self.page > self.page_end:
+                self.page = self.page_start
+                self.col += 1
+                if self.col > self.col_end:
+                    self.col = self.col_start
+        else:                              # Page mode: column wraps in the page
+            self.col = (self.col + 1) % self.COLUMNS
+
+    def _command(self, b):
+        if self._pending is not None:
+            cmd, remaining, args = self._pending
+            args.append(b)
+            remaining -= 1
+            if remaining:
+                self._pending = (cmd, remaining, args)
+                return
+            self._pending = None
+            self._apply(cmd, args)
+            return
+        self.commands += 1
+        nargs = _CMD_ARGS.get(b, 0)
+        if nargs:
+            self._pending = (b, nargs, [])
+        else:
+            self._apply(b, ())
+
+    def _apply(self, cmd, args):
+        if cmd == 0x20:
+            self.mode = args[0] & 0x03
+        elif cmd == 0x21:
+            self.col_start, self.col_end = args[0] & 0x7F, args[1] & 0x7F
+            self.col = self.col_start
+        elif cmd == 0x22:
+            self.page_start, self.page_end = args[0] & 0x07, args[1] & 0x07
+            self.page = self.page_start
+        elif cmd == 0x81:
+            self.contrast = args[0]
+        elif cmd in (0xAE, 0xAF):
+            self.display_on = cmd == 0xAF
+        elif cmd in (0xA6, 0xA7):
+            self.inverted = cmd == 0xA7
+        elif cmd in (0xA0, 0xA1):
+            self.seg_remap = cmd == 0xA1
+        elif cmd in (0xC0, 0xC8):
+            self.com_remap = cmd == 0xC8
+        elif 0xB0 <= cmd <= 0xB7:          # Page mode: page start
+            self.page = cmd & 0x07
+        elif cmd <= 0x0F:                  # Page mode: lower column nibble
+            self.col = (self.col & 0xF0) | cmd
+        elif cmd <= 0x1F:                  # Page mode: upper column nibble
+            self.col = (self.col & 0x0F) | ((cmd & 0x0F) << 4)
+
+    # --- Inspection ---
+    def page_bytes(self, page):
+        base = page * self.COLUMNS + self.col_offset
+        return bytes(self.ram[base:base + self.width])
+
+    def matches(self, buffer):
+        """True if the panel RAM equals a MONO_VLSB framebuffer of width x height."""
+        for page in range(self.height // 8):
+            if self.page_bytes(page) != bytes(buffer[page * self.width:(page + 1) * self.width]):
+                return False
+        return True
+
+    def pixel(self, x, y):
+        on = (self.ram[(y >> 3) * self.COLUMNS + self.col_offset + x] >> (y & 7)) & 1
+        return on ^ 1 if self.inverted else on
+
+    def to_pbm(self):
+        """Plain PBM (P1) image of the visible area."""
+        rows = [f"P1\n{self.width} {self.height}"]
+        for y in range(self.height):
+            rows.append(" ".join(str(self.pixel(x, y)) for x in range(self.width)))
+        return "\n".join(rows) + "\n"
+
+    def to_text(self, on="#", off="."):
+        return "\n".join("".join(on if self.pixel(x, y) else off for x in range(self.width))
+                         for y in range(self.height))
+
+
+class RecordingI2C:
+    """
+    I2C stand-in: records transactions and bytes per address and feeds them to
+    attached panel models. Byte counts include the address byte, as on the wire.
+    """
+
+    def __init__(self, freq=400_000):
+        self.freq = freq
+        self.devices = {}
+        self.transactions = 0
+        self.bytes = 0
+        self.log = None                    # Set to a list to keep raw transactions
+
+    def attach(self, addr, device):
+        self.devices[addr] = device
+        return device
+
+    def reset_counters(self):
+        self.transactions = 0
+        self.bytes = 0
+
+    def _deliver(self, addr, data):
+        if addr not in self.devices:
+            raise OSError(19)              # ENODEV, like a missing ACK
+        self.transactions += 1
+        self.bytes += 1 + len(data)
+        if self.log is not None:
+            self.log.append((addr, bytes(data)))
+        self.devices[addr].write(data)
+
+    def writeto(self, addr, buf, stop=True):
+        self._deliver(addr, bytes(buf))
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        data = b"".join(bytes(b) for b in vector)
+        self._deliver(addr, data)
+        return len(data)
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def wire_time_us(self):
+        """Transfer time at `freq`: 9 clocks per byte plus start/stop per transaction."""
+        return (self.bytes * 9 + self.transactions * 2) * 1_000_000 // self.freq
@@ -0,0 +1,119 @@
+# sim/pio.py
+# RP2040 PIO assembler and interpreter for the host simulator
+# assemble() runs an rp2.asm_pio-style program function with a recording DSL
+# (the instruction names injected into its globals, the same trick rp2 uses);
+# PioEmulator executes the result cycle by cycle. Only the instructions the
+# stepper program (stepper_pio.py) uses are implemented. Used by sim/rp2.py
+# (StateMachine) and tools/pio_emu.py.
+
+
+# --- Assembler (recording DSL) ---
+class _Operand:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+def assemble(program_fn):
+    """Run a rp2.asm_pio-style function, return (instructions, labels, wrap_target, wrap)."""
+    instructions = []
+    labels = {}
+    marks = {}
+
+    def emit(op, *args):
+        instructions.append((op,) + args)
+
+    dsl = {
+        "pull": lambda block=None: emit("pull"),
+        "mov": lambda dst, src: emit("mov", dst.name, src.name),
+        "out": lambda dst, n: emit("out", dst.name, n),
+        "in_": lambda src, n: emit("in", src.name, n),
+        "jmp": lambda cond, target=None: emit("jmp", "always", cond) if target is None
+        else emit("jmp", cond.name, target),
+        "label": lambda name: labels.__setitem__(name, len(instructions)),
+        "wrap_target": lambda: marks.__setitem__("wrap_target", len(instructions)),
+        "wrap": lambda: marks.__setitem__("wrap", len(instructions) - 1),
+    }
+    for name in ("block", "isr", "osr", "x", "y", "pins", "null", "not_x", "x_dec", "y_dec"):
+        dsl[name] = _Operand(name)
+
+    gl = program_fn.__globals__
+    saved = dict(gl)
+    gl.update(dsl)
+    try:
+        program_fn()
+    finally:
+        gl.clear()
+        gl.update(saved)
+    return instructions, labels, marks.get("wrap_target", 0), marks.get("wrap", len(instructions) - 1)
+
+
+# --- Interpreter (only the instructions the stepper program uses) ---
+class PioEmulator:
+    MASK32 = 0xFFFFFFFF
+
+    def __init__(self, program, out_count=4):
+        self.instructions, self.labels, self.wrap_target, self.wrap = program
+        self.out_mask = (1 << out_count) - 1
+        self.pc = 0
+        self.x = self.y = self.isr = self.osr = 0
+        self.pins = 0
+        self.cycle = 0
+        self.tx_fifo = []
+        self.trace = []                  # (cycle, pin value) per `mov pins`
+        self.pulls = []                  # Cycle of every `pull` that took a word
+
+    def put(self, word):
+        self.tx_fifo.append(word & self.MASK32)
+
+    def run(self, max_cycles=10_000_000):
+        """Run until the program stalls on an empty TX FIFO (at most max_cycles more)."""
+        limit = self.cycle + max_cycles
+        while self.cycle < limit:
+            op = self.instructions[self.pc]
+            next_pc = self.pc + 1 if self.pc != self.wrap else self.wrap_target
+            kind = op[0]
+            if kind == "pull":
+                if not self.tx_fifo:
+                    return
+                self.osr = self.tx_fifo.pop(0)
+                self.pulls.append(self.cycle)
+            elif kind == "mov":
+                value = {"isr": self.isr, "osr": self.osr, "x": self.x,
+                         "y": self.y, "null": 0}[op[2]]
+                if op[1] == "pins":
+                    self.pins = value & self.out_mask
+                    self.trace.append((self.cycle, self.pins))
+                else:
+                    setattr(self, op[1], value)
+            elif kind == "out":
+                n = op[2]
+                setattr(self, op[1], self.osr & ((1 << n) - 1))
+                self.osr >>= n
+            elif kind == "in":
+                n = op[2]
+                data = getattr(self, op[1]) & ((1 << n) - 1)
+                self.isr = ((self.isr >> n) | (data << (32 - n))) & self.MASK32
+            elif kind == "jmp":
+                cond, target = op[1], op[2]
+                if cond == "always":
+                    take = True
+                elif cond == "not_x":
+                    take = self.x == 0
+                elif cond == "x_dec":
+                    take = self.x != 0
+                    self.x = (self.x - 1) & self.MASK32
+                elif cond == "y_dec":
+                    take = self.y != 0
+                    self.y = (self.y - 1) & self.MASK32
+                else:
+                    raise ValueError(f"Unsupported jmp condition {cond}")
+                if take:
+                    next_pc = self.labels[target]
+            else:
+                raise ValueError(f"Unsupported instruction {op}")
+            self.pc = next_pc
+            self.cycle += 1
+        raise RuntimeError("Cycle limit reached")
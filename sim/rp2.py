@@ -0,0 +1,163 @@
+# sim/rp2.py
+# Host stand-in for the MicroPython `rp2` module
+# asm_pio assembles the program with sim/pio.py; StateMachine runs it in the
+# PioEmulator. A put() runs the program ahead until it stalls on the empty
+# FIFO and maps PIO cycles to device time (freq): the resulting pin changes
+# are applied to the out pins (machine.Pin, recorded) once device time
+# reaches them, tx_fifo() counts the words not yet pulled at that time.
+# Flash: block device whose contents live on the board (sim/vfs.py).
+
+from simclock import clock
+from board import board
+from pio import assemble, PioEmulator
+
+
+class PIO:
+    OUT_LOW = 0
+    OUT_HIGH = 1
+    IN_LOW = 0
+    IN_HIGH = 1
+    SHIFT_LEFT = 0
+    SHIFT_RIGHT = 1
+    JOIN_NONE = 0
+    JOIN_TX = 1
+    JOIN_RX = 2
+
+    def __init__(self, id):
+        self.id = id
+
+    def state_machine(self, id, program=None, **kwargs):
+        return StateMachine(self.id * 4 + id, program, **kwargs)
+
+
+class Program:
+    def __init__(self, fn, out_init=None, **settings):
+        self.name = fn.__name__
+        self.assembled = assemble(fn)
+        self.out_count = len(out_init) if isinstance(out_init, tuple) else (1 if out_init is not None else 0)
+        self.settings = settings
+
+
+def asm_pio(out_init=None, **settings):
+    def decorator(fn):
+        return Program(fn, out_init, **settings)
+    return decorator
+
+
+class StateMachine:
+    def __init__(self, id, program=None, freq=125_000_000, out_base=None, **kwargs):
+        self.id = id
+        self.words = 0                     # Words put
+        self.steps = 0                     # Pin writes applied
+        self._emu = None
+        self._pending = []                 # (t_us, pin value) computed ahead
+        self._pull_times = []              # Device time each queued word is pulled
+        board.state_machines[id] = self
+        if program is not None:
+            self.init(program, freq=freq, out_base=out_base)
+
+    def init(self, program, freq=125_000_000, out_base=None, **kwargs):
+        self.program = program
+        self.freq = freq
+        self.out_pins = []
+        if out_base is not None:
+            self.out_pins = [board.pin(out_base.id + i) for i in range(program.out_count)]
+        self._emu = PioEmulator(program.assembled, program.out_count or 1)
+        self._origin_us = clock.now_us()   # Device time of cycle 0
+        self._traced = 0                   # emu.trace entries already converted
+        self._pulled = 0
+        self._active = False
+
+    def _time_of(self, cycle):
+        return self._origin_us + cycle * 1_000_000 // self.freq
+
+    def _sync(self, now):
+        pending = self._pending
+        n = 0
+        while n < len(pending) and pending[n][0] <= now:
+            t, value = pending[n]
+            for i, pin in enumerate(self.out_pins):
+                pin._set((value >> i) & 1, t)
+            self.steps += 1
+            n += 1
+        if n:
+            del pending[:n]
+        pulls = self._pull_times
+        n = 0
+        while n < len(pulls) and pulls[n] <= now:
+            n += 1
+        if n:
+            del pulls[:n]
+
+    def active(self, value=None):
+        if value is None:
+            return int(self._active)
+        now = clock.now_us()
+        self._sync(now)
+        if value:
+            if not self._active:
+                self._origin_us = now - self._emu.cycle * 1_000_000 // self.freq
+            self._active = True
+        else:
+            # Stopped: nothing after `now` happens, queued words are dropped
+            self._active = False
+            self._pending.clear()
+            self._pull_times.clear()
+            self._emu.tx_fifo.clear()
+
+    def put(self, word):
+        now = clock.now_us()
+        self._sync(now)
+        self.words += 1
+        emu = self._emu
+        if not self._active:
+            emu.put(word)
+            return
+        if self._time_of(emu.cycle) < now:
+            # Stalled on the empty FIFO until now: resume the cycle count here
+            self._origin_us = now - emu.cycle * 1_000_000 // self.freq
+        emu.put(word)
+        with clock.excluded():
+            emu.run()
+        for cycle in emu.pulls[self._pulled:]:
+            self._pull_times.append(self._time_of(cycle))
+        self._pulled = len(emu.pulls)
+        for cycle, value in emu.trace[self._traced:]:
+            self._pending.append((self._time_of(cycle), value))
+        self._traced = len(emu.trace)
+        if len(emu.trace) > 4096:          # Long runs: keep the emulator lists short
+            del emu.trace[:]
+            del emu.pulls[:]
+            self._traced = self._pulled = 0
+        self._sync(now)
+
+    def tx_fifo(self):
+        self._sync(clock.now_us())
+        return len(self._pull_times)
+
+    def exec(self, instr):
+        now = clock.now_us()
+        self._sync(now)
+        if instr.replace(" ", "") == "mov(pins,null)":
+            self._pending.clear()
+            for pin in self.out_pins:
+                pin._set(0, now)
+            self._emu.pins = 0
+        else:
+            raise NotImplementedError(f"sim StateMachine.exec({instr!r})")
+
+
+class Flash:
+    """Internal flash block device: 4 KB blocks, contents in board.flash."""
+
+    BLOCK_SIZE = 4096
+
+    def __init__(self, start=None, len=None):
+        self.storage = board.flash
+
+    def ioctl(self, op, arg):
+        if op == 4:                        # Block count (1 MB filesystem)
+            return 256
+        if op == 5:
+            return self.BLOCK_SIZE
+        return 0
@@ -0,0 +1,153 @@
+# sim/runner.py
+# Boots the firmware (main.boot) on the simulated board, faster than real time
+# The clock runs in virtual mode (simclock): sleeps and waits cost nothing, the
+# firmware's own code costs its host CPU time × cpu_scale. The board gets the
+# three SSD1306 panels at main.py's I2C wiring, a 13.5 V supply on the power
+# monitor ADC, a wheel-pulse source from a speed profile and optionally an
+# RS485 stream (capture bytes or frames) on UART0; the filesystem is sim/vfs.
+#
+#   sim = runner.run(60, profile=board.ramp([(0, 0), (20, 120)]), uart=frames)
+#   sim.panels["odometer"].to_text(), sim.main.shared_data ..., sim.report()
+#
+# Every run starts from freshly imported firmware modules (module state such
+# as pulsecounter's counters would otherwise leak between runs); keep_flash
+# keeps the filesystem of the previous run (a reboot). setup(sim) runs after
+# the board is wired and before main.boot() – hooks for benchmarks.
+
+import io
+import os
+import sys
+
+from simclock import clock, SimStop
+from board import board, PulseSource, UartSource, constant
+import machine
+import mpgc
+import uasyncio
+import vfs
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUPPLY_MV = 13500
+
+# name → main.py wiring constant, panel size
+DISPLAYS = (
+    ("odometer", "ODOMETER_I2C", 128, 32),
+    ("central", "CENTRAL_I2C", 128, 32),
+    ("rnd", "RND_I2C", 64, 32),
+)
+
+
+class Sim:
+    """One simulated boot: board objects, firmware modules, outcome."""
+
+    def __init__(self):
+        self.main = None
+        self.shared_data = None
+        self.panels = {}
+        self.pulses = None
+        self.uart = None
+        self.output = io.StringIO()        # Firmware stdout (debug_print)
+        self.end_us = 0
+        self.reason = None                 # "time", "reset" or the exception text
+        self.task_errors = []              # (coroutine, exception) of tasks that died
+        self.host_s = 0.0
+
+    def module(self, name):
+        return sys.modules[name]
+
+    def report(self):
+        speedup = self.end_us / 1e6 / self.host_s if self.host_s else 0
+        lines = [f"{self.end_us / 1e6:.2f} s simulated in {self.host_s:.2f} s host "
+                 f"(x{speedup:.1f}), end: {self.reason}"]
+        lines += board.report()
+        for name, exc in self.task_errors:
+            lines.append(f"TASK DIED: {name}: {type(exc).__name__}: {exc}")
+        stats = board.flash["stats"]
+        if stats:
+            lines.append("Flash: " + " ".join(f"{k}={v}" for k, v in sorted(stats.items())))
+        return lines
+
+
+def _purge_firmware():
+    """Forget firmware modules imported by an earlier run (sim/ modules stay)."""
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, "__file__", None) or ""
+        if os.path.dirname(os.path.abspath(path)) == REPO:
+            del sys.modules[name]
+
+
+def run(seconds, profile=None, uart=None, setup=None, cpu_scale=1.0, supply_mv=SUPPLY_MV,
+        keep_flash=False, echo=False):
+    """
+    Boot main.py and run it for `seconds` of device time.
+    profile: fn(t_s) → km/h (board.constant/ramp), default standing still.
+    uart: UartSource, raw capture bytes or a list of frames (replayed once).
+    """
+    import time as _time
+    if REPO not in sys.path:
+        sys.path.insert(0, REPO)
+    _purge_firmware()
+    board.reset()
+    if not keep_flash:
+        board.erase_flash()
+    vfs.reset()
+    clock.start(cpu_scale, stop_at_us=int(seconds * 1_000_000))
+    mpgc.reset()
+    uasyncio.new_event_loop()
+    sim = Sim()
+
+    import main
+    import distance
+    import powerfail
+    import pulsecounter
+    import store_km
+    import debuglog
+    import memory
+    sim.main = main
+    vfs.install(store_km, debuglog)
+    mpgc.install(main, memory)
+    for name, const, width, height in DISPLAYS:
+        scl, sda, freq, mux_channel = getattr(main, const)
+        sim.panels[name] = board.add_panel(scl, sda, width, height, mux_channel=mux_channel)
+    board.set_adc(powerfail.ADC_GPIO, powerfail.mv_to_raw(supply_mv) if not callable(supply_mv)
+                  else lambda t: powerfail.mv_to_raw(supply_mv(t)))
+    mm_per_pulse = distance.WHEEL_CIRCUMFERENCE_MM / distance.PULSES_PER_REVOLUTION
+    sim.pulses = PulseSource(pulsecounter.PULSE_PIN_GPIO, profile or constant(0), mm_per_pulse).start()
+    if uart is not None:
+        if not isinstance(uart, UartSource):
+            uart = UartSource(uart)
+        sim.uart = uart
+        board.uart_source(0, uart)
+
+    # main.boot() creates the SharedTelemetryData; catch it for inspection
+    shared_cls = main.SharedTelemetryData
+
+    class _Captured(shared_cls):
+        def __init__(self):
+            super().__init__()
+            sim.shared_data = self
+
+    main.SharedTelemetryData = _Captured
+    if setup is not None:
+        setup(sim)
+
+    out = sys.stdout
+    if not echo:
+        sys.stdout = sim.output
+    host_t0 = _time.perf_counter()
+    try:
+        main.boot()
+        sim.reason = "returned"
+    except SimStop:
+        sim.reason = "time"
+    except machine.SimReset as e:
+        sim.reason = f"reset ({e})"
+    finally:
+        sys.stdout = out
+        sim.host_s = _time.perf_counter() - host_t0
+        board.sync()
+        if board.wdt is not None:
+            board.wdt.check()
+        sim.end_us = clock.now_us()
+        sim.task_errors = uasyncio.failed_tasks()
+        clock.stop()
+    return sim
@@ -0,0 +1,100 @@
+# sim/simclock.py
+# Time base of the host simulator
+# Real mode (default): host perf_counter, as the benchmarks expect.
+# Virtual mode (runner.py): device time = skipped time + host CPU time × cpu_scale
+#   - skipped: sleeps (utime.sleep_*, the event loop waiting for its next
+#     timer) and modelled transfer times (advance()) cost no host time
+#   - host CPU time stands in for the firmware's own execution time; sections
+#     that only exist in the simulator (panel decode, PIO emulation) run
+#     inside excluded() and do not count
+#   - cpu_scale = 0 → deterministic: code takes no time, only each event-loop
+#     iteration costs loop_us (tasks polling the clock with sleep_ms(0) see
+#     time move, as on the device)
+# stop_at_us: the event loop raises SimStop once device time passes it.
+
+import time as _time
+
+LOOP_US = 20               # uasyncio scheduler pass on the RP2040 (deterministic mode)
+
+
+class SimStop(BaseException):
+    """End of a simulated run (BaseException: firmware `except Exception` lets it through)."""
+
+
+class Clock:
+    def __init__(self):
+        self.virtual = False
+        self.cpu_scale = 1.0
+        self.stop_at_us = None
+        self.loop_us = 0
+        self._skipped = 0
+        self._t0 = 0
+        self._excluded = 0
+        self._excl_depth = 0
+        self._excl_start = 0
+
+    def start(self, cpu_scale=1.0, stop_at_us=None, loop_us=None):
+        """Switch to virtual time, device clock at 0."""
+        self.virtual = True
+        self.cpu_scale = cpu_scale
+        self.stop_at_us = stop_at_us
+        if loop_us is None:
+            loop_us = LOOP_US if cpu_scale == 0 else 0
+        self.loop_us = loop_us
+        self._skipped = 0
+        self._t0 = _time.perf_counter_ns()
+        self._excluded = 0
+        self._excl_depth = 0
+
+    def stop(self):
+        self.virtual = False
+        self.stop_at_us = None
+
+    def _cpu_ns(self):
+        now = _time.perf_counter_ns()
+        excluded = self._excluded
+        if self._excl_depth:
+            excluded += now - self._excl_start
+        return now - self._t0 - excluded
+
+    def now_us(self):
+        if not self.virtual:
+            return _time.perf_counter_ns() // 1000
+        return self._skipped + int(self._cpu_ns() * self.cpu_scale) // 1000
+
+    def advance(self, us):
+        """Let `us` of device time pass (sleep, wire time)."""
+        if not self.virtual:
+            _time.sleep(us / 1_000_000)
+        elif us > 0:
+            self._skipped += int(us)
+
+    def check_stop(self):
+        if self.stop_at_us is not None and self.now_us() >= self.stop_at_us:
+            raise SimStop(f"stopped at {self.now_us()} us")
+
+    def excluded(self):
+        return _Excluded(self)
+
+
+class _Excluded:
+    """with clock.excluded(): host work that is not device CPU time."""
+
+    def __init__(self, clock):
+        self.clock = clock
+
+    def __enter__(self):
+        c = self.clock
+        if not c._excl_depth:
+            c._excl_start = _time.perf_counter_ns()
+        c._excl_depth += 1
+
+    def __exit__(self, *exc):
+        c = self.clock
+        c._excl_depth -= 1
+        if not c._excl_depth:
+            c._excluded += _time.perf_counter_ns() - c._excl_start
+        return False
+
+
+clock = Clock()
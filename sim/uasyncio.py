@@ -0,0 +1,236 @@
+# sim/uasyncio.py
+# Host stand-in for MicroPython `uasyncio`, on CPython asyncio
+# One module-level event loop (like uasyncio): create_task() before run()
+# queues the task on it, run() drives it. In virtual mode (simclock) the loop
+# reads device time and, instead of blocking in select(), jumps the clock to
+# its next timer – a simulated minute takes as long as the code it runs.
+# Real mode (benchmarks) is a normal asyncio loop.
+#
+# The firmware API subset: sleep/sleep_ms, create_task, run, gather,
+# wait_for/wait_for_ms, Event, ThreadSafeFlag, Lock, StreamReader.readinto
+# (waits for a sim UART to become readable), get_event_loop/new_event_loop.
+# meter_tasks(): per-task host CPU time (and tracemalloc allocations) of every
+# callback the loop runs – the benchmarks' "CPU per task". failed_tasks():
+# tasks that died with an exception nobody retrieved (a run must not pass
+# with a firmware task gone).
+
+import asyncio as _asyncio
+import selectors as _selectors
+import tracemalloc as _tracemalloc
+
+from simclock import clock
+
+CancelledError = _asyncio.CancelledError
+TimeoutError = _asyncio.TimeoutError
+Event = _asyncio.Event
+Lock = _asyncio.Lock
+gather = _asyncio.gather
+wait_for = _asyncio.wait_for
+
+
+class _VirtualSelector(_selectors.DefaultSelector):
+    """select(timeout) → advance the device clock by timeout, then poll."""
+
+    def select(self, timeout=None):
+        clock.check_stop()
+        if timeout is None:
+            # Nothing scheduled and nothing can wake the loop from outside
+            raise RuntimeError("uasyncio: all tasks wait forever (deadlock)")
+        if clock.loop_us:
+            clock.advance(clock.loop_us)
+            timeout = max(timeout - clock.loop_us / 1_000_000, 0)
+        if timeout > 0:
+            wait_us = int(timeout * 1_000_000) + 1
+            stop = clock.stop_at_us
+            if stop is not None and clock.now_us() + wait_us > stop:
+                wait_us = max(stop - clock.now_us(), 0)
+            clock.advance(wait_us)
+            clock.check_stop()
+        return super().select(0)
+
+
+class _VirtualLoop(_asyncio.SelectorEventLoop):
+    def __init__(self):
+        super().__init__(_VirtualSelector())
+        self.meter = None                  # label → [cpu ns, runs, alloc bytes, max step ns]
+        self.meter_label = None
+        self.meter_alloc = False
+        self.ended = []                    # Tasks that finished with an exception
+
+    def create_task(self, coro, **kwargs):
+        task = super().create_task(coro, **kwargs)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        # Exception subclasses only: SimStop/SimReset end the run, not the task
+        if not task.cancelled() and isinstance(task._exception, Exception):
+            self.ended.append(task)
+
+    def time(self):
+        return clock.now_us() / 1_000_000
+
+    def call_soon(self, callback, *args, context=None):
+        if self.meter is not None:
+            callback = self._metered(callback)
+        return super().call_soon(callback, *args, context=context)
+
+    def call_at(self, when, callback, *args, context=None):
+        if self.meter is not None:
+            callback = self._metered(callback)
+        return super().call_at(when, callback, *args, context=context)
+
+    def _metered(self, callback):
+        owner = getattr(callback, "__self__", None)
+        label = self.meter_label(owner if _is_task(owner) else callback)
+        entry = self.meter.get(label)
+        if entry is None:
+            entry = self.meter[label] = [0, 0, 0, 0]
+        alloc = self.meter_alloc
+
+        def run(*args):
+            if alloc:
+                _tracemalloc.reset_peak()
+                base = _tracemalloc.get_traced_memory()[0]
+            t0 = clock._cpu_ns()
+            try:
+                callback(*args)
+            finally:
+                t = clock._cpu_ns() - t0
+                entry[0] += t
+                entry[1] += 1
+                if t > entry[3]:
+                    entry[3] = t
+                if alloc:
+                    entry[2] += _tracemalloc.get_traced_memory()[1] - base
+        return run
+
+
+def _is_task(obj):
+    return isinstance(obj, (_asyncio.Task, _asyncio.tasks._PyTask))
+
+
+def _default_label(owner):
+    if _is_task(owner):
+        return owner.get_coro().__qualname__
+    return getattr(owner, "__qualname__", repr(owner))
+
+
+def meter_tasks(label=None, alloc=False):
+    """
+    Account host CPU per task (virtual loop only), optionally tracemalloc peak
+    bytes per step (alloc=True, tracemalloc must be running). label(owner) names
+    a Task or a plain callback. Tasks created from now on are Python Tasks, so
+    their steps can be attributed. Returns the label → [cpu ns, runs, bytes,
+    longest step ns] dict.
+    """
+    loop = get_event_loop()
+    loop.meter = {}
+    loop.meter_label = label or _default_label
+    loop.meter_alloc = alloc
+    loop.set_task_factory(lambda loop, coro, **kwargs: _asyncio.tasks._PyTask(coro, loop=loop, **kwargs))
+    return loop.meter
+
+
+def failed_tasks():
+    """
+    (coroutine name, exception) of the tasks that died with an exception the
+    firmware never retrieved; reported here instead of the "never retrieved"
+    log at garbage collection.
+    """
+    failed = []
+    for task in getattr(_loop, "ended", ()):
+        if task._log_traceback:
+            task._log_traceback = False
+            failed.append((task.get_coro().__qualname__, task._exception))
+    return failed
+
+
+_loop = None
+
+
+def new_event_loop():
+    """Fresh loop (virtual if the clock is virtual); the old one is closed."""
+    global _loop
+    if _loop is not None and not _loop.is_running():
+        for task in _asyncio.all_tasks(_loop):
+            task._log_destroy_pending = False  # Stopped run: tasks end with the loop
+        _loop.close()
+    _loop = _VirtualLoop() if clock.virtual else _asyncio.new_event_loop()
+    _asyncio.set_event_loop(_loop)
+    return _loop
+
+
+def get_event_loop():
+    if _loop is None or _loop.is_closed():
+        return new_event_loop()
+    return _loop
+
+
+def create_task(coro):
+    return get_event_loop().create_task(coro)
+
+
+def run(coro):
+    return get_event_loop().run_until_complete(coro)
+
+
+def sleep(seconds):
+    return _asyncio.sleep(seconds)
+
+
+def sleep_ms(ms):
+    return _asyncio.sleep(ms / 1000)
+
+
+def wait_for_ms(aw, timeout_ms):
+    return _asyncio.wait_for(aw, timeout_ms / 1000)
+
+
+def current_task():
+    return _asyncio.current_task()
+
+
+class ThreadSafeFlag:
+    """set() from an IRQ handler (sim: a loop callback), wait() in a task."""
+
+    def __init__(self):
+        self._event = _asyncio.Event()
+
+    def set(self):
+        self._event.set()
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self):
+        await self._event.wait()
+        self._event.clear()
+
+
+class StreamReader:
+    """Reader on a sim machine.UART: waits until bytes are there, like the poller."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def readinto(self, buf):
+        stream = self.stream
+        while not stream.any():
+            await stream.readable().wait()
+        return stream.readinto(buf)
+
+    async def read(self, n=-1):
+        stream = self.stream
+        while not stream.any():
+            await stream.readable().wait()
+        return stream.read(n if n >= 0 else None)
+
+    def write(self, buf):
+        self.stream.write(buf)
+
+    async def drain(self):
+        await _asyncio.sleep(0)
+
+
+StreamWriter = StreamReader
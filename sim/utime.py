@@ -0,0 +1,52 @@
+# sim/utime.py
+# Host stand-in for the MicroPython `utime` module
+# Same tick arithmetic as the firmware (30-bit wrap, ticks_diff modular)
+# Ticks and sleeps follow simclock: host time by default, device time when a
+# simulated run (runner.py) switched the clock to virtual mode.
+
+import time as _time
+from simclock import clock
+
+TICKS_PERIOD = 1 << 30
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+
+def ticks_us():
+    return clock.now_us() & _TICKS_MAX
+
+
+def ticks_ms():
+    return (clock.now_us() // 1000) & _TICKS_MAX
+
+
+def ticks_cpu():
+    return ticks_us()
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+def sleep(seconds):
+    clock.advance(seconds * 1_000_000)
+
+
+def sleep_ms(ms):
+    clock.advance(ms * 1000)
+
+
+def sleep_us(us):
+    clock.advance(us)
+
+
+def time():
+    return int(_time.time())
+
+
+def localtime(secs=None):
+    return _time.localtime(secs)[:8]
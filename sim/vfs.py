@@ -0,0 +1,266 @@
+# sim/vfs.py
+# In-memory LittleFS stand-in (os + open) for the host simulator
+# Files live in board.flash["files"], so they survive a simulated reboot
+# (runner.py) but never touch the host disk. install(module) points a firmware
+# module's `os` and `open` here (store_km, debuglog).
+# Flash accounting per LittleFS behaviour (VfsLfs2 defaults: prog_size 32,
+# cache 128 B → inline_max 128 B):
+#   - every closed write session, rename and remove is a metadata commit,
+#     appended to the directory's metadata block (padded to PROG). A full
+#     block is compacted into the other block of the pair: one erase + the
+#     live metadata (COMPACTION pages). One pair per mount (flat /data).
+#   - a file up to INLINE_MAX lives in that commit (no block of its own)
+#   - a larger file is copy-on-write: appending copies its last (partial)
+#     block → one block erase per block touched + the pages of that tail,
+#     then a commit of the new block pointer
+# Counts go to board.flash["stats"] and the device clock advances by typical
+# W25Q16JV timings (FLASH_TIMING_US), so a save costs what it would on the board.
+
+from simclock import clock
+from board import board
+
+BLOCK = 4096
+PAGE = 256                 # Flash program page (timing)
+PROG = 32                  # LittleFS prog_size: commits are padded to it
+INLINE_MAX = 128           # Files up to this size are stored in the metadata
+COMMIT_BYTES = 24          # Per commit: attribute tags, mtime, CRC
+ENTRY_BYTES = 40           # Per file in a compacted block: name, struct, mtime
+CTZ_BYTES = 8              # Block pointer + size of an out-of-line file
+SUPERBLOCK_BLOCKS = 2
+FLASH_TIMING_US = {"erase": 45_000, "page": 400}
+
+_mounts = {}                               # Mount point → VfsLfs2
+
+
+def _stats():
+    return board.flash["stats"]
+
+
+def _count(key, n=1):
+    stats = _stats()
+    stats[key] = stats.get(key, 0) + n
+
+
+def _program(pages, erases=0):
+    _count("pages", pages)
+    if erases:
+        _count("erases", erases)
+    clock.advance(pages * FLASH_TIMING_US["page"] + erases * FLASH_TIMING_US["erase"])
+
+
+def _compacted(storage):
+    """Bytes of live metadata: what a compaction writes to the fresh block."""
+    size = COMMIT_BYTES
+    for data in storage["files"].values():
+        size += ENTRY_BYTES + (len(data) if len(data) <= INLINE_MAX else CTZ_BYTES)
+    return (size + PROG - 1) // PROG * PROG
+
+
+def _commit(storage, size):
+    """Metadata commit of `size` attribute bytes (compacts a full block first)."""
+    size = (size + COMMIT_BYTES + PROG - 1) // PROG * PROG
+    _count("commits")
+    fill = storage.get("metadata", 0)
+    if fill + size > BLOCK:
+        compacted = _compacted(storage)
+        _count("compactions")
+        _program((compacted + PAGE - 1) // PAGE, 1)
+        fill = compacted
+    storage["metadata"] = fill + size
+    _program((size + PAGE - 1) // PAGE)
+
+
+class VfsLfs2:
+    def __init__(self, bdev, block_size=BLOCK, readsize=32, progsize=PROG, lookahead=32, mtime=True):
+        self.storage = bdev.storage
+        if not self.storage["formatted"]:
+            raise OSError(19, "no filesystem")   # lfs2 mount: ENODEV on blank flash
+
+    @staticmethod
+    def mkfs(bdev, block_size=BLOCK, **kwargs):
+        bdev.storage["formatted"] = True
+        bdev.storage["files"].clear()
+        bdev.storage["metadata"] = 0
+        _program(SUPERBLOCK_BLOCKS, SUPERBLOCK_BLOCKS)
+
+
+def mount(vfs, path, readonly=False):
+    path = path.rstrip("/") or "/"
+    if path in _mounts:
+        raise OSError(1, "already mounted")
+    _mounts[path] = vfs
+
+
+def umount(path):
+    _mounts.pop(path.rstrip("/") or "/", None)
+
+
+def reset():
+    """Reboot: nothing mounted (flash contents stay on the board)."""
+    _mounts.clear()
+
+
+def _storage(path):
+    """Storage of the mount holding `path` (root: the board's own)."""
+    best = None
+    for point in _mounts:
+        if path == point or path.startswith(point + "/") or point == "/":
+            if best is None or len(point) > len(best):
+                best = point
+    return _mounts[best].storage if best else board.flash
+
+
+def _files(path):
+    return _storage(path)["files"]
+
+
+def stat(path):
+    data = _files(path).get(path)
+    if data is None:
+        if any(p.startswith(path.rstrip("/") + "/") for p in _files(path)) or path.rstrip("/") in _mounts:
+            return (0x4000, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+        raise OSError(2, "ENOENT")
+    return (0x8000, 0, 0, 0, 0, 0, len(data), 0, 0, 0)
+
+
+def listdir(path=""):
+    prefix = path.rstrip("/") + "/"
+    names = set()
+    for p in _files(prefix):
+        if p.startswith(prefix):
+            names.add(p[len(prefix):].split("/", 1)[0])
+    return sorted(names)
+
+
+def remove(path):
+    storage = _storage(path)
+    if path not in storage["files"]:
+        raise OSError(2, "ENOENT")
+    del storage["files"][path]
+    _count("removes")
+    _commit(storage, 0)
+
+
+def rename(old, new):
+    storage = _storage(old)
+    files = storage["files"]
+    if old not in files:
+        raise OSError(2, "ENOENT")
+    files[new] = files.pop(old)
+    _count("renames")
+    _commit(storage, len(new))
+
+
+def mkdir(path):
+    pass
+
+
+def sync():
+    pass
+
+
+class _File:
+    def __init__(self, path, mode):
+        self.path = path
+        self.binary = "b" in mode
+        self._storage = _storage(path)
+        files = self._storage["files"]
+        if "r" in mode and "+" not in mode:
+            if path not in files:
+                raise OSError(2, "ENOENT")
+            self.data = files[path]
+            self.writable = False
+        else:
+            if "w" in mode or path not in files:
+                files[path] = bytearray()
+            self.data = files[path]
+            self.writable = True
+        self.pos = len(self.data) if "a" in mode else 0
+        self.append = "a" in mode
+        self._start = len(self.data) if "w" not in mode else 0
+        self._written = 0
+        self._truncated = "w" in mode
+        self.closed = False
+
+    def read(self, n=-1):
+        end = len(self.data) if n is None or n < 0 else min(self.pos + n, len(self.data))
+        chunk = bytes(self.data[self.pos:end])
+        self.pos = end
+        return chunk if self.binary else chunk.decode()
+
+    def readinto(self, buf):
+        chunk = self.read(len(buf))
+        buf[:len(chunk)] = chunk
+        return len(chunk)
+
+    def readline(self):
+        end = self.data.find(b"\n", self.pos)
+        end = len(self.data) if end < 0 else end + 1
+        chunk = bytes(self.data[self.pos:end])
+        self.pos = end
+        return chunk if self.binary else chunk.decode()
+
+    def __iter__(self):
+        while self.pos < len(self.data):
+            yield self.readline()
+
+    def write(self, buf):
+        if not self.writable:
+            raise OSError(9, "EBADF")
+        if isinstance(buf, str):
+            buf = buf.encode()
+        if self.append:
+            self.pos = len(self.data)
+        self.data[self.pos:self.pos + len(buf)] = buf
+        self.pos += len(buf)
+        self._written += len(buf)
+        return len(buf)
+
+    def seek(self, offset, whence=0):
+        base = (0, self.pos, len(self.data))[whence]
+        self.pos = max(0, base + offset)
+        return self.pos
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if not (self._written or self._truncated):
+            return
+        _count("writes")
+        _count("bytes", self._written)
+        size = len(self.data)
+        if size <= INLINE_MAX:
+            _commit(self._storage, size)   # Inline: the whole file goes into the commit
+            return
+        # Copy-on-write of the tail block(s) + the new data (an inline file moves out whole)
+        start = self._start if self._start > INLINE_MAX else 0
+        tail = start % BLOCK + size - start
+        _program((tail + PAGE - 1) // PAGE, (tail + BLOCK - 1) // BLOCK)
+        _commit(self._storage, CTZ_BYTES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def open(path, mode="r", *args, **kwargs):
+    return _File(path, mode)
+
+
+def install(*modules):
+    """Point `os` and `open` of firmware modules at this filesystem."""
+    import sys
+    this = sys.modules[__name__]
+    for module in modules:
+        module.os = this
+        module.open = open
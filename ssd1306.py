@@ -1,11 +1,13 @@
 # ssd1306.py
 # Optimized for 3x 128x32 OLEDs on I2C (Pico)
 # Faster show(), dirty rect, async-safe, debug_print
+# show() diffs against a shadow copy of the panel RAM → only changed bytes go out
 # Compatible with display_manager.py, main.py
 
 from micropython import const
 import framebuf
 import utime
+import debuglog
 
 # --- SSD1306 Register ---
 SET_CONTRAST = const(0x81)
@@ -26,14 +28,45 @@ SET_PRECHARGE = const(0xD9)
 SET_VCOM_DESEL = const(0xDB)
 SET_CHARGE_PUMP = const(0x8D)
 
+# --- Transfer tuning ---
+# Approx. bytes on the wire to start a new span (address commands + data header).
+# Unchanged columns/pages are sent along when that is cheaper than a new span.
+SPAN_OVERHEAD = const(10)
+# Windows start and end on this column grid and are sent from one view per
+# cell, built once (SSD1306._views): slicing a memoryview allocates
+WINDOW_CELL = const(8)
+
+# utime.ticks_ms() of the first show()/show_async() of any panel: on the rp2
+# port ticks_ms counts from reset, so this is the boot time to the first
+# picture (main.py reports it, tools/bench_boot.py reads it in the simulator)
+first_show_ms = -1
+
 class SSD1306(framebuf.FrameBuffer):
     def __init__(self, width, height, external_vcc=False, debug_print=None):
         self.width = width
         self.height = height
         self.external_vcc = external_vcc
         self.pages = height // 8
-        self.debug_print = debug_print or (lambda *args: None)
+        self.debug_print = debug_print or (lambda *args, **kwargs: None)
         self.buffer = bytearray(self.pages * self.width)
+        self._mv = memoryview(self.buffer)
+        self._shadow = bytearray(len(self.buffer))  # What the panel RAM holds
+        self._shadow_valid = False                  # Unknown until the first full send
+        # One view per page and cell (64 for 128x32), index page * cells + cell
+        self._cells = cells = (width + WINDOW_CELL - 1) // WINDOW_CELL
+        self._views = [self._mv[a:a + WINDOW_CELL if c < cells - 1 else (a // width + 1) * width]
+                       for a, c in ((p * width + c * WINDOW_CELL, c)
+                                    for p in range(self.pages) for c in range(cells))]
+        # Window scan state (see _begin_scan/_next_window)
+        self._sx0 = self._sx1 = self._spage = self._spage1 = self._sc = 0
+        self._sfull = False
+        self._pc0 = self._pc1 = self._pp1 = 0
+        self._pp0 = -1
+        self._wc0 = self._wc1 = self._wp0 = self._wp1 = 0
+        self.col_offset = (128 - width) // 2 if width < 128 else 0
+        # Preallocated command sequences (one write_cmds() transaction each)
+        self._window_cmd = bytearray((SET_COL_ADDR, 0, 0, SET_PAGE_ADDR, 0, 0))
+        self._cmd2 = bytearray(2)
         super().__init__(self.buffer, width, height, framebuf.MONO_VLSB)
         self.init_display()
 
@@ -57,8 +90,7 @@ class SSD1306(framebuf.FrameBuffer):
             SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
             SET_DISP | 0x01  # Display on
         ]
-        for cmd in cmds:
-            self.write_cmd(cmd)
+        self.write_cmds(bytes(cmds))  # One transaction for the whole sequence
         self.fill(0)
         self.show()
         self.debug_print("SSD1306 initialized.", level=2)
@@ -70,49 +102,207 @@ class SSD1306(framebuf.FrameBuffer):
         self.write_cmd(SET_DISP | 0x01)
 
     def contrast(self, contrast):
-        self.write_cmd(SET_CONTRAST)
-        self.write_cmd(contrast & 0xFF)
+        cmd = self._cmd2
+        cmd[0] = SET_CONTRAST
+        cmd[1] = contrast & 0xFF
+        self.write_cmds(cmd)
 
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
     def rotate(self, rotate):
-        self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
-        self.write_cmd(SET_SEG_REMAP | (rotate & 1))
+        cmd = self._cmd2
+        cmd[0] = SET_COM_OUT_DIR | ((rotate & 1) << 3)
+        cmd[1] = SET_SEG_REMAP | (rotate & 1)
+        self.write_cmds(cmd)
+
+    def invalidate(self):
+        """Panel RAM unknown (e.g. after an I2C error) → next show() sends everything."""
+        self._shadow_valid = False
 
-    def show(self, x0=0, y0=0, x1=None, y1=None):
+    def show(self, x0=0, y0=0, x1=None, y1=None, full=False):
         """
-        Optimized show() with optional dirty rectangle
-        If no rect given → full screen
+        Send what changed since the last show().
+        The framebuffer is compared page by page with the shadow copy of the
+        panel RAM; only changed column spans (widened to WINDOW_CELL columns)
+        are transferred, and spans are merged (also across pages) when that
+        costs less than SPAN_OVERHEAD.
+        Optional rect (inclusive) limits the comparison; full=True sends the
+        rect unconditionally. Returns the number of pixel bytes sent.
+        """
+        sent = 0
+        if self._begin_scan(x0, y0, x1, y1, full):
+            while self._next_window():
+                sent += self._send_window(self._wc0, self._wc1, self._wp0, self._wp1)
+        return sent
+
+    async def show_async(self, pause, x0=0, y0=0, x1=None, y1=None, full=False):
         """
+        show() in chunks: before each window `await pause(nbytes)` lets the
+        caller yield or hold the transfer back (display_flush.FlushScheduler).
+        Only one show()/show_async() per panel at a time (shared scan state).
+        """
+        sent = 0
+        if self._begin_scan(x0, y0, x1, y1, full):
+            while self._next_window():
+                wc0, wc1, wp0, wp1 = self._wc0, self._wc1, self._wp0, self._wp1
+                await pause((wc1 - wc0 + 1) * (wp1 - wp0 + 1) + SPAN_OVERHEAD)
+                sent += self._send_window(wc0, wc1, wp0, wp1)
+        return sent
+
+    def _begin_scan(self, x0, y0, x1, y1, full):
+        """Clamp the rect and reset the window scan. False if nothing to do."""
+        global first_show_ms
+        if first_show_ms < 0:
+            first_show_ms = utime.ticks_ms()
         if x1 is None: x1 = self.width - 1
         if y1 is None: y1 = self.height - 1
+        if not self._shadow_valid:
+            x0, y0, x1, y1, full = 0, 0, self.width - 1, self.height - 1, True
 
-        page0 = y0 // 8
-        page1 = y1 // 8
+        # Clamp to the panel
+        x0 = max(0, x0)
+        x1 = min(x1, self.width - 1)
+        page0 = max(0, y0 // 8)
+        page1 = min(y1 // 8, self.pages - 1)
+        if x0 > x1 or page0 > page1:
+            return False
 
-        # Clamp to valid pages
-        page0 = max(0, min(page0, self.pages - 1))
-        page1 = max(0, min(page1, self.pages - 1))
+        if full:
+            x0 -= x0 % WINDOW_CELL
+            x1 = x1 - x1 % WINDOW_CELL + WINDOW_CELL - 1
+            if x1 >= self.width:
+                x1 = self.width - 1
+            self._shadow_valid = True
+            if debuglog.level >= 3:
+                debuglog.event(3, debuglog.SHOW_FULL, page0, page1, x0, x1)
+        self._sx0 = x0
+        self._sx1 = x1
+        self._spage = page0
+        self._spage1 = page1
+        self._sc = x0
+        self._sfull = full
+        self._pp0 = -1
+        return True
+
+    def _next_window(self):
+        """
+        Advance the scan to the next window to send (self._wc0/_wc1/_wp0/_wp1).
+        Returns False when the rect is done. The scan state lives in the
+        instance, so show_async() can pause between windows without allocating.
+        """
+        x0 = self._sx0
+        x1 = self._sx1
+        page1 = self._spage1
+        page = self._spage
+        if self._sfull:
+            if page > page1:
+                return False
+            self._wc0, self._wc1, self._wp0, self._wp1 = x0, x1, page, page1
+            self._spage = page1 + 1
+            return True
 
-        col_offset = (128 - self.width) // 2 if self.width < 128 else 0
-        col_start = x0 + col_offset
-        col_end = x1 + col_offset
+        buf = self.buffer
+        shadow = self._shadow
+        w = self.width
+        c = self._sc
+        # Pending window cols wc0..wc1, pages wp0..wp1 (wp0 < 0: none)
+        wc0, wc1, wp0, wp1 = self._pc0, self._pc1, self._pp0, self._pp1
+        while page <= page1:
+            base = page * w
+            while c <= x1:
+                if buf[base + c] == shadow[base + c]:
+                    c += 1
+                    continue
+                # Changed span: extend while the unchanged gap stays cheaper than a new span
+                start = c - c % WINDOW_CELL
+                end = c
+                c += 1
+                while c <= x1 and c - end <= SPAN_OVERHEAD:
+                    if buf[base + c] != shadow[base + c]:
+                        end = c
+                    c += 1
+                # Whole cells; the scan goes on behind the last one
+                end = end - end % WINDOW_CELL + WINDOW_CELL - 1
+                if end >= w:
+                    end = w - 1
+                if c <= end:
+                    c = end + 1
 
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(col_start)
-        self.write_cmd(col_end)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(page0)
-        self.write_cmd(page1)
+                if wp0 >= 0 and wp1 == page - 1:
+                    # Merge with the window above if the extra bytes cost less than a new span
+                    c0 = start if start < wc0 else wc0
+                    c1 = end if end > wc1 else wc1
+                    pages = page - wp0 + 1
+                    merged = (c1 - c0 + 1) * pages
+                    separate = (wc1 - wc0 + 1) * (pages - 1) + (end - start + 1) + SPAN_OVERHEAD
+                    if merged <= separate:
+                        wc0, wc1, wp1 = c0, c1, page
+                        continue
+                if wp0 >= 0:
+                    # Emit the pending window, keep the new span pending
+                    self._wc0, self._wc1, self._wp0, self._wp1 = wc0, wc1, wp0, wp1
+                    self._pc0, self._pc1, self._pp0, self._pp1 = start, end, page, page
+                    self._spage = page
+                    self._sc = c
+                    return True
+                wc0, wc1, wp0, wp1 = start, end, page, page
+            page += 1
+            c = x0
+        self._spage = page
+        self._sc = c
+        self._pp0 = -1
+        if wp0 >= 0:
+            self._wc0, self._wc1, self._wp0, self._wp1 = wc0, wc1, wp0, wp1
+            return True
+        return False
 
-        # Extract only dirty region from buffer
-        start_idx = page0 * self.width + x0
-        end_idx = (page1 + 1) * self.width + x1 + 1
-        data = self.buffer[start_idx:end_idx]
+    def _send_window(self, c0, c1, p0, p1):
+        """
+        Address a column/page window and send exactly its bytes in one
+        transaction (header + the cell views of each page), then update the
+        shadow. c0/c1 lie on the WINDOW_CELL grid (c1: cell end or last column).
+        """
+        off = self.col_offset
+        cmd = self._window_cmd
+        cmd[1] = c0 + off
+        cmd[2] = c1 + off
+        cmd[4] = p0
+        cmd[5] = p1
+        if not self.write_cmds(cmd):
+            self._shadow_valid = False  # Data would land in an unknown window
+            return 0
 
-        self.write_data(data)
-        self.debug_print(f"show() → pages {page0}-{page1}, cols {col_start}-{col_end}", level=3)
+        n = c1 - c0 + 1
+        pages = p1 - p0 + 1
+        vec = self._window_vec
+        views = self._views
+        cells = self._cells
+        m = (c1 - c0) // WINDOW_CELL + 1    # Cells per page
+        first = p0 * cells + c0 // WINDOW_CELL
+        j = 1
+        for k in range(pages):
+            i = first + k * cells
+            for _ in range(m):
+                vec[j] = views[i]
+                i += 1
+                j += 1
+        ok = self.write_vector(vec)
+        shadow = self._shadow
+        empty = self._empty
+        j = 1
+        for k in range(pages):
+            a = (p0 + k) * self.width + c0
+            for _ in range(m):
+                view = vec[j]
+                if ok:
+                    shadow[a:a + len(view)] = view
+                    a += WINDOW_CELL
+                vec[j] = empty
+                j += 1
+        if not ok:
+            self._shadow_valid = False
+        return n * pages
 
 
 class SSD1306_I2C(SSD1306):
@@ -120,7 +310,15 @@ class SSD1306_I2C(SSD1306):
         self.i2c = i2c
         self.addr = addr
         self.cmd_buf = bytearray(2)
-        self.data_header = bytearray([0x40])
+        self.cmd_header = b'\x00'
+        self._cmd_vec = [self.cmd_header, None]
+        self.data_header = b'\x40'
+        # Preallocated writevto vectors → one transaction per window, no header
+        # concatenation: header + cell views of a window, unused slots empty
+        self._empty = b''
+        cells = (width + WINDOW_CELL - 1) // WINDOW_CELL
+        self._window_vec = [self.data_header] + [self._empty] * (height // 8 * cells)
+        self._data_vec = [self.data_header, None]
         super().__init__(width, height, external_vcc, debug_print)
 
     def write_cmd(self, cmd):
@@ -131,11 +329,35 @@ class SSD1306_I2C(SSD1306):
         except OSError as e:
             self.debug_print(f"I2C write_cmd error: {e}", level=0)
 
+    def write_cmds(self, cmds):
+        """
+        Send a command sequence in one transaction: 0x00 control byte + commands
+        (instead of one start/address/stop per byte). Returns False on I2C error.
+        """
+        vec = self._cmd_vec
+        vec[1] = cmds
+        try:
+            self.i2c.writevto(self.addr, vec)
+            return True
+        except OSError as e:
+            self.debug_print(f"I2C write_cmds error: {e}", level=0)
+            return False
+        finally:
+            vec[1] = None
+
     def write_data(self, buf):
-        """Faster: send header + data in one writeto"""
+        """Send header + data in one transaction (no copy). Returns False on I2C error."""
+        vec = self._data_vec
+        vec[1] = buf
+        ok = self.write_vector(vec)
+        vec[1] = None
+        return ok
+
+    def write_vector(self, vec):
+        """writevto() a preallocated [header, data...] vector. Returns False on I2C error."""
         try:
-            # Combine header + data
-            full_data = self.data_header + buf
-            self.i2c.writeto(self.addr, full_data)
+            self.i2c.writevto(self.addr, vec)
+            return True
         except OSError as e:
-            self.debug_print(f"I2C write_data error: {e}", level=0)
\ No newline at end of file
+            self.debug_print(f"I2C write_data error: {e}", level=0)
+            return False
\ No newline at end of file
@@ -0,0 +1,161 @@
+# stepper_pio.py
+# RP2040 PIO backend for 4-phase stepper outputs
+# The state machine rotates a phase pattern and drives all 4 coils in one
+# `mov pins` per step, timed in PIO cycles – the CPU only pushes commands.
+#
+# Command word (TX FIFO):  [29:16] delay cycles | [15:1] count-1 | [0] direction
+# The word stays below 2^30 – a small int on rp2, no bigint allocated per step –
+# hence 2 µs PIO cycles: 14 delay bits reach 32 ms per step (planner minimum
+# rates are 40 steps/s and up).
+# Constraints: the 4 coil GPIOs must be consecutive (PIO pin group), and the
+# state table must be a 1-bit rotation per step (full step / wave drive).
+# Half-step tables → use the Python backend (motor.PythonPhaseBackend).
+
+try:
+    import rp2
+    from machine import Pin
+except ImportError:                # CPython host (tools/pio_emu.py)
+    rp2 = None
+
+PIO_FREQ = 500_000                 # 1 cycle = 2 µs
+US_PER_CYCLE = 1_000_000 // PIO_FREQ
+STEP_LOOP_CYCLES = 5               # Cycles per step besides the delay loop
+MAX_DELAY = 0x3FFF
+MAX_COUNT = 0x8000
+TX_FIFO_DEPTH = 4
+LEAD_US = 10_000                   # How far ahead of the PIO the engine may queue
+
+
+# --- Phase pattern helpers ---
+def _nibble(state):
+    """[p1, p2, p3, p4] → 4-bit pin value (p1 = lowest pin)."""
+    value = 0
+    for i, val in enumerate(state):
+        if val:
+            value |= 1 << i
+    return value
+
+
+def _rotl4(n):
+    return ((n << 1) | (n >> 3)) & 0x0F
+
+
+def phase_pattern(states, index):
+    """
+    32-bit pattern word whose low nibble is states[index] and whose
+    right-rotation walks the table. Returns (word, fwd_shift, rev_shift)
+    for `in isr, shift`, or None if the table is not a rotation sequence.
+    """
+    nibbles = [_nibble(s) for s in states]
+    n = len(nibbles)
+    if n != 4:
+        return None
+    if all(nibbles[(k + 1) % n] == _rotl4(nibbles[k]) for k in range(n)):
+        fwd_shift, rev_shift = 3, 1        # Next state = rotate left
+    elif all(_rotl4(nibbles[(k + 1) % n]) == nibbles[k] for k in range(n)):
+        fwd_shift, rev_shift = 1, 3        # Next state = rotate right
+    else:
+        return None
+    word = 0
+    for i in range(8):
+        word |= nibbles[index % n] << (4 * i)
+    return word, fwd_shift, rev_shift
+
+
+def encode_command(direction, count, period_us):
+    """Pack one command: `count` steps in `direction`, one step per period_us."""
+    delay = period_us // US_PER_CYCLE - STEP_LOOP_CYCLES
+    if delay < 0:
+        delay = 0
+    elif delay > MAX_DELAY:
+        delay = MAX_DELAY
+    return (delay << 16) | ((count - 1) << 1) | (1 if direction > 0 else 0)
+
+
+# --- PIO program ---
+def stepper_program_source(fwd_shift, rev_shift):
+    """
+    PIO assembly (rp2.asm_pio DSL) for the given rotation shifts.
+    ISR holds the rotating pattern (in_shiftdir right → `in isr, n` is a
+    rotate right by n), OSR keeps the delay after count/direction are shifted out.
+    """
+    def stepper_phases():
+        pull(block)                     # Initial phase pattern (coils stay off)
+        mov(isr, osr)
+        wrap_target()
+        label("cmd")
+        pull(block)
+        out(x, 1)                       # Direction
+        jmp(not_x, "rev")
+        out(x, 15)                      # count - 1
+        label("fwd")
+        in_(isr, fwd_shift)
+        mov(pins, isr)                  # All 4 coils switch together
+        mov(y, osr)                     # Delay cycles
+        label("fwd_delay")
+        jmp(y_dec, "fwd_delay")
+        jmp(x_dec, "fwd")
+        jmp("cmd")
+        label("rev")
+        out(x, 15)
+        label("rev_step")
+        in_(isr, rev_shift)
+        mov(pins, isr)
+        mov(y, osr)
+        label("rev_delay")
+        jmp(y_dec, "rev_delay")
+        jmp(x_dec, "rev_step")
+        wrap()
+    return stepper_phases
+
+
+def build_program(fwd_shift, rev_shift):
+    return rp2.asm_pio(
+        out_init=(rp2.PIO.OUT_LOW,) * 4,
+        out_shiftdir=rp2.PIO.SHIFT_RIGHT,
+        in_shiftdir=rp2.PIO.SHIFT_RIGHT,
+    )(stepper_program_source(fwd_shift, rev_shift))
+
+
+# --- Backend ---
+class PioPhaseBackend:
+    """
+    Phase output through a PIO state machine.
+    Same interface as motor.PythonPhaseBackend: emit(), room(), release(), lead_us.
+    """
+
+    def __init__(self, sm_id, gpios, states, state_index=0):
+        if rp2 is None:
+            raise ImportError("rp2 not available")
+        base = gpios[0]
+        for i, gpio in enumerate(gpios):
+            if gpio != base + i:
+                raise ValueError(f"PIO needs consecutive GPIOs, got {gpios}")
+        pattern = phase_pattern(states, state_index)
+        if pattern is None:
+            raise ValueError("State table is not a 1-bit rotation (half step?)")
+        word, fwd_shift, rev_shift = pattern
+        self.lead_us = LEAD_US
+        self.sm = rp2.StateMachine(sm_id, build_program(fwd_shift, rev_shift),
+                                   freq=PIO_FREQ, out_base=Pin(base))
+        self.sm.active(1)
+        self.sm.put(word)
+
+    def room(self):
+        return self.sm.tx_fifo() < TX_FIFO_DEPTH
+
+    def emit(self, direction, period_us, count=1):
+        """Queue `count` steps; the PIO holds each phase for period_us."""
+        self.sm.put(encode_command(direction, count, period_us))
+
+    def release(self):
+        """De-energize all coils; the pattern in ISR is kept for the next step."""
+        self.sm.exec("mov(pins, null)")
+
+    def halt(self):
+        """Stop the state machine (drops queued steps), then coils off."""
+        self.sm.active(0)
+        self.sm.exec("mov(pins, null)")
+
+    def deinit(self):
+        self.sm.active(0)
@@ -1,16 +1,51 @@
 # store_km.py
-# Persistent odometer storage with double redundancy and CRC8 checksum
-# Mounts on /data, safe for RP2040, only writes when vehicle is stopped
+# Persistent odometer storage: small binary journal with CRC-16
+# Mounts on /data, safe for RP2040
+# Each save appends one fixed-size record (seq, total/trip in mm = km with
+# 6 decimals, CRC). The journal stays within LittleFS's inline limit (128 B
+# with the VfsLfs2 defaults), so it lives in the directory metadata like the
+# two old text files did: a save is one metadata commit (they took two), and
+# a block is erased only when the commits fill the metadata block: every ~40
+# saves, the text files every ~30 (tools/bench_flash.py). A file past the
+# limit gets blocks of its own and every append copies its tail block → one
+# 4 KB erase per save. When full, the journal is rewritten with the newest
+# record + the new one ("wb": LittleFS swaps the new contents in atomically
+# on close).
+# Boot finds the newest valid record (last record, binary search over the
+# sequence numbers if the tail is damaged).
+# The power-fail save (final=True) comes from a timer callback that runs
+# between bytecodes, possibly in the middle of a regular save: that save is
+# busy, so the final totals are left pending and the running save writes them
+# before it returns (never a reused seq, never stale totals after the final
+# record). After a final save regular saves are refused until resume().
+# The previous text files (odo1.txt/odo2.txt) are still read once to migrate.
+# The firmware saves/loads wheel pulse counts (distance.py), stored as mm.
 
 import os
-import rp2
+import struct
+from distance import MM_PER_KM, pulses_to_mm, mm_to_pulses
 
 # --- Configuration ---
 DATA_DIR = "/data"
-FILE_PRIMARY = f"{DATA_DIR}/odo1.txt"
+FILE_PRIMARY = f"{DATA_DIR}/odo1.txt"     # Legacy text files (read-only now)
 FILE_BACKUP = f"{DATA_DIR}/odo2.txt"
+JOURNAL_FILE = f"{DATA_DIR}/odo.jnl"
 
-# --- CRC8 Checksum ---
+# --- Journal record: seq, total_mm, trip_mm, flags, crc16 (over the first 22 bytes) ---
+RECORD_FORMAT = "<IQQHH"
+RECORD_SIZE = 24
+JOURNAL_MAX_RECORDS = 3                    # 72 B: inline, one 96 B commit with its tags
+
+_record = bytearray(RECORD_SIZE)           # Preallocated write buffers
+_pair = bytearray(2 * RECORD_SIZE)         # Rewrite of a full journal
+_seq = 0                                   # Sequence number of the newest record
+_records = 0                               # Records in the journal file
+_last = None                               # (total_mm, trip_mm) of the newest record
+_busy = False                              # A save is running (the power-fail callback may preempt it)
+_pending = None                            # (total_mm, trip_mm) of a final save that arrived meanwhile
+_sealed = False                            # Final save done: regular saves refused until resume()
+
+# --- CRC8 Checksum (legacy text format) ---
 def _crc8(data: str) -> int:
     """Simple XOR-based CRC8 for data integrity."""
     crc = 0
@@ -18,9 +53,37 @@ def _crc8(data: str) -> int:
         crc ^= byte
     return crc
 
+# --- CRC-16/CCITT-FALSE (journal records) ---
+def _crc16(buf, start, end):
+    crc = 0xFFFF
+    for i in range(start, end):
+        crc ^= buf[i] << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+def _pack(buf, offset, seq, total_mm, trip_mm):
+    struct.pack_into(RECORD_FORMAT, buf, offset, seq, total_mm, trip_mm, 0, 0)
+    end = offset + RECORD_SIZE - 2
+    struct.pack_into("<H", buf, end, _crc16(buf, offset, end))
+    return buf
+
+def _unpack(buf):
+    """(seq, total_mm, trip_mm) or None if the record is damaged/empty."""
+    if len(buf) != RECORD_SIZE:
+        return None
+    seq, total_mm, trip_mm, _, crc = struct.unpack(RECORD_FORMAT, buf)
+    if crc != _crc16(buf, 0, RECORD_SIZE - 2):
+        return None
+    return seq, total_mm, trip_mm
+
 # --- Filesystem Initialization ---
 def init_filesystem(debug_print):
     """Mount or format LittleFS on internal flash."""
+    import rp2
     try:
         bdev = rp2.Flash()
         vfs = os.VfsLfs2(bdev, block_size=4096)
@@ -38,26 +101,161 @@ def init_filesystem(debug_print):
                 return False
     return True
 
-# --- Save Odometer (double redundant) ---
-def save_odometer(total_km: float, trip_km: float, debug_print=None):
-    """Save total and trip km to both files with CRC8."""
-    data = f"{total_km:.6f},{trip_km:.6f}"
-    checksum = _crc8(data)
-    line = f"{data},{checksum}"
+# --- Journal ---
+def _file_size(path):
+    try:
+        return os.stat(path)[6]
+    except OSError:
+        return -1
+
+def find_latest(f, count):
+    """
+    Newest valid record of a journal file with `count` record slots:
+    (index, (seq, total_mm, trip_mm)) or (-1, None).
+    Records are appended with consecutive sequence numbers, so "valid and
+    seq == first seq + index" holds for a prefix of the file; the end of that
+    prefix is found by binary search (usually the last slot, checked first).
+    """
+    def read(i):
+        f.seek(i * RECORD_SIZE)
+        return _unpack(f.read(RECORD_SIZE))
+
+    if count <= 0:
+        return -1, None
+    first = read(0)
+    if first is None:
+        return -1, None
+    last = read(count - 1)
+    if last is not None and last[0] == first[0] + count - 1:
+        return count - 1, last             # Common case: intact tail
+    lo, hi = 0, count - 1                  # lo: in the prefix, hi: not
+    best = first
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        rec = read(mid)
+        if rec is not None and rec[0] == first[0] + mid:
+            lo, best = mid, rec
+        else:
+            hi = mid
+    return lo, best
+
+def save_odometer_mm(total_mm, trip_mm, debug_print=None, final=False):
+    """
+    Append one record (distances in mm). Returns True when written.
+    A full journal is rewritten with the newest record + this one; both are
+    one inline commit, so the power-fail save (final=True) takes the same path.
+    final while a save is running: pending, True = written by that save
+    before it returns (the callback cannot wait for it).
+    """
+    global _busy, _pending, _sealed
+    if _busy:
+        if not final:
+            return False
+        _pending = (total_mm, trip_mm)
+        return True
+    _busy = True
+    write = final or not _sealed           # After _busy: a final save just before it wrote directly
+    ok = False
+    while True:
+        pending = _pending
+        if pending is not None:
+            _pending = None                # Newer than this save's totals: write those instead
+            total_mm, trip_mm = pending
+            final = write = True
+        if write:
+            if final:
+                _sealed = True
+            ok = _write(total_mm, trip_mm, debug_print)
+        if _pending is None:
+            _busy = False
+            if _pending is None:           # Not set between the check and clearing _busy
+                return ok
+            _busy = True
+
+def resume():
+    """Supply back after a final save (brown-out): allow regular saves again."""
+    global _sealed
+    _sealed = False
 
-    for filepath in [FILE_PRIMARY, FILE_BACKUP]:
+def _write(total_mm, trip_mm, debug_print):
+    """One record: append, or rewrite a full journal (called with _busy set)."""
+    global _seq, _records, _last
+    seq = _seq + 1
+    try:
+        if _records < JOURNAL_MAX_RECORDS:
+            with open(JOURNAL_FILE, "ab") as f:
+                f.write(_pack(_record, 0, seq, total_mm, trip_mm))
+            _records += 1
+        else:
+            _pack(_pair, 0, _seq, _last[0], _last[1])
+            _pack(_pair, RECORD_SIZE, seq, total_mm, trip_mm)
+            with open(JOURNAL_FILE, "wb") as f:
+                f.write(_pair)
+            _records = 2
+        _seq = seq
+        _last = (total_mm, trip_mm)
+        if debug_print:
+            debug_print(f"Saved odometer → journal #{seq}", level=2)
+        return True
+    except Exception as e:
+        if debug_print:
+            debug_print(f"ERROR writing {JOURNAL_FILE}: {e}", level=0)
+        return False
+
+def load_odometer_mm(debug_print=None):
+    """(total_mm, trip_mm) from the journal; migrates the legacy text files once."""
+    global _seq, _records, _last
+    size = _file_size(JOURNAL_FILE)
+    if size > 0:
         try:
-            with open(filepath, "w") as f:
-                f.write(line)
+            count = size // RECORD_SIZE
+            with open(JOURNAL_FILE, "rb") as f:
+                idx, rec = find_latest(f, count)
+            if rec is not None:
+                _seq = rec[0]
+                _records = count
+                if idx < count - 1 or size % RECORD_SIZE or count > JOURNAL_MAX_RECORDS:
+                    # Damaged tail or a 4 KB journal of the earlier layout:
+                    # the next save rewrites it (newest record + new one)
+                    _records = JOURNAL_MAX_RECORDS
+                _last = (rec[1], rec[2])
+                if debug_print:
+                    debug_print(f"Loaded odometer from journal #{_seq}: "
+                                f"{rec[1] / MM_PER_KM:.3f} km, trip {rec[2] / MM_PER_KM:.3f} km", level=1)
+                return _last
             if debug_print:
-                debug_print(f"Saved odometer → {filepath}", level=2)
+                debug_print("Odometer journal has no valid record", level=0)
         except Exception as e:
             if debug_print:
-                debug_print(f"ERROR writing {filepath}: {e}", level=0)
+                debug_print(f"ERROR reading {JOURNAL_FILE}: {e}", level=0)
+
+    # No journal yet → legacy text files (or zero), then start the journal
+    total_km, trip_km = _load_legacy(debug_print)
+    _seq = 0
+    _records = 0
+    if size > 0:
+        try:
+            os.remove(JOURNAL_FILE)        # Unreadable journal: start over
+        except OSError:
+            pass
+    total_mm = int(round(total_km * MM_PER_KM))
+    trip_mm = int(round(trip_km * MM_PER_KM))
+    save_odometer_mm(total_mm, trip_mm, debug_print)
+    return total_mm, trip_mm
+
+# --- Pulse interface (SharedTelemetryData.total_pulses / trip_pulses) ---
+def save_odometer(total_pulses: int, trip_pulses: int, debug_print=None, final=False):
+    """Save total and trip wheel pulses (stored as mm) to the journal."""
+    return save_odometer_mm(pulses_to_mm(total_pulses), pulses_to_mm(trip_pulses), debug_print, final)
 
-# --- Load Odometer (with validation + fallback) ---
 def load_odometer(debug_print=None):
-    """Load from primary, fallback to backup. Initialize if both invalid."""
+    """Load (total_pulses, trip_pulses) from the journal."""
+    total_mm, trip_mm = load_odometer_mm(debug_print)
+    return mm_to_pulses(total_mm), mm_to_pulses(trip_mm)
+
+# --- Legacy text files (migration only) ---
+def _load_legacy(debug_print=None):
+    """Load from primary, fallback to backup; (0.0, 0.0) if both invalid."""
     def read_file(filepath):
         try:
             with open(filepath, "r") as f:
@@ -69,25 +267,16 @@ def load_odometer(debug_print=None):
                     return float(total_str), float(trip_str)
         except Exception as e:
             if debug_print:
-                debug_print(f"ERROR reading {filepath}: {e}", level=1)
+                debug_print(f"ERROR reading {filepath}: {e}", level=2)
         return None
 
-    # Try primary
-    result = read_file(FILE_PRIMARY)
-    if result is not None:
-        if debug_print:
-            debug_print(f"Loaded odometer from {FILE_PRIMARY}: {result}", level=1)
-        return result
-
-    # Try backup
-    result = read_file(FILE_BACKUP)
-    if result is not None:
-        if debug_print:
-            debug_print(f"Loaded odometer from {FILE_BACKUP}: {result}", level=1)
-        return result
+    for filepath in (FILE_PRIMARY, FILE_BACKUP):
+        result = read_file(filepath)
+        if result is not None:
+            if debug_print:
+                debug_print(f"Migrating odometer from {filepath}: {result}", level=1)
+            return result
 
-    # Both failed → initialize
     if debug_print:
         debug_print("No valid odometer data → initializing to 0.0", level=0)
-    save_odometer(0.0, 0.0, debug_print)
-    return 0.0, 0.0
\ No newline at end of file
+    return 0.0, 0.0
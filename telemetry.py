@@ -0,0 +1,127 @@
+# telemetry.py
+# Fixed-layout telemetry record for RS485 frames (no per-frame dicts)
+# Preallocated __slots__ records, filled in place; status strings are
+# derived elsewhere, only when the raw status words change
+
+try:
+    from micropython import const
+except ImportError:                # CPython host
+    def const(x):
+        return x
+
+# --- Payload layout (frame bytes 1..14, big endian) ---
+# motorRPM u16 | motorTemp s8 | mcuTemp s8 | mcuFlags u16 | mcuFault u8 |
+# imdIsoR u16 | imdStatus u16 | vifcStatus u16 | valid u8
+TELEMETRY_FORMAT = ">HbbHBHHHB"    # For struct-based host tools
+PAYLOAD_OFFSET = const(1)
+
+VALID_IMD = const(0x01)
+VALID_MOTOR = const(0x02)
+VALID_SELF_TEST_FAILED = const(0x80)
+
+R_ISO_MAX = 50000          # Used in validation and default telemetry
+R_ISO_WARNING = 400        # Below → systemStatus 'ISO_ERROR'
+
+
+class TelemetryRecord:
+    """
+    One decoded RS485 telemetry frame.
+    Filled in place by unpack(): field access by byte index, so decoding a frame
+    allocates nothing (struct.unpack_from would return a new tuple every call).
+    """
+    __slots__ = ('motor_rpm', 'motor_temp', 'mcu_temp', 'mcu_flags', 'mcu_fault_level',
+                 'imd_iso_r', 'imd_status', 'vifc_status', 'valid')
+
+    def __init__(self):
+        self.motor_rpm = 0
+        self.motor_temp = 0
+        self.mcu_temp = 0
+        self.mcu_flags = 0
+        self.mcu_fault_level = 0
+        self.imd_iso_r = R_ISO_MAX
+        self.imd_status = 0
+        self.vifc_status = 0
+        self.valid = 0
+
+    def unpack(self, packet, offset=PAYLOAD_OFFSET):
+        """Decode the 14 payload bytes of a validated frame into this record."""
+        p = packet
+        o = offset
+        self.motor_rpm = (p[o] << 8) | p[o + 1]
+        t = p[o + 2]
+        self.motor_temp = t - 256 if t & 0x80 else t
+        t = p[o + 3]
+        self.mcu_temp = t - 256 if t & 0x80 else t
+        self.mcu_flags = (p[o + 4] << 8) | p[o + 5]
+        self.mcu_fault_level = p[o + 6]
+        self.imd_iso_r = (p[o + 7] << 8) | p[o + 8]
+        self.imd_status = (p[o + 9] << 8) | p[o + 10]
+        self.vifc_status = (p[o + 11] << 8) | p[o + 12]
+        self.valid = p[o + 13]
+        return self
+
+    @property
+    def motor_valid(self):
+        return bool(self.valid & VALID_MOTOR)
+
+    @property
+    def imd_valid(self):
+        return bool(self.valid & VALID_IMD)
+
+    @property
+    def self_test_failed(self):
+        return bool(self.valid & VALID_SELF_TEST_FAILED)
+
+
+def validate_telemetry_data(rec):
+    """Plausibility check of a decoded record (same limits as the dict version)."""
+    valid = rec.valid
+    motor_valid = valid & VALID_MOTOR
+    imd_valid = valid & VALID_IMD
+    if not (motor_valid or imd_valid):
+        return False
+    if motor_valid:
+        if not (0 <= rec.motor_rpm < 12000):
+            return False
+        if not (-40 <= rec.motor_temp <= 150):
+            return False
+        if not (-40 <= rec.mcu_temp <= 150):
+            return False
+    if imd_valid:
+        if not (0 <= rec.imd_iso_r < R_ISO_MAX):
+            return False
+    return True
+
+
+def publish_telemetry(rec, t):
+    """
+    Copy a validated record into the shared telemetry dict `t`.
+    Only existing keys are overwritten → no dict growth, no allocation.
+    Raw status words are published; block_status derives the strings.
+    """
+    motor_valid = bool(rec.valid & VALID_MOTOR)
+    imd_valid = bool(rec.valid & VALID_IMD)
+    if motor_valid:
+        t['motorRPM'] = rec.motor_rpm
+        t['motorTemp'] = rec.motor_temp
+        t['mcuTemp'] = rec.mcu_temp
+        t['mcuFlags'] = rec.mcu_flags
+        t['mcuFaultLevel'] = rec.mcu_fault_level
+    else:
+        t['motorRPM'] = 0
+        t['motorTemp'] = 0
+        t['mcuTemp'] = 0
+        t['mcuFlags'] = 0
+        t['mcuFaultLevel'] = 0
+    if imd_valid:
+        t['imdIsoR'] = rec.imd_iso_r
+        t['imdStatusRaw'] = rec.imd_status
+        t['vifcStatusRaw'] = rec.vifc_status
+    else:
+        t['imdIsoR'] = 0
+        t['imdStatusRaw'] = 0
+        t['vifcStatusRaw'] = 0
+    t['motorDataValid'] = motor_valid
+    t['imdDataValid'] = imd_valid
+    is_ok = (motor_valid or imd_valid) and rec.imd_iso_r >= R_ISO_WARNING
+    t['systemStatus'] = 'OK' if is_ok else 'ISO_ERROR'
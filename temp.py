@@ -1,10 +1,11 @@
 # temp.py
 # Async temperature gauge control (stepper motor)
-# Smooth movement, duty cycle control, shared_data debug
+# Acceleration-profiled movement via motor.StepperEngine + MotionPlanner,
+# coils driven through PWM duty cycle, shared_data debug
 
-import uasyncio as asyncio
 from machine import Pin, PWM
-import utime
+import motor
+import debuglog
 
 # --- Configuration ---
 TEMP_PIN_A = 10
@@ -14,58 +15,73 @@ TEMP_PIN_D = 13
 TEMP_MIN = -40
 TEMP_MAX = 150
 STEPS_PER_DEGREE = 2.4  # Adjust to your gear ratio
-DELAY_MS = 2
+DELAY_MS = 2            # Fastest step period of the gauge motor
+MAX_STEP_RATE = 1000 // DELAY_MS
+ACCEL_STEPS_S2 = 2000
+COIL_PWM_FREQ = 1000
+COIL_DUTY_NS = 500000   # 50 % at 1 kHz (Python phases)
+# PIO phases drive the coils at 100 % (no PWM), twice the average current of
+# the 50 % PWM drive: only enable once the gauge coils are checked for it
+TEMP_USE_PIO = False
+TEMP_PIO_SM = 1
+TEMP_GPIOS = (TEMP_PIN_A, TEMP_PIN_B, TEMP_PIN_C, TEMP_PIN_D)
+
+
+class _PwmCoil:
+    """Pin-like coil output: value(1) drives the coil with COIL_DUTY_NS."""
+
+    def __init__(self, gpio):
+        self.pwm = PWM(Pin(gpio))
+        self.pwm.freq(COIL_PWM_FREQ)
+        self.pwm.duty_ns(0)
+
+    def value(self, val):
+        self.pwm.duty_ns(COIL_DUTY_NS if val else 0)
 
-# --- Stepper sequence (full step) ---
-STEP_SEQUENCE = [
-    (1, 0, 0, 1),
-    (1, 1, 0, 0),
-    (0, 1, 1, 0),
-    (0, 0, 1, 1)
-]
 
 class TempGauge:
     def __init__(self, debug_print):
         self.debug_print = debug_print
-        self.pins = [PWM(Pin(TEMP_PIN_A)), PWM(Pin(TEMP_PIN_B)),
-                     PWM(Pin(TEMP_PIN_C)), PWM(Pin(TEMP_PIN_D))]
-        for p in self.pins:
-            p.freq(1000)
-            p.duty_ns(0)
-        self.current_step = 0
+        self.motor = motor.FullStepMotor.frompins(*TEMP_GPIOS, stepms=DELAY_MS)
+        backend = motor.make_phase_backend(
+            self.motor, TEMP_GPIOS if TEMP_USE_PIO else None, TEMP_PIO_SM, debug_print
+        )
+        if isinstance(backend, motor.PythonPhaseBackend):
+            # Python phases: 50 % PWM coil drive
+            self.pins = [_PwmCoil(gpio) for gpio in TEMP_GPIOS]
+            self.motor = motor.FullStepMotor(*self.pins, stepms=DELAY_MS)
+            backend = motor.PythonPhaseBackend(self.motor)
+        self.engine = motor.StepperEngine(
+            self.motor,
+            planner=motor.MotionPlanner(MAX_STEP_RATE, ACCEL_STEPS_S2),
+            release_when_idle=True,      # Turn off coils at rest
+            backend=backend
+        )
+        self.engine.start()
         self.target_step = 0
         self.debug_print("TempGauge initialized (stepper).")
 
-    async def _move_to_step(self, target):
-        """Move stepper to target step smoothly"""
-        steps_to_move = (target - self.current_step) % (4 * 200)
-        direction = 1 if steps_to_move <= 400 else -1
-        steps_to_move = min(steps_to_move, 800 - steps_to_move) * direction
-
-        for _ in range(abs(steps_to_move)):
-            self.current_step = (self.current_step + direction) % 4
-            seq = STEP_SEQUENCE[self.current_step]
-            for i, val in enumerate(seq):
-                self.pins[i].duty_ns(500000 if val else 0)
-            await asyncio.sleep_ms(DELAY_MS)
+    @property
+    def current_step(self):
+        return self.engine.pos
 
-        # Turn off coils
-        for p in self.pins:
-            p.duty_ns(0)
+    def halt(self):
+        """Coils off at once, no further steps (powerfail shed list)."""
+        self.engine.halt()
 
     async def update(self, temperature):
-        """Update gauge to show temperature (clamped)"""
+        """Update gauge target to show temperature (clamped). Returns immediately."""
         if temperature < TEMP_MIN:
             temperature = TEMP_MIN
         elif temperature > TEMP_MAX:
             temperature = TEMP_MAX
 
         # Map temperature to steps
-        temp_range = TEMP_MAX - TEMP_MIN
         degrees = temperature - TEMP_MIN
         target_step = int(degrees * STEPS_PER_DEGREE)
 
         if target_step != self.target_step:
             self.target_step = target_step
-            self.debug_print(f"Temp gauge → {temperature}°C ({target_step} steps)", level=2)
-            await self._move_to_step(target_step)
\ No newline at end of file
+            if debuglog.level >= 2:
+                debuglog.event(2, debuglog.TEMP_TARGET, int(temperature), target_step)
+            self.engine.set_target(target_step)
@@ -0,0 +1,140 @@
+# tools/bench_boot.py
+# Boot time from reset to the first SSD1306.show(), on the host simulator
+# Boots main.py (sim/runner.py) up to the job loop and reads the firmware's own
+# stamps – main.BOOT_START_MS, main.MODULES_LOADED_MS, ssd1306.first_show_ms –
+# plus displays ready and boot done (before asyncio.run). Two module loads:
+#   source       every firmware module compiled at import, like .py files on
+#                the board (CPython's bytecode cache pointed at an empty place)
+#   precompiled  from the bytecode cache, like .mpy or frozen modules
+#                (tools/build_mpy.py)
+# Device time = modelled transfers (I2C, flash) + host CPU × cpu_scale. The
+# RP2040 runs MicroPython far slower than the host runs CPython; CPU_SCALE is a
+# rough factor for that, so compare the two loads and commits, not the
+# absolute milliseconds with the board (its BOOT_TIME log event has those).
+# Firmware init and boot.py are not modelled: the main.py stamp is only the
+# compilation of main.py itself (source) or ~0 (precompiled).
+# Per module: host compile() time × cpu_scale, the part .mpy/frozen saves.
+#
+# Usage (from repo root):
+#   python tools/bench_boot.py
+#   python tools/bench_boot.py --cpu-scale 80 --runs 9
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+from simclock import clock, SimStop
+import runner
+
+CPU_SCALE = 50             # RP2040 MicroPython vs desktop CPython, very roughly
+RUNS = 5
+MAX_SECONDS = 60           # Device time limit per boot (stops at the job loop)
+COMPILE_REPEAT = 5
+
+# Boot stops before asyncio.run(): the tasks main.py created are never started
+warnings.filterwarnings("ignore", "coroutine .* was never awaited", RuntimeWarning)
+
+STAMPS = ("main.py", "modules loaded", "first show", "displays ready", "boot done")
+
+
+def boot_once(cpu_scale):
+    """One boot up to the job loop → {stamp: device ms}."""
+    stamps = {}
+
+    def setup(sim):
+        main = sim.main
+        init_displays = main.init_displays
+        init_memory = main.init_memory
+
+        def displays(shared_data):
+            init_displays(shared_data)
+            stamps["displays ready"] = clock.now_us() / 1000
+
+        def memory(shared_data):
+            init_memory(shared_data)
+            stamps["boot done"] = clock.now_us() / 1000
+            raise SimStop()        # Boot measured; skip the job loop
+
+        main.init_displays = displays
+        main.init_memory = memory
+
+    sim = runner.run(MAX_SECONDS, setup=setup, cpu_scale=cpu_scale)
+    if "boot done" not in stamps:
+        raise RuntimeError(f"boot did not finish ({sim.reason})\n{sim.output.getvalue()}")
+    stamps["main.py"] = sim.main.BOOT_START_MS
+    stamps["modules loaded"] = sim.main.MODULES_LOADED_MS
+    stamps["first show"] = sim.module("ssd1306").first_show_ms
+    return stamps
+
+
+def boot(cpu_scale, runs, source):
+    """Median stamps over `runs` boots, modules compiled at import if `source`."""
+    if source:
+        sys.dont_write_bytecode = True
+        sys.pycache_prefix = tempfile.mkdtemp(prefix="bench_boot_")    # Stays empty
+    else:
+        import compileall
+        compileall.compile_dir(runner.REPO, maxlevels=0, quiet=1)
+    try:
+        results = [boot_once(cpu_scale) for _ in range(runs)]
+    finally:
+        if source:
+            os.rmdir(sys.pycache_prefix)
+            sys.pycache_prefix = None
+            sys.dont_write_bytecode = False
+    return {name: statistics.median(r[name] for r in results) for name in STAMPS}
+
+
+def compile_costs(cpu_scale):
+    """(module file, source bytes, device ms) of compiling each firmware module."""
+    costs = []
+    for name in sorted(os.listdir(runner.REPO)):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(runner.REPO, name), "rb") as f:
+            source = f.read()
+        best = None
+        for _ in range(COMPILE_REPEAT):
+            t0 = time.perf_counter_ns()
+            compile(source, name, "exec", dont_inherit=True)
+            t = time.perf_counter_ns() - t0
+            best = t if best is None or t < best else best
+        costs.append((name, len(source), best * cpu_scale / 1e6))
+    return costs
+
+
+def _arg(argv, name, default=None):
+    if name in argv:
+        return argv[argv.index(name) + 1]
+    return default
+
+
+def main(argv):
+    cpu_scale = float(_arg(argv, "--cpu-scale", CPU_SCALE))
+    runs = int(_arg(argv, "--runs", RUNS))
+    print(f"Boot time, device ms after reset (cpu_scale {cpu_scale:g}, median of {runs} boots)")
+    source = boot(cpu_scale, runs, source=True)
+    precompiled = boot(cpu_scale, runs, source=False)
+    print(f"{'':<16}{'source':>10}{'precompiled':>13}{'saved':>9}")
+    for name in STAMPS:
+        print(f"{name:<16}{source[name]:>10.1f}{precompiled[name]:>13.1f}"
+              f"{source[name] - precompiled[name]:>9.1f}")
+
+    costs = compile_costs(cpu_scale)
+    print(f"\nCompile at import (host compile() × {cpu_scale:g}), total "
+          f"{sum(c[2] for c in costs):.1f} ms")
+    for name, size, ms in sorted(costs, key=lambda c: -c[2]):
+        print(f"{name:<22}{size:>8} B{ms:>9.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,198 @@
+# tools/bench_filters.py
+# Host-side evaluation of the gauge input filters (filters.py)
+# Runs each channel over a trace and reports
+#   noise   RMS error against the noise-free signal on the hold segments
+#   lag     mean delay behind the ramps, in samples and ms
+#   moves   output changes (= stepper retargets) compared to the raw input
+#   alloc   heap bytes per sample
+#
+# Usage (from repo root):
+#   python tools/bench_filters.py                       # synthetic traces, all channels
+#   python tools/bench_filters.py trace.csv motorRPM    # recorded trace (first column)
+# Recorded traces have no ground truth → only moves, roughness and alloc are reported.
+#
+# Allocation is exact on the MicroPython unix port. On CPython every int > 256
+# is a heap object, so compare against the "raw" row (pass-through channel)
+# instead of reading the absolute number.
+
+import sys
+
+from benchutil import AllocMeter, add_repo_to_path
+
+add_repo_to_path(__file__)
+
+import filters
+from filters import make_channel, FilterChannel, EmaFilter, AlphaBetaFilter, MedianFilter
+
+
+# --- Synthetic traces: (truth, measured, sample period ms, hold mask) ---
+class _Lcg:
+    """Deterministic PRNG (same stream on CPython and MicroPython)."""
+
+    def __init__(self, seed=4711):
+        self.state = seed
+
+    def next(self, n):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return (self.state >> 16) % n          # Low LCG bits are not random
+
+    def noise(self, amplitude):
+        """Triangular noise in [-amplitude, amplitude] (sum of two uniforms)."""
+        if amplitude <= 0:
+            return 0
+        return self.next(amplitude + 1) + self.next(amplitude + 1) - amplitude
+
+
+def _profile(segments):
+    """[(samples, start, end)] → linear segments; returns (values, hold mask)."""
+    values = []
+    hold = []
+    for samples, start, end in segments:
+        for i in range(samples):
+            values.append(start + (end - start) * i // samples)
+            hold.append(start == end and i > samples // 4)
+    return values, hold
+
+
+def speed_trace():
+    # 0.1 km/h at 20 Hz (POINTER_UPDATE_PERIOD_MS): launch, cruise, brake, stop
+    truth, hold = _profile([(40, 0, 0), (160, 0, 1000), (200, 1000, 1000),
+                            (60, 1000, 500), (200, 500, 500), (100, 500, 0), (40, 0, 0)])
+    rng = _Lcg(1)
+    measured = [v + rng.noise(15) if v else 0 for v in truth]      # ±1.5 km/h period jitter
+    return truth, measured, 50, hold
+
+
+def rpm_trace():
+    # rpm at 10 Hz RS485 frames, with occasional single-frame glitches
+    truth, hold = _profile([(20, 800, 800), (80, 800, 6000), (100, 6000, 6000),
+                            (40, 6000, 2000), (100, 2000, 2000)])
+    rng = _Lcg(2)
+    measured = []
+    for v in truth:
+        m = v + rng.noise(40)
+        if rng.next(100) < 2:
+            m = rng.next(12000)
+        measured.append(m)
+    return truth, measured, 100, hold
+
+
+def temp_trace():
+    # °C at 10 Hz: sensor flickers ±1 °C around a slow warm-up
+    truth, hold = _profile([(100, 20, 20), (600, 20, 80), (300, 80, 80)])
+    rng = _Lcg(3)
+    measured = [v + rng.noise(1) for v in truth]
+    return truth, measured, 100, hold
+
+
+TRACES = {
+    'speed': speed_trace,
+    'motorRPM': rpm_trace,
+    'motorTemp': temp_trace,
+    'mcuTemp': temp_trace,
+}
+
+
+# --- Metrics ---
+def run_channel(channel, measured, meter=None):
+    out = []
+    for x in measured:
+        if meter:
+            meter.begin()
+        y = channel.update(x)
+        if meter:
+            meter.end()
+        out.append(y)
+    return out
+
+
+def moves(values):
+    return sum(1 for a, b in zip(values, values[1:]) if a != b)
+
+
+def roughness(values):
+    """RMS of sample-to-sample differences."""
+    if len(values) < 2:
+        return 0.0
+    return (sum((b - a) ** 2 for a, b in zip(values, values[1:])) / (len(values) - 1)) ** 0.5
+
+
+def hold_noise(truth, values, hold):
+    errs = [(v - t) ** 2 for t, v, h in zip(truth, values, hold) if h]
+    return (sum(errs) / len(errs)) ** 0.5 if errs else 0.0
+
+
+def ramp_lag(truth, values, hold, max_shift=50):
+    """Delay (samples) that best aligns the output with the truth outside the holds."""
+    best_shift, best_err = 0, None
+    n = len(truth)
+    for shift in range(max_shift):
+        err = 0
+        for i in range(shift, n):
+            if not hold[i]:
+                err += abs(values[i] - truth[i - shift])
+        if best_err is None or err < best_err:
+            best_shift, best_err = shift, err
+    return best_shift
+
+
+def alloc_per_sample(channel, measured):
+    channel.reset()
+    meter = AllocMeter()
+    meter.start()
+    run_channel(channel, measured, meter)
+    return meter.stop() / len(measured)
+
+
+def evaluate(name, channel, truth, measured, period_ms, hold):
+    out = run_channel(channel, measured)
+    lag = ramp_lag(truth, out, hold)
+    alloc = alloc_per_sample(channel, measured)
+    print(f"  {name:<26} noise={hold_noise(truth, out, hold):7.2f}  lag={lag:2d} samples "
+          f"({lag * period_ms:4d} ms)  moves={moves(out):4d}  alloc={alloc:5.2f} B/sample")
+
+
+def compare(channel_name):
+    truth, measured, period_ms, hold = TRACES[channel_name]()
+    print(f"\n[{channel_name}] {len(measured)} samples @ {period_ms} ms, "
+          f"raw moves={moves(measured)}")
+    evaluate("raw", FilterChannel("raw"), truth, measured, period_ms, hold)
+    evaluate("configured", make_channel(channel_name), truth, measured, period_ms, hold)
+    # Alternatives for tuning (same deadband / zero snap as configured)
+    _, deadband, zero_snap = filters.CHANNEL_CONFIG[channel_name]
+    for label, stages in (
+        ("ema shift 2", (EmaFilter(2),)),
+        ("alphabeta 128/32", (AlphaBetaFilter(128, 32),)),
+        ("median 5", (MedianFilter(5),)),
+        ("median 3 + ema 1", (MedianFilter(3), EmaFilter(1))),
+    ):
+        evaluate(f"{label} db={deadband}", FilterChannel(label, stages, deadband, zero_snap),
+                 truth, measured, period_ms, hold)
+
+
+def recorded(path, channel_name):
+    measured = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                measured.append(int(float(line.split(",")[0])))
+    channel = make_channel(channel_name)
+    out = run_channel(channel, measured)
+    print(f"[{channel_name}] {path}: {len(measured)} samples")
+    print(f"  raw        moves={moves(measured):5d}  roughness={roughness(measured):7.2f}")
+    print(f"  configured moves={moves(out):5d}  roughness={roughness(out):7.2f}  "
+          f"alloc={alloc_per_sample(channel, measured):5.2f} B/sample")
+
+
+def main(argv):
+    print(f"Filter evaluation - allocation: {AllocMeter().kind}")
+    if len(argv) > 2:
+        recorded(argv[1], argv[2])
+        return
+    for channel_name in ('speed', 'motorRPM', 'motorTemp'):
+        compare(channel_name)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
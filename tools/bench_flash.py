@@ -0,0 +1,127 @@
+# tools/bench_flash.py
+# Flash cost of an odometer save, per storage layout, on the sim/vfs LittleFS model
+# Erases wear the flash and take the time (45 ms typ., 400 ms max per 4 KB
+# block); programming a page is cheap. Layouts:
+#   text files      before the journal: total/trip as text with CRC8, written
+#                   ("w") to odo1.txt and odo2.txt → two inline commits
+#   4 KB journal    the first journal: 24 B records appended to one file of up
+#                   to 170 records, compacted (tmp + rename) when full → out of
+#                   line, every append copies the tail block
+#   inline journal  store_km now: at most 3 records (72 B), rewritten when full
+#                   → one inline commit per save
+# Inline data only costs an erase when the commits fill the metadata block
+# (compaction). The model keeps one metadata pair per mount with nothing else
+# in it; other files in /data (debuglog dumps) make compactions a bit more
+# frequent for every layout alike.
+#
+# Usage (from repo root):
+#   python tools/bench_flash.py              # 1000 saves per layout
+#   python tools/bench_flash.py 5000
+
+import sys
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+from simclock import clock
+from board import board
+import vfs
+import persist
+import store_km
+
+DEFAULT_SAVES = 1000
+OLD_JOURNAL_RECORDS = 170  # First journal: ~4 KB, one slot kept for the power-fail save
+
+
+def text_files():
+    """store_km's save before the journal: the same line to both files."""
+    def save(total_mm, trip_mm):
+        data = f"{total_mm / 1e6:.6f},{trip_mm / 1e6:.6f}"
+        line = f"{data},{store_km._crc8(data)}"
+        for path in (store_km.FILE_PRIMARY, store_km.FILE_BACKUP):
+            with vfs.open(path, "w") as f:
+                f.write(line)
+    return save
+
+
+def journal_4k():
+    """Append-only journal in its own blocks, compacted to 2 records when full."""
+    record = bytearray(store_km.RECORD_SIZE)
+    state = {"seq": 0, "records": []}
+
+    def save(total_mm, trip_mm):
+        records = state["records"]
+        if len(records) >= OLD_JOURNAL_RECORDS - 1:
+            tmp = store_km.JOURNAL_FILE + ".tmp"
+            with vfs.open(tmp, "wb") as f:
+                for rec in records[-2:]:
+                    f.write(rec)
+            vfs.rename(tmp, store_km.JOURNAL_FILE)
+            del records[:-2]
+        state["seq"] += 1
+        store_km._pack(record, 0, state["seq"], total_mm, trip_mm)
+        with vfs.open(store_km.JOURNAL_FILE, "ab") as f:
+            f.write(record)
+        records.append(bytes(record))
+    return save
+
+
+def journal_inline():
+    """store_km itself."""
+    vfs.install(store_km)
+    store_km._seq = store_km._records = 0
+    store_km._last = None
+    return store_km.save_odometer_mm
+
+
+LAYOUTS = (
+    ("text files", text_files),
+    ("4 KB journal", journal_4k),
+    ("inline journal", journal_inline),
+)
+
+
+def measure(make, saves):
+    """Flash stats and device time per save over `saves` saves."""
+    board.erase_flash()
+    vfs.reset()
+    clock.start(cpu_scale=0)               # Device time = flash operations only
+    save = make()
+    total_mm = 123_456_789_000
+    worst = 0
+    t_start = clock.now_us()
+    for k in range(saves):
+        total_mm += 1_000_000 + k % 7 * 1_234
+        t0 = clock.now_us()
+        save(total_mm, total_mm % 1_000_000_000)
+        t = clock.now_us() - t0
+        worst = t if t > worst else worst
+    stats = board.flash["stats"]
+    return {
+        "erases": stats.get("erases", 0),
+        "commits": stats.get("commits", 0),
+        "pages": stats.get("pages", 0),
+        "avg_us": (clock.now_us() - t_start) / saves,
+        "max_us": worst,
+    }
+
+
+def main(argv):
+    saves = int(argv[1]) if len(argv) > 1 else DEFAULT_SAVES
+    print(f"{saves} odometer saves per layout (sim/vfs: block {vfs.BLOCK} B, inline <= "
+          f"{vfs.INLINE_MAX} B, erase {vfs.FLASH_TIMING_US['erase'] // 1000} ms typ.)")
+    print(f"{'':<16}{'erases':>8}{'saves/erase':>13}{'commits':>9}{'pages':>8}"
+          f"{'avg ms':>9}{'max ms':>9}{'erases/h':>10}")
+    for name, make in LAYOUTS:
+        r = measure(make, saves)
+        per_erase = saves / r["erases"] if r["erases"] else float("inf")
+        per_hour = r["erases"] * persist.WRITES_PER_HOUR / saves    # At the write budget
+        print(f"{name:<16}{r['erases']:>8}{per_erase:>13.1f}{r['commits']:>9}{r['pages']:>8}"
+              f"{r['avg_us'] / 1000:>9.2f}{r['max_us'] / 1000:>9.2f}{per_hour:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,516 @@
+# tools/bench_latency.py
+# End-to-end latency benchmark on the host simulator (sim/runner.py)
+# Scripted drives – gear change, ISO fault, full-throttle acceleration and a
+# 0–225 km/h sweep – boot the real main.py with RS485 frames at 10 Hz and a
+# wheel-pulse speed profile, and time event → output on the simulated board:
+#   can_publish   RS485 frame complete on the UART → publish_telemetry()
+#   rpm_output    frame with a new rpm → first rpm2.set_rpm_output() after it
+#   rpm_settle    rpm step → PWM duty within 1 % of full scale of the target
+#   rnd           gear change → new R/N/D char on the RND panel
+#   central       ISO fault / recovery → new central screen on the panel
+#   needle_lag    speed profile crossing a gauge step → that step on the coils
+#   digital_lag   speed profile crossing x.5 km/h → new digital speed drawn
+# Latencies are device time in deterministic mode (cpu_scale 0: firmware
+# code costs no time, I2C wire and flash time do), so they only change when
+# the code's timing behaviour changes. Per task: host CPU ms per simulated
+# second and longest step, then a second pass under tracemalloc for bytes
+# allocated per simulated second (steady state, after the warm-up) and the
+# CPython GC pauses. CPU and allocation figures are host CPython numbers:
+# compare them between commits, not with the RP2040.
+#
+# Results go to a JSON file per commit, build/bench/latency-<sha>.json (build/
+# is git-ignored); --compare flags p90 latency regressions against an earlier
+# file (exit status 1). A firmware task dying with an exception fails the run
+# (exit status 1, no results written): its numbers would be meaningless.
+#
+# Usage (from repo root):
+#   python tools/bench_latency.py                            # all scenarios
+#   python tools/bench_latency.py --scenario sweep --no-alloc
+#   python tools/bench_latency.py --out base.json
+#   python tools/bench_latency.py --compare base.json        # CI regression gate
+#   python tools/bench_latency.py --cpu-scale 1              # firmware CPU costs time
+
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+import board
+import mpgc
+import runner
+import uasyncio
+from bench_rs485 import build_frame
+from simclock import clock
+
+FORMAT_VERSION = 1
+FRAME_INTERVAL_MS = 100
+WARMUP_S = 6                     # Boot + central boot screen (5 s) before events
+STEADY_S = 1.5                   # Images in this window before the next event = settled
+SETTLE_TOLERANCE = 655           # PWM duty units (1 % of full scale)
+REGRESSION_FACTOR = 1.10         # --compare: p90 worse by 10 % ...
+REGRESSION_MIN_MS = 5.0          # ... and by at least 5 ms
+
+# mcuFlags bits 2-3 (get_rnd_status)
+GEAR_N, GEAR_R, GEAR_D = 0 << 2, 1 << 2, 2 << 2
+VALID_IMD, VALID_MOTOR = 0x01, 0x02
+
+BASE_TELEMETRY = {
+    "rpm": 0, "motor_temp": 45, "mcu_temp": 38, "mcu_flags": GEAR_N, "fault": 0,
+    "iso_r": 40000, "imd": 0, "vifc": 0, "valid": VALID_MOTOR | VALID_IMD,
+}
+
+
+# --- Scenarios ---
+class Scenario:
+    """
+    seconds of driving: speed points [(t_s, km/h)] for the wheel sensor,
+    telemetry keyframes [(t_s, {field: value})] applied from that time on,
+    an optional rpm(t_s) ramp, and the events to time [(t_s, kind)].
+    """
+
+    def __init__(self, name, seconds, speed, keys=(), rpm=None, events=()):
+        self.name = name
+        self.seconds = seconds
+        self.speed = speed
+        self.keys = sorted(keys, key=lambda k: k[0])
+        self.rpm = rpm
+        self.events = list(events)
+
+    def telemetry(self, t_s):
+        values = dict(BASE_TELEMETRY)
+        for t, changes in self.keys:
+            if t <= t_s:
+                values.update(changes)
+        if self.rpm is not None:
+            values["rpm"] = int(self.rpm(t_s))
+        return values
+
+    def frames(self):
+        """One frame per FRAME_INTERVAL_MS, frame k built from telemetry(k × interval)."""
+        n = int(self.seconds * 1000 // FRAME_INTERVAL_MS) + 1
+        return [build_frame(**self.telemetry(k * FRAME_INTERVAL_MS / 1000)) for k in range(n)]
+
+
+SCENARIOS = (
+    Scenario("gear_change", 20, [(0, 0)],
+             keys=[(0, {"rpm": 800}), (7, {"mcu_flags": GEAR_D}), (11, {"rpm": 2500}),
+                   (14, {"mcu_flags": GEAR_R, "rpm": 800}), (17, {"mcu_flags": GEAR_N})],
+             events=[(7, "rnd"), (11, "rpm_settle"), (14, "rnd"), (17, "rnd")]),
+    Scenario("iso_fault", 16, [(0, 0)],
+             keys=[(7, {"iso_r": 150, "imd": 0x0001}), (12, {"iso_r": 40000, "imd": 0})],
+             events=[(7, "central"), (12, "central")]),
+    Scenario("full_throttle", 20, [(0, 0), (5, 0), (15, 150)],
+             keys=[(0, {"mcu_flags": GEAR_D})],
+             rpm=board.ramp([(0, 800), (5, 800), (11, 8000), (15, 8000), (16, 3000)]),
+             events=[(11, "rpm_settle"), (16, "rpm_settle")]),
+    Scenario("sweep", 50, [(0, 0), (3, 0), (23, 225), (27, 225), (47, 0)],
+             keys=[(0, {"mcu_flags": GEAR_D})],
+             rpm=board.ramp([(0, 0), (3, 0), (23, 7800), (27, 7800), (47, 0)])),
+)
+
+
+# --- Probes ---
+class Probes:
+    """Hooks into the firmware and the board for one run (installed by setup())."""
+
+    def __init__(self, scenario, alloc):
+        self.scenario = scenario
+        self.alloc = alloc
+        self.publish = []                  # Device µs of publish_telemetry() calls
+        self.rpm_out = []                  # (t_us, rpm) per set_rpm_output()
+        self.images = {}                   # panel → [(t_us, digest)] on content change
+        self.speed_shown = []              # (t_us, digital speed string) per odometer change
+        self.needle = []                   # (t_us, pos) per odometer step
+        self.meter = None
+        self.gc_pauses = []                # Host µs per CPython collection
+        self._gc_t0 = 0
+
+    def setup(self, sim):
+        self.sim = sim
+        main = sim.main
+        probes = self
+
+        publish = main.publish_telemetry
+
+        def publish_probe(rec, t):
+            probes.publish.append(clock.now_us())
+            return publish(rec, t)
+        main.publish_telemetry = publish_probe
+
+        rpm2 = sim.module("rpm2")
+        set_rpm = rpm2.set_rpm_output
+
+        def rpm_probe(rpm, *args, **kwargs):
+            probes.rpm_out.append((clock.now_us(), rpm))
+            return set_rpm(rpm, *args, **kwargs)
+        rpm2.set_rpm_output = rpm_probe
+
+        motor = sim.module("motor")
+        odometer_motor = sim.module("odometer_motor")
+        emit = motor.PythonPhaseBackend.emit
+
+        def emit_probe(backend, direction, period_us, count=1):
+            emit(backend, direction, period_us, count)
+            engine = odometer_motor.engine()
+            if engine is not None and backend is engine.backend:
+                pos = probes.needle[-1][1] if probes.needle else 0
+                probes.needle.append((clock.now_us(), pos + direction * count))
+        motor.PythonPhaseBackend.emit = emit_probe
+
+        for name, panel in sim.panels.items():
+            self._watch(name, panel)
+
+        uasyncio.get_event_loop().call_at(WARMUP_S, self._steady)
+        self.meter = uasyncio.meter_tasks(label=task_label, alloc=self.alloc)
+
+    def _watch(self, name, panel):
+        changes = self.images[name] = []
+        probes = self
+        write = panel.write
+        pages = range(panel.height // 8)
+
+        def write_probe(buf):
+            write(buf)
+            digest = hash((b"".join(panel.page_bytes(p) for p in pages), panel.inverted, panel.display_on))
+            if not changes or changes[-1][1] != digest:
+                t = clock.now_us()
+                changes.append((t, digest))
+                if name == "odometer" and probes.sim.shared_data is not None:
+                    shown = probes.sim.shared_data.last_displayed_speed_str
+                    if not probes.speed_shown or probes.speed_shown[-1][1] != shown:
+                        probes.speed_shown.append((t, shown))
+        panel.write = write_probe
+
+    def _steady(self):
+        """End of warm-up: CPU/allocation accounting starts over."""
+        for entry in self.meter.values():
+            entry[:] = [0, 0, 0, 0]
+        self.gc_pauses.clear()
+
+    def gc_callback(self, phase, info):
+        if phase == "start":
+            self._gc_t0 = time.perf_counter_ns()
+        else:
+            self.gc_pauses.append((time.perf_counter_ns() - self._gc_t0) // 1000)
+
+
+def task_label(owner):
+    """Scheduler jobs by name, stepper tasks by backend, other tasks by coroutine."""
+    label = getattr(owner, "_bench_label", None)
+    if label is not None:
+        return label
+    if uasyncio._is_task(owner):
+        coro = owner.get_coro()
+        frame = getattr(coro, "cr_frame", None)
+        local = frame.f_locals if frame is not None else {}
+        job = local.get("job")
+        obj = local.get("self")
+        if job is not None and hasattr(job, "name"):
+            label = f"job {job.name}"
+        elif obj is not None and hasattr(obj, "backend"):
+            label = f"stepper {type(obj.backend).__name__}"
+        else:
+            label = coro.__qualname__
+        if obj is not None and type(obj).__module__ in ("board", "__main__"):
+            label = "sim " + label         # Outside world (pulse/UART sources, probes)
+        try:
+            owner._bench_label = label
+        except AttributeError:
+            pass                           # C Task created before meter_tasks()
+        return label
+    return "callback " + getattr(owner, "__qualname__", type(owner).__name__)
+
+
+# --- Metrics ---
+def _after(times, t):
+    """First entry of sorted `times` (or (t, ...) tuples) at or after t, else None."""
+    for item in times:
+        if (item[0] if isinstance(item, tuple) else item) >= t:
+            return item
+    return None
+
+
+def _frame_arrivals(sim):
+    """Device µs at which frame k was complete on the UART."""
+    return [t for t, i in sim.uart.sent]
+
+
+def _frame_at(arrivals, t_s):
+    k = int(round(t_s * 1000 / FRAME_INTERVAL_MS))
+    return arrivals[k] if k < len(arrivals) else None
+
+
+def _image_latency(changes, t_event, t_next):
+    """First new image after t_event that is also among the settled images before t_next."""
+    before = None
+    for t, digest in changes:
+        if t > t_event:
+            break
+        before = digest
+    settled = set()
+    current = before
+    for t, digest in changes:
+        if t <= t_next - STEADY_S * 1e6:
+            current = digest
+        elif t < t_next:
+            settled.add(digest)
+    settled.add(current)
+    for t, digest in changes:
+        if t > t_event and digest != before and digest in settled:
+            return t - t_event
+    return None
+
+
+def _crossing(points, v, t_us, rising):
+    """
+    Device µs where the speed profile crossed v on its latest ramp before
+    t_us (holds skipped), None if that ramp goes the other way (filter
+    jitter, not a response) or never reached v by t_us.
+    """
+    t_s = t_us / 1e6
+    for (t0, v0), (t1, v1) in reversed(list(zip(points, points[1:]))):
+        if t0 > t_s or v0 == v1:
+            continue
+        if (v1 > v0) != rising or not min(v0, v1) <= v <= max(v0, v1):
+            return None
+        tc = t0 + (v - v0) * (t1 - t0) / (v1 - v0)
+        return tc * 1e6 if tc <= t_s else None
+    return None
+
+
+def measure(scenario, sim, probes):
+    """Latency samples (ms) per metric for one run."""
+    odo = sim.module("odometer_motor")
+    kmh_per_step = odo.MAX_SPEED_KMH / odo.MAX_STEPS
+    full_rpm = sim.module("rpm2").MAX_RPM
+    arrivals = _frame_arrivals(sim)
+    frames = [scenario.telemetry(k * FRAME_INTERVAL_MS / 1000) for k in range(len(arrivals))]
+    samples = {}
+
+    def add(metric, us):
+        if us is not None:
+            samples.setdefault(metric, []).append(us / 1000)
+
+    for k, t_frame in enumerate(arrivals):
+        if k * FRAME_INTERVAL_MS / 1000 < WARMUP_S:
+            continue
+        t_pub = _after(probes.publish, t_frame)
+        if t_pub is None:
+            continue
+        add("can_publish", t_pub - t_frame)
+        if k and frames[k]["rpm"] != frames[k - 1]["rpm"]:
+            out = _after(probes.rpm_out, t_pub)
+            add("rpm_output", out and out[0] - t_frame)
+
+    times = [t for t, kind in scenario.events] + [scenario.seconds]
+    pwm = sim.module("rpm2").pwm
+    for (t_s, kind), t_next in zip(scenario.events, times[1:]):
+        t_frame = _frame_at(arrivals, t_s)
+        if t_frame is None:
+            continue
+        if kind == "rpm_settle":
+            target = min(frames[int(round(t_s * 1000 / FRAME_INTERVAL_MS))]["rpm"], full_rpm) * 65535 // full_rpm
+            for t, duty in pwm.history:
+                if t >= t_frame and abs(duty - target) <= SETTLE_TOLERANCE:
+                    add(kind, t - t_frame)
+                    break
+        else:
+            add(kind, _image_latency(probes.images[kind], t_frame, t_next * 1e6))
+
+    points = sorted(scenario.speed)
+    last = 0
+    for t, pos in probes.needle:
+        rising = pos > last
+        last = pos
+        v = (pos if rising else pos + 1) * kmh_per_step
+        if v <= 0:
+            continue
+        add("needle_lag", _lag(points, v, t, rising))
+
+    shown = [(t, int(s)) for t, s in probes.speed_shown if s and s.strip().isdigit()]
+    for (t, v), (t_prev, v_prev) in zip(shown[1:], shown):
+        if v != v_prev and v > 0:
+            rising = v > v_prev
+            add("digital_lag", _lag(points, v - 0.5 if rising else v + 0.5, t, rising))
+    return samples
+
+
+def _lag(points, v, t_us, rising):
+    tc = _crossing(points, v, t_us, rising)
+    return None if tc is None else t_us - tc
+
+
+def stats(values):
+    values = sorted(values)
+    n = len(values)
+    if not n:
+        return {"n": 0}
+
+    def pct(p):
+        return round(values[min(n - 1, max(0, int(n * p / 100 + 0.5) - 1))], 3)
+    return {"n": n, "p50": pct(50), "p90": pct(90), "p99": pct(99), "max": round(values[-1], 3)}
+
+
+# --- Runs ---
+def run_scenario(scenario, cpu_scale, alloc):
+    probes = Probes(scenario, alloc)
+    uart = board.UartSource(scenario.frames(), interval_ms=FRAME_INTERVAL_MS)
+    if alloc:
+        mpgc.use_tracemalloc = False       # Firmware's own GC decisions stay as in pass 1
+        tracemalloc.start()
+    gc.callbacks.append(probes.gc_callback)
+    try:
+        sim = runner.run(scenario.seconds, profile=board.ramp(scenario.speed), uart=uart,
+                         setup=probes.setup, cpu_scale=cpu_scale)
+    finally:
+        gc.callbacks.remove(probes.gc_callback)
+        if alloc:
+            tracemalloc.stop()
+    return sim, probes
+
+
+def _task_table(meter, seconds, alloc):
+    table = {}
+    for label, (cpu_ns, runs, nbytes, max_ns) in sorted(meter.items()):
+        if not runs:
+            continue
+        if alloc:
+            table[label] = round(nbytes / seconds)
+        else:
+            table[label] = {"ms_per_s": round(cpu_ns / 1e6 / seconds, 3), "runs": runs,
+                            "max_step_us": max_ns // 1000}
+    return table
+
+
+def _check_run(scenario, sim):
+    if sim.reason != "time":
+        raise RuntimeError(f"{scenario.name}: run ended early ({sim.reason})")
+    if sim.task_errors:
+        died = "; ".join(f"{name}: {type(exc).__name__}: {exc}" for name, exc in sim.task_errors)
+        raise RuntimeError(f"{scenario.name}: firmware task died ({died})")
+
+
+def bench(scenario, cpu_scale, alloc):
+    sim, probes = run_scenario(scenario, cpu_scale, alloc=False)
+    _check_run(scenario, sim)
+    steady_s = scenario.seconds - WARMUP_S
+    result = {
+        "sim": {"seconds": scenario.seconds, "host_s": round(sim.host_s, 3),
+                "frames": len(sim.uart.sent), "wdt_max_gap_ms": board.board.wdt.max_gap_us // 1000
+                if board.board.wdt else None},
+        "latency_ms": {metric: stats(values) for metric, values in sorted(measure(scenario, sim, probes).items())},
+        "cpu": _task_table(probes.meter, steady_s, False),
+    }
+    if alloc:
+        sim, probes = run_scenario(scenario, cpu_scale, alloc=True)
+        _check_run(scenario, sim)
+        result["alloc_bytes_per_s"] = _task_table(probes.meter, steady_s, True)
+        pauses = probes.gc_pauses
+        result["host_gc"] = {"collections": len(pauses), "max_pause_us": max(pauses, default=0),
+                             "total_ms": round(sum(pauses) / 1000, 3)}
+    return result
+
+
+def _git(*args):
+    try:
+        return subprocess.run(("git",) + args, cwd=runner.REPO, capture_output=True, text=True,
+                              timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def compare(results, baseline):
+    """p90 latency regressions against a baseline results dict → list of messages."""
+    regressions = []
+    for name, scenario in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name, {}).get("latency_ms", {})
+        for metric, new in scenario["latency_ms"].items():
+            before = old.get(metric, {}).get("p90")
+            after = new.get("p90")
+            if before is None or after is None:
+                continue
+            if after > before * REGRESSION_FACTOR and after - before >= REGRESSION_MIN_MS:
+                regressions.append(f"{name}/{metric}: p90 {before:.1f} → {after:.1f} ms")
+    return regressions
+
+
+def print_result(name, result):
+    sim = result["sim"]
+    print(f"\n=== {name} ({sim['seconds']} s simulated, {sim['host_s']:.1f} s host) ===")
+    print(f"{'latency':<14}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  ms")
+    for metric, s in result["latency_ms"].items():
+        if s["n"]:
+            print(f"{metric:<14}{s['n']:>6}{s['p50']:>10.1f}{s['p90']:>10.1f}{s['p99']:>10.1f}{s['max']:>10.1f}")
+    alloc = result.get("alloc_bytes_per_s", {})
+    print(f"{'task':<34}{'CPU ms/s':>9}{'runs':>9}{'max µs':>8}{'B/s':>10}")
+    for label, row in sorted(result["cpu"].items(), key=lambda item: -item[1]["ms_per_s"]):
+        print(f"{label[:33]:<34}{row['ms_per_s']:>9.2f}{row['runs']:>9}{row['max_step_us']:>8}"
+              f"{alloc.get(label, ''):>10}")
+    if "host_gc" in result:
+        g = result["host_gc"]
+        print(f"host GC: {g['collections']} collections, max {g['max_pause_us']} µs, total {g['total_ms']} ms")
+
+
+def _arg(argv, name, default=None):
+    if name in argv:
+        return argv[argv.index(name) + 1]
+    return default
+
+
+def main(argv):
+    cpu_scale = float(_arg(argv, "--cpu-scale", 0))
+    only = _arg(argv, "--scenario")
+    scenarios = [s for s in SCENARIOS if only is None or s.name == only]
+    if not scenarios:
+        print(f"Unknown scenario {only!r}; known: {', '.join(s.name for s in SCENARIOS)}")
+        return 2
+    alloc = "--no-alloc" not in argv
+
+    sha = _git("rev-parse", "--short", "HEAD") or "unknown"
+    results = {
+        "format": FORMAT_VERSION,
+        "commit": sha,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}",
+        "settings": {"cpu_scale": cpu_scale, "frame_interval_ms": FRAME_INTERVAL_MS,
+                     "warmup_s": WARMUP_S, "alloc": alloc},
+        "scenarios": {},
+    }
+    for scenario in scenarios:
+        try:
+            result = results["scenarios"][scenario.name] = bench(scenario, cpu_scale, alloc)
+        except RuntimeError as e:
+            print(f"FAILED {e}")
+            return 1
+        print_result(scenario.name, result)
+
+    out = _arg(argv, "--out", os.path.join(runner.REPO, "build", "bench", f"latency-{sha}.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+    print(f"\nResults: {out}")
+
+    baseline_path = _arg(argv, "--compare")
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print("REGRESSION " + line)
+        if regressions:
+            return 1
+        print(f"No p90 latency regressions against {baseline_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
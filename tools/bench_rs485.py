@@ -0,0 +1,188 @@
+# tools/bench_rs485.py
+# Host-side benchmark for the RS485 framer (rs485_framer.RingFramer)
+# Feeds recorded or synthetic byte streams (clean + corrupted) in UART-sized
+# chunks and reports frames/second and heap allocation per frame.
+#
+# Usage (from repo root):
+#   python tools/bench_rs485.py                 # synthetic scenarios
+#   python tools/bench_rs485.py capture.bin     # replay a recorded RS485 capture
+#   micropython tools/bench_rs485.py            # unix port: exact bytes allocated
+#
+# On MicroPython the allocation figure is exact (gc.mem_alloc() with GC off).
+# On CPython it is a lower bound built from per-read tracemalloc peaks; it also
+# counts boxed ints (> 256) and the one memoryview slice per UART read, which
+# MicroPython keeps as small ints / a single 16-byte object respectively.
+# Frames/second on CPython favours C-level slicing; compare on the target.
+
+import sys
+import io
+
+from benchutil import AllocMeter, NullMeter, measure, add_repo_to_path
+
+add_repo_to_path(__file__)
+
+import rs485_framer
+from rs485_framer import (
+    RingFramer, calculate_checksum, PACKET_LENGTH, START_BYTE, END_BYTE
+)
+
+CHUNK_SIZE = 32          # Bytes per simulated UART read (~2.8 ms at 115200 baud)
+FRAMES_PER_SCENARIO = 5000
+
+
+# --- Stream generation ---
+def build_frame(rpm, motor_temp, mcu_temp, mcu_flags, fault, iso_r, imd, vifc, valid):
+    frame = bytearray(PACKET_LENGTH)
+    frame[0] = START_BYTE
+    frame[1], frame[2] = (rpm >> 8) & 0xFF, rpm & 0xFF
+    frame[3] = motor_temp & 0xFF
+    frame[4] = mcu_temp & 0xFF
+    frame[5], frame[6] = (mcu_flags >> 8) & 0xFF, mcu_flags & 0xFF
+    frame[7] = fault & 0xFF
+    frame[8], frame[9] = (iso_r >> 8) & 0xFF, iso_r & 0xFF
+    frame[10], frame[11] = (imd >> 8) & 0xFF, imd & 0xFF
+    frame[12], frame[13] = (vifc >> 8) & 0xFF, vifc & 0xFF
+    frame[14] = valid & 0xFF
+    frame[15] = calculate_checksum(frame[1:15])
+    frame[16] = END_BYTE
+    return frame
+
+
+class _Lcg:
+    """Deterministic PRNG (same stream on CPython and MicroPython)."""
+
+    def __init__(self, seed=12345):
+        self.state = seed
+
+    def next(self, n):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return self.state % n
+
+
+def synthetic_stream(frames, garbage_rate=0, corrupt_rate=0, truncate_rate=0, seed=1):
+    """
+    Build a byte stream of `frames` packets.
+    garbage_rate/corrupt_rate/truncate_rate: probability in percent per frame
+    of inserting line noise, flipping a payload bit or cutting the frame short.
+    Returns (stream, number_of_intact_frames).
+    """
+    rng = _Lcg(seed)
+    out = bytearray()
+    intact = 0
+    for i in range(frames):
+        frame = build_frame(
+            (i * 7) % 12000, 20 + i % 60, 25 + i % 50, (i >> 4) & 0x0F, 0,
+            30000 + i % 1000, 0, 1, 0x03
+        )
+        if garbage_rate and rng.next(100) < garbage_rate:
+            for _ in range(1 + rng.next(8)):
+                out.append(rng.next(256))
+        if truncate_rate and rng.next(100) < truncate_rate:
+            out.extend(frame[:1 + rng.next(PACKET_LENGTH - 1)])
+            continue
+        if corrupt_rate and rng.next(100) < corrupt_rate:
+            frame[1 + rng.next(14)] ^= 1 << rng.next(8)
+            out.extend(frame)
+            continue
+        out.extend(frame)
+        intact += 1
+    return bytes(out), intact
+
+
+# --- Reference: the previous slicing framer (kept for comparison only) ---
+class LegacySliceFramer:
+    """Growing bytearray + re-slicing per frame/resync byte (old RS485_RX logic)."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.frames = 0
+
+    def fill_from(self, stream, limit=None):
+        data = stream.read(limit or CHUNK_SIZE)
+        if data:
+            self.buffer.extend(data)
+
+    def drain(self):
+        buffer = self.buffer
+        while len(buffer) >= PACKET_LENGTH:
+            if buffer[0] != START_BYTE:
+                buffer = buffer[1:]
+                continue
+            packet = buffer[:PACKET_LENGTH]
+            if packet[-1] != END_BYTE or packet[15] != calculate_checksum(packet[1:15]):
+                buffer = buffer[1:]
+                continue
+            self.frames += 1
+            buffer = buffer[PACKET_LENGTH:]
+        self.buffer = buffer
+
+
+def run_ring(stream_bytes, meter):
+    framer = RingFramer()
+    src = io.BytesIO(stream_bytes)
+    while True:
+        meter.begin()
+        got = framer.fill_from(src, CHUNK_SIZE)
+        while framer.next_frame() is not None:
+            pass
+        meter.end()
+        if not got and len(framer) < PACKET_LENGTH:
+            break
+    return framer
+
+
+def run_legacy(stream_bytes, meter):
+    framer = LegacySliceFramer()
+    src = io.BytesIO(stream_bytes)
+    remaining = len(stream_bytes)
+    while remaining > 0:
+        meter.begin()
+        framer.fill_from(src, CHUNK_SIZE)
+        framer.drain()
+        meter.end()
+        remaining -= CHUNK_SIZE
+    return framer
+
+
+def report(name, stream_bytes, expected):
+    print(f"\n[{name}] {len(stream_bytes)} bytes, {expected} intact frames")
+    for label, runner in (("ring", run_ring), ("legacy", run_legacy)):
+        framer, elapsed, alloc = measure(runner, stream_bytes)
+        frames = framer.frames
+        fps = frames * 1_000_000 // elapsed if elapsed > 0 else 0
+        per_frame = alloc / frames if frames else 0
+        line = f"  {label:<7} frames={frames:<6} {fps:>8} frames/s  alloc={per_frame:8.2f} B/frame"
+        if label == "ring":
+            line += f"  skipped={framer.skipped_bytes} bad={framer.bad_frames}"
+        print(line)
+        if frames != expected:
+            print(f"  WARNING: {label} decoded {frames} frames, expected {expected}")
+
+
+def main(argv):
+    alloc_kind = AllocMeter().kind
+    print(f"RS485 framer benchmark - ring size {rs485_framer.RX_RING_SIZE}, "
+          f"chunk {CHUNK_SIZE} B, allocation: {alloc_kind}")
+
+    if len(argv) > 1:
+        with open(argv[1], "rb") as f:
+            capture = f.read()
+        # Count intact frames with the reference framer
+        expected = run_legacy(capture, NullMeter()).frames
+        report(f"capture {argv[1]}", capture, expected)
+        return
+
+    scenarios = (
+        ("clean", 0, 0, 0),
+        ("line noise 20%", 20, 0, 0),
+        ("bit errors 10%", 0, 10, 0),
+        ("truncated 10%", 0, 0, 10),
+        ("mixed 10/5/5%", 10, 5, 5),
+    )
+    for name, garbage, corrupt, truncate in scenarios:
+        stream_bytes, intact = synthetic_stream(FRAMES_PER_SCENARIO, garbage, corrupt, truncate)
+        report(name, stream_bytes, intact)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,261 @@
+# tools/bench_ssd1306.py
+# Host-side benchmark for SSD1306 transfers over a recording I2C bus
+# Replays typical display_manager updates (speed, odometer, trip, central temps)
+# and reports I2C bytes and transactions per frame for
+#   legacy  the previous show(): hard-coded rectangle, sliced page range
+#   diff    show() with shadow-buffer diffing (ssd1306.py)
+# plus transactions per driver call for batched vs. one-write-per-byte commands.
+# Every frame the decoded panel RAM is checked against the framebuffer.
+# Heap allocation per show() is measured separately on a null bus; it is
+# exact on the MicroPython unix port (must be 0 after the warm-up pass), a
+# tracemalloc lower bound on CPython (where indexes > 256 are heap ints as
+# well). On both, every data buffer sent must be one of the driver's
+# preallocated cell views (a slice would allocate on the board).
+#
+# Usage (from repo root):  python tools/bench_ssd1306.py
+
+import sys
+
+from benchutil import AllocMeter, add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+import myfont
+from ssd1306 import SSD1306_I2C
+from oled import SSD1306Panel, RecordingI2C
+
+ADDR = 0x3C
+
+
+class NullI2C:
+    """
+    Bus that accepts everything and keeps nothing (allocation runs). With
+    `views` set (ids), counts data buffers that are not one of them.
+    """
+
+    def __init__(self):
+        self.views = None
+        self.foreign = 0
+
+    def writeto(self, addr, buf, stop=True):
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        if self.views is not None and vector[0] == b"\x40":
+            for buf in vector[1:]:
+                if len(buf) and id(buf) not in self.views:
+                    self.foreign += 1
+        return 0
+
+
+# --- Legacy cost model (previous show(): 6 single-command writes + one slice) ---
+def legacy_frame(width, x0, y0, x1, y1):
+    """(bytes, transactions) on the wire for the old show(x0, y0, x1, y1)."""
+    page0, page1 = y0 // 8, y1 // 8
+    data = ((page1 + 1) * width + x1 + 1) - (page0 * width + x0)
+    return 6 * 3 + (2 + data), 7
+
+
+# --- Scenarios: each yields (draw function, legacy rect) per frame ---
+def speed_frames():
+    for v in range(0, 131):
+        text = f"{v:>3}"
+
+        def draw(fb, text=text):
+            fb.fill_rect(0, 8, 128, 16, 0)
+            box = myfont.draw_12x16_font(fb, text, 52, 8, 128, 32)
+            fb.text("km/h", 94, 17)
+            return box[0], box[1], 127, 24
+        yield draw, (52, 8, 127, 23)
+
+
+def odometer_frames():
+    for km in range(12345, 12445):
+        text = f"{km:06d}"
+
+        def draw(fb, text=text):
+            fb.fill_rect(0, 8, 128, 16, 0)
+            box = myfont.draw_12x16_font(fb, text, 16, 8, 128, 32)
+            fb.text("km", 94, 17)
+            return box[0], box[1], 109, 24
+        yield draw, (16, 8, 115, 23)
+
+
+def trip_frames():
+    for t in range(0, 200):
+        text = f"{t / 10:05.1f}"
+
+        def draw(fb, text=text):
+            fb.fill_rect(0, 8, 128, 16, 0)
+            box = myfont.draw_12x16_font(fb, text, 28, 8, 128, 32)
+            fb.text("km", 94, 17)
+            return box[0], box[1], 109, 24
+        yield draw, (28, 8, 115, 23)
+
+
+def central_frames():
+    motor, mcu = 40, 35
+    for i in range(100):
+        motor += (i * 7) % 3 - 1
+        mcu += (i * 5) % 3 - 1
+        texts = (f"{motor:>2d}C", f"{mcu:>2d}C", f"{30 + i % 3:>2d}M")
+
+        def draw(fb, texts=texts):
+            fb.fill_rect(0, 0, 128, 16, 0)
+            myfont.draw_12x16_font(fb, texts[0], 0, 0, 128, 32)
+            myfont.draw_12x16_font(fb, texts[1], 44, 0, 128, 32)
+            myfont.draw_12x16_font(fb, texts[2], 93, 0, 128, 32)
+            return 0, 0, 127, 15
+        yield draw, (0, 0, 127, 15)
+
+
+def full_redraw_frames():
+    # Mode change: full show() although only the middle row changed
+    for v in range(0, 100, 7):
+        text = f"{v:>3}"
+
+        def draw(fb, text=text):
+            fb.fill_rect(0, 8, 128, 16, 0)
+            myfont.draw_12x16_font(fb, text, 52, 8, 128, 32)
+            fb.text("km/h", 94, 17)
+            return 0, 0, 127, 31
+        yield draw, (0, 0, 127, 31)
+
+
+def rnd_frames():
+    # 64x32 gear panel (column offset 32 on the controller)
+    for i in range(60):
+        char = "RND N"[i % 5]
+
+        def draw(fb, char=char):
+            return myfont.draw_12x16_font(fb, char, 14, 8, 64, 32)
+        yield draw, (14, 8, 25, 23)
+
+
+SCENARIOS = (
+    ("speed 0-130 km/h", speed_frames, 128),
+    ("odometer +1 km", odometer_frames, 128),
+    ("trip +0.1 km", trip_frames, 128),
+    ("central temps", central_frames, 128),
+    ("full redraw", full_redraw_frames, 128),
+    ("RND gear 64x32", rnd_frames, 64),
+)
+
+
+def run(name, frames, width=128, height=32):
+    bus = RecordingI2C()
+    panel = bus.attach(ADDR, SSD1306Panel(width, height))
+    disp = SSD1306_I2C(width, height, bus, addr=ADDR)
+    bus.reset_counters()
+
+    n = 0
+    legacy_bytes = legacy_tx = 0
+    errors = 0
+    for draw, rect in frames():
+        box = draw(disp)
+        disp.show(*box)
+        b, t = legacy_frame(width, *rect)
+        legacy_bytes += b
+        legacy_tx += t
+        if not panel.matches(disp.buffer):
+            errors += 1
+        n += 1
+
+    print(f"\n[{name}] {n} frames")
+    print(f"  legacy  {legacy_bytes / n:7.1f} B/frame  {legacy_tx / n:5.1f} transactions/frame")
+    alloc, foreign = alloc_per_show(frames, width, height)
+    print(f"  diff    {bus.bytes / n:7.1f} B/frame  {bus.transactions / n:5.1f} transactions/frame  "
+          f"({bus.wire_time_us() / n:6.0f} us/frame at {bus.freq // 1000} kHz)  "
+          f"alloc {alloc:6.1f} B/show")
+    if errors:
+        print(f"  ERROR: panel RAM differs from framebuffer in {errors} frames")
+    if foreign:
+        print(f"  ERROR: {foreign} data buffers sent are not preallocated views")
+    exact_alloc = alloc if AllocMeter().micropython else 0
+    if exact_alloc:
+        print(f"  ERROR: show() allocates {exact_alloc:.1f} B after the warm-up")
+    return not (errors or foreign or exact_alloc)
+
+
+# --- Command batching ---
+class PerByteCommands(SSD1306_I2C):
+    """Previous command path: one writeto (0x80 + byte) per command byte."""
+
+    def write_cmds(self, cmds):
+        for cmd in cmds:
+            self.write_cmd(cmd)
+        return True
+
+
+COMMAND_OPS = (
+    ("init", None),
+    ("contrast", lambda d: d.contrast(0x40)),
+    ("invert", lambda d: d.invert(1)),
+    ("rotate", lambda d: d.rotate(0)),
+    ("show 12x16 glyph", lambda d: (d.fill_rect(52, 8, 12, 16, 1), d.show(52, 8, 63, 23))),
+)
+
+
+def command_counts(cls):
+    """[(op, transactions, bytes)] for one instance of `cls`, plus the panel."""
+    bus = RecordingI2C()
+    panel = bus.attach(ADDR, SSD1306Panel(128, 32))
+    disp = cls(128, 32, bus, addr=ADDR)
+    rows = [("init", bus.transactions, bus.bytes)]
+    for op, fn in COMMAND_OPS[1:]:
+        bus.reset_counters()
+        fn(disp)
+        rows.append((op, bus.transactions, bus.bytes))
+    return rows, panel, disp
+
+
+def report_commands():
+    print("\n[commands] transactions (bytes) per call: per-byte -> batched")
+    old, _, _ = command_counts(PerByteCommands)
+    new, panel, disp = command_counts(SSD1306_I2C)
+    for (op, t0, b0), (_, t1, b1) in zip(old, new):
+        print(f"  {op:<18} {t0:3d} ({b0:4d} B) -> {t1:3d} ({b1:4d} B)")
+    ok = panel.display_on and panel.contrast == 0x40 and panel.inverted and panel.mode == 0
+    ok = ok and panel.matches(disp.buffer)
+    if not ok:
+        print("  ERROR: decoded panel state does not match the driver calls")
+    return ok
+
+
+def alloc_per_show(frames, width, height):
+    """
+    (heap bytes per show() in steady state (second pass), data buffers of the
+    first pass that are not the driver's preallocated views).
+    """
+    bus = NullI2C()
+    disp = SSD1306_I2C(width, height, bus, addr=ADDR)
+    bus.views = {id(view) for view in disp._views}
+    for draw, _ in frames():
+        disp.show(*draw(disp))
+    foreign = bus.foreign
+    bus.views = None                       # Not checked while measuring
+    meter = AllocMeter()
+    meter.start()
+    n = 0
+    for draw, _ in frames():
+        box = draw(disp)
+        meter.begin()
+        disp.show(*box)
+        meter.end()
+        n += 1
+    return meter.stop() / n, foreign
+
+
+def main():
+    print(f"SSD1306 transfer benchmark - allocation: {AllocMeter().kind}")
+    ok = True
+    for name, frames, width in SCENARIOS:
+        ok &= run(name, frames, width)
+    ok &= report_commands()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# tools/bench_telemetry.py
+# Host-side benchmark of the RX -> validate -> publish path
+# Compares the previous per-packet dict pipeline with the preallocated
+# TelemetryRecord pipeline (telemetry.py) on the same decoded frames.
+#
+# Usage (from repo root):
+#   python tools/bench_telemetry.py [frames]
+#   micropython tools/bench_telemetry.py [frames]
+#
+# CPython boxes every int > 256, so the record path shows a few ints per frame
+# there; on MicroPython (small ints are unboxed) it allocates nothing.
+
+import sys
+import struct
+
+from benchutil import AllocMeter, measure, add_repo_to_path
+from bench_rs485 import build_frame
+
+add_repo_to_path(__file__)
+
+from status_codes import get_imd_state, get_vifc_state
+from telemetry import (
+    TelemetryRecord, TELEMETRY_FORMAT, PAYLOAD_OFFSET, R_ISO_MAX, R_ISO_WARNING,
+    validate_telemetry_data, publish_telemetry
+)
+
+DEFAULT_FRAMES = 20000
+
+
+def make_telemetry_dict():
+    """Same keys as SharedTelemetryData.internal_telemetry_data."""
+    return {
+        'motorRPM': 0, 'mcuFlags': 0, 'mcuFaultLevel': 0, 'imdIsoR': R_ISO_MAX,
+        'imdStatusRaw': 0, 'vifcStatusRaw': 0, 'mcuStatus': "MCU NDT",
+        'imdStatus': "IMD NDT", 'vifcStatus': "VI NDT", 'imdState': "IMD NDT",
+        'motorTemp': 0, 'mcuTemp': 0, 'systemStatus': 'WAITING_FOR_DATA',
+        'motorDataValid': False, 'imdDataValid': False,
+    }
+
+
+# --- Reference: previous dict pipeline (RS485_RX._parse_packet + main.py) ---
+def legacy_parse(packet):
+    valid_byte = packet[14]
+    return {
+        'type': 'telemetry',
+        'motorRPM': (packet[1] << 8) | packet[2],
+        'motorTemp': int.from_bytes(packet[3:4], 'big', signed=True),
+        'mcuTemp': int.from_bytes(packet[4:5], 'big', signed=True),
+        'mcuFlags': (packet[5] << 8) | packet[6],
+        'mcuFaultLevel': packet[7],
+        'imdIsoR': (packet[8] << 8) | packet[9],
+        'imdState': get_imd_state((packet[10] << 8) | packet[11]),
+        'vifcStatus': get_vifc_state((packet[12] << 8) | packet[13]),
+        'motorDataValid': bool(valid_byte & 0x02),
+        'imdDataValid': bool(valid_byte & 0x01),
+        'selfTestFailed': bool(valid_byte & 0x80)
+    }
+
+
+def legacy_validate(data):
+    if not data or data.get('type') != 'telemetry':
+        return False
+    motor_valid = data.get('motorDataValid', False)
+    imd_valid = data.get('imdDataValid', False)
+    if not (motor_valid or imd_valid):
+        return False
+    if motor_valid:
+        if not (0 <= data.get('motorRPM', 0) < 12000):
+            return False
+        if not (-40 <= data.get('motorTemp', 0) <= 150):
+            return False
+        if not (-40 <= data.get('mcuTemp', 0) <= 150):
+            return False
+    if imd_valid:
+        if not (0 <= data.get('imdIsoR', 0) < R_ISO_MAX):
+            return False
+    return True
+
+
+def legacy_publish(last_valid, t):
+    get = last_valid.get
+    motor_valid = get('motorDataValid', False)
+    imd_valid = get('imdDataValid', False)
+    t['motorRPM'] = get('motorRPM', 0) if motor_valid else 0
+    t['motorTemp'] = get('motorTemp', 0) if motor_valid else 0
+    t['mcuTemp'] = get('mcuTemp', 0) if motor_valid else 0
+    t['mcuFlags'] = get('mcuFlags', 0) if motor_valid else 0
+    t['mcuFaultLevel'] = get('mcuFaultLevel', 0) if motor_valid else 0
+    t['imdIsoR'] = get('imdIsoR', 0) if imd_valid else 0
+    t['imdState'] = get('imdState', "IMD NDT") if imd_valid else "IMD NDT"
+    t['vifcStatus'] = get('vifcStatus', 0) if imd_valid else 0
+    t['motorDataValid'] = motor_valid
+    t['imdDataValid'] = imd_valid
+    is_ok = (motor_valid or imd_valid) and get('imdIsoR', R_ISO_MAX) >= R_ISO_WARNING
+    t['systemStatus'] = 'OK' if is_ok else 'ISO_ERROR'
+
+
+# --- Pipelines ---
+def run_legacy(frames, meter):
+    t = make_telemetry_dict()
+    published = 0
+    for packet in frames:
+        meter.begin()
+        data = legacy_parse(packet)
+        if legacy_validate(data):
+            legacy_publish(data, t)
+            published += 1
+        meter.end()
+    return published
+
+
+def run_record(frames, meter):
+    t = make_telemetry_dict()
+    rec = TelemetryRecord()
+    published = 0
+    for packet in frames:
+        meter.begin()
+        rec.unpack(packet)
+        if validate_telemetry_data(rec):
+            publish_telemetry(rec, t)
+            published += 1
+        meter.end()
+    return published
+
+
+def make_frames(count):
+    frames = []
+    for i in range(count):
+        frames.append(build_frame(
+            (i * 37) % 12000, 20 + i % 80, 25 + i % 60, (i >> 5) & 0x0F, i & 3,
+            (i * 13) % 60000, (i >> 8) & 0x3F, 1 | ((i >> 9) & 0x16), (0x03, 0x02, 0x01, 0x00)[i & 3]
+        ))
+    return frames
+
+
+def check_layout(frames):
+    """Cross-check the index-based decoder against struct.unpack_from."""
+    rec = TelemetryRecord()
+    for packet in frames:
+        rec.unpack(packet)
+        expected = struct.unpack_from(TELEMETRY_FORMAT, packet, PAYLOAD_OFFSET)
+        got = (rec.motor_rpm, rec.motor_temp, rec.mcu_temp, rec.mcu_flags, rec.mcu_fault_level,
+               rec.imd_iso_r, rec.imd_status, rec.vifc_status, rec.valid)
+        if got != expected:
+            raise AssertionError(f"Decoder mismatch: {got} != {expected}")
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else DEFAULT_FRAMES
+    frames = make_frames(count)
+    check_layout(frames)
+    print(f"Telemetry pipeline benchmark - {count} frames, allocation: {AllocMeter().kind}")
+    for label, runner in (("record", run_record), ("legacy", run_legacy)):
+        published, elapsed, alloc = measure(runner, frames)
+        us_per_frame = elapsed / count
+        print(f"  {label:<7} published={published:<6} {us_per_frame:7.2f} us/frame  "
+              f"alloc={alloc / count:8.2f} B/frame")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
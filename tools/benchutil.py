@@ -0,0 +1,105 @@
+# tools/benchutil.py
+# Shared helpers for the host-side benchmarks (CPython and MicroPython unix port)
+
+import sys
+import gc
+
+try:
+    import utime as _time
+
+    def now_us():
+        return _time.ticks_us()
+
+    def elapsed_us(t0):
+        return _time.ticks_diff(_time.ticks_us(), t0)
+except ImportError:
+    import time as _time
+
+    def now_us():
+        return _time.perf_counter_ns() // 1000
+
+    def elapsed_us(t0):
+        return now_us() - t0
+
+
+def add_repo_to_path(file):
+    """Make the device modules in the repo root importable from tools/."""
+    here = file.rsplit("/", 1)[0] if "/" in file else "."
+    sys.path.insert(0, here + "/..")
+
+
+def add_sim_to_path(file):
+    """
+    Host stand-ins for the firmware modules (sim/), only where the real ones
+    are missing: on the MicroPython unix port its own framebuf etc. win.
+    """
+    here = file.rsplit("/", 1)[0] if "/" in file else "."
+    sys.path.append(here + "/../sim")
+
+
+class AllocMeter:
+    """
+    MicroPython: exact bytes allocated (gc.mem_alloc() grows while GC is off).
+    CPython: per-iteration tracemalloc peak above the live heap, summed -
+    a lower bound of the transient bytes allocated.
+    """
+
+    def __init__(self):
+        self.micropython = hasattr(gc, "mem_alloc")
+        self.total = 0
+        self._tm = None
+        if not self.micropython:
+            import tracemalloc
+            self._tm = tracemalloc
+
+    @property
+    def kind(self):
+        return "exact (gc.mem_alloc)" if self.micropython else "tracemalloc lower bound"
+
+    def start(self):
+        gc.collect()
+        self.total = 0
+        if self.micropython:
+            gc.disable()
+            self._base = gc.mem_alloc()
+        else:
+            self._tm.start()
+
+    def begin(self):
+        if not self.micropython:
+            self._tm.reset_peak()
+            self._base = self._tm.get_traced_memory()[0]
+
+    def end(self):
+        if not self.micropython:
+            self.total += self._tm.get_traced_memory()[1] - self._base
+
+    def stop(self):
+        if self.micropython:
+            self.total = gc.mem_alloc() - self._base
+            gc.enable()
+        else:
+            self._tm.stop()
+        return self.total
+
+
+class NullMeter:
+    def begin(self):
+        pass
+
+    def end(self):
+        pass
+
+
+def measure(runner, *args):
+    """
+    Run runner(*args, meter) twice: once timed with a NullMeter, once under an
+    AllocMeter. Returns (result_of_timed_run, elapsed_us, allocated_bytes).
+    """
+    t0 = now_us()
+    result = runner(*args, NullMeter())
+    elapsed = elapsed_us(t0)
+    meter = AllocMeter()
+    meter.start()
+    runner(*args, meter)
+    return result, elapsed, meter.stop()
@@ -0,0 +1,135 @@
+# tools/build_mpy.py
+# Precompiled firmware for a faster cold boot
+# On the board MicroPython compiles every .py it imports: main.py pulls in all
+# firmware modules at boot, myfont.py with its glyph tables included. Two builds
+# take the compiler out of the boot:
+#   - .mpy (default): mpy-cross compiles every module to build/mpy/<name>.mpy,
+#     main.py as dashboard.mpy plus a two-line main.py stub. Bytecode and
+#     constants are loaded into the heap, but nothing is parsed at boot.
+#     mpy-cross must be the firmware's version (MicroPython 1.26 → mpy v6)
+#   - --manifest: build/frozen/manifest.py freezes the same modules into the
+#     firmware image (make -C ports/rp2 BOARD=... FROZEN_MANIFEST=...).
+#     Bytecode and constants – the font bytes too – stay in flash and take no
+#     heap; myfont's glyphs blit straight from them. Only the stub goes on
+#     the filesystem
+# A .py on the board wins over a .mpy or frozen module of the same name: remove
+# the old sources when installing. Boot time before/after: tools/bench_boot.py
+# (simulator), the BOOT_TIME event in the device log (debuglog).
+#
+# Usage (from repo root):
+#   python tools/build_mpy.py                          # build/mpy/, needs mpy-cross
+#   python tools/build_mpy.py --mpy-cross ~/micropython/mpy-cross/build/mpy-cross
+#   python tools/build_mpy.py --manifest               # build/frozen/, no mpy-cross needed
+#   mpremote cp -r build/mpy/. :                       # install the .mpy build
+
+import os
+import shutil
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD = os.path.join(REPO, "build")
+MPY_CROSS_ARGS = ("-march=armv6m",)    # RP2040 (Cortex-M0+) native/viper code, if any
+MPY_VERSION = "mpy v6"                 # .mpy format of MicroPython 1.26
+APP_MODULE = "dashboard"               # main.py's name once compiled (main.py itself is the stub)
+
+STUB = ("# main.py - precompiled firmware (tools/build_mpy.py)\n"
+        f"import {APP_MODULE}\n"
+        f"{APP_MODULE}.boot()\n")
+
+MANIFEST_HEADER = ("# Generated by tools/build_mpy.py – freeze the dashboard firmware\n"
+                   'include("$(PORT_DIR)/boards/manifest.py")\n')
+
+
+def firmware_modules():
+    """(module name, source path) of every firmware module, main.py as APP_MODULE."""
+    modules = []
+    for name in sorted(os.listdir(REPO)):
+        if name.endswith(".py"):
+            module = APP_MODULE if name == "main.py" else name[:-3]
+            modules.append((module, os.path.join(REPO, name)))
+    return modules
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="\n") as f:
+        f.write(text)
+
+
+def _mpy_cross_version(mpy_cross):
+    try:
+        return subprocess.run((mpy_cross, "--version"), capture_output=True, text=True,
+                              timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_mpy(mpy_cross):
+    version = _mpy_cross_version(mpy_cross)
+    if version is None:
+        print(f"mpy-cross not found ({mpy_cross}). Install the firmware's version "
+              "(pip install mpy-cross==1.26.*) or build it from the MicroPython tree "
+              "and pass --mpy-cross PATH.")
+        return 2
+    print(version)
+    if MPY_VERSION not in version:
+        print(f"WARNING: firmware expects {MPY_VERSION}; the board will refuse other .mpy versions.")
+
+    out = os.path.join(BUILD, "mpy")
+    shutil.rmtree(out, ignore_errors=True)
+    os.makedirs(out)
+    total_src = total_mpy = 0
+    for module, src in firmware_modules():
+        dst = os.path.join(out, module + ".mpy")
+        result = subprocess.run((mpy_cross,) + MPY_CROSS_ARGS + ("-o", dst, src),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"{os.path.basename(src)}: mpy-cross failed\n{result.stderr.strip()}")
+            return 1
+        src_size = os.path.getsize(src)
+        mpy_size = os.path.getsize(dst)
+        total_src += src_size
+        total_mpy += mpy_size
+        print(f"{module + '.mpy':<24}{src_size:>8} B source → {mpy_size:>7} B")
+    _write(os.path.join(out, "main.py"), STUB)
+    print(f"{'total':<24}{total_src:>8} B source → {total_mpy:>7} B")
+    print(f"\n{out}: copy to the board root (mpremote cp -r {os.path.relpath(out)}/. :) "
+          "and delete the firmware .py files there.")
+    return 0
+
+
+def build_manifest():
+    out = os.path.join(BUILD, "frozen")
+    os.makedirs(out, exist_ok=True)
+    lines = [MANIFEST_HEADER]
+    for module, src in firmware_modules():
+        if module == APP_MODULE:
+            shutil.copyfile(src, os.path.join(out, APP_MODULE + ".py"))
+            lines.append(f'module("{APP_MODULE}.py", base_path="{out}")\n')
+        else:
+            lines.append(f'module("{os.path.basename(src)}", base_path="{REPO}")\n')
+    manifest = os.path.join(out, "manifest.py")
+    _write(manifest, "".join(lines))
+    _write(os.path.join(out, "main.py"), STUB)
+    print(f"{manifest}: {len(lines) - 1} modules")
+    print(f"Build: make -C ports/rp2 BOARD=RPI_PICO FROZEN_MANIFEST={manifest}")
+    print(f"Then flash the .uf2, copy {os.path.relpath(out)}/main.py to the board and "
+          "delete the firmware .py files there.")
+    return 0
+
+
+def _arg(argv, name, default=None):
+    if name in argv:
+        return argv[argv.index(name) + 1]
+    return default
+
+
+def main(argv):
+    if "--manifest" in argv:
+        return build_manifest()
+    return build_mpy(_arg(argv, "--mpy-cross", "mpy-cross"))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,84 @@
+# tools/log_decode.py
+# Host-side decoder for the debuglog event ring
+# Accepts a captured REPL/UART log containing debuglog.dump() output (hex
+# records between #LOG and #END) or a binary file from debuglog.save().
+# Formats each record with the MESSAGES table of the firmware's debuglog.py.
+#
+# Usage (from repo root):
+#   python tools/log_decode.py capture.log
+#   python tools/log_decode.py log.bin
+#   python tools/log_decode.py capture.log --level 2     # only levels <= 2
+
+import struct
+import sys
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+from debuglog import RECORD_FORMAT, RECORD_SIZE, format_event
+
+
+def parse_hex(text):
+    """Records of the last #LOG ... #END block in a text capture."""
+    blocks = []
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#LOG"):
+            current = bytearray()
+        elif line == "#END" and current is not None:
+            blocks.append(bytes(current))
+            current = None
+        elif current is not None and line:
+            current += bytes.fromhex(line)
+    return blocks[-1] if blocks else None
+
+
+def parse_binary(data):
+    """Records of a debuglog.save() file (header line + raw records)."""
+    end = data.index(b"\n")
+    return data[end + 1:]
+
+
+def decode(data):
+    """[(ticks_ms, level, text)] oldest first."""
+    events = []
+    for k in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+        t, msg, level, a, b, c, d = struct.unpack_from(RECORD_FORMAT, data, k)
+        events.append((t, level, format_event(msg, a, b, c, d)))
+    return events
+
+
+def main(argv):
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    max_level = 9
+    if "--level" in argv:
+        max_level = int(argv[argv.index("--level") + 1])
+        args = [a for a in args if a != str(max_level)]
+    if not args:
+        print("usage: log_decode.py <capture.log | log.bin> [--level n]")
+        sys.exit(2)
+    with open(args[0], "rb") as f:
+        raw = f.read()
+    if raw.startswith(b"#LOGBIN"):
+        data = parse_binary(raw)
+    else:
+        data = parse_hex(raw.decode("utf-8", "replace"))
+    if data is None:
+        print("No debuglog dump found (#LOG ... #END)")
+        sys.exit(1)
+    events = decode(data)
+    if not events:
+        print("Log is empty")
+        return
+    t0 = events[0][0]
+    for t, level, text in events:
+        if level <= max_level:
+            print(f"{(t - t0) & 0x3FFFFFFF:9d} ms  L{level}  {text}")
+    print(f"{len(events)} events")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
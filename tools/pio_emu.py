@@ -0,0 +1,148 @@
+# tools/pio_emu.py
+# Host-side check of the stepper PIO program in stepper_pio.py
+# Assembles stepper_program_source() with the simulator's PIO assembler
+# (sim/pio.py: recording DSL, same trick as rp2.asm_pio), executes it cycle
+# by cycle and checks that
+#   - the coil patterns equal Motor._step() for the same step/direction sequence
+#   - the spacing between phase changes matches the commanded period
+#   - stepper_pio.PioPhaseBackend on the simulated rp2.StateMachine drives
+#     the same patterns onto the GPIOs at the same device times
+#
+# Usage (from repo root):  python tools/pio_emu.py
+
+import sys
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+import motor
+import stepper_pio
+from stepper_pio import phase_pattern, encode_command, stepper_program_source, STEP_LOOP_CYCLES
+from pio import assemble, PioEmulator
+
+
+# --- Reference: Python backend ---
+class _RecordingPin:
+    def __init__(self):
+        self.val = 0
+
+    def value(self, val=None):
+        if val is None:
+            return self.val
+        self.val = val
+
+
+def reference_sequence(motor_cls, commands):
+    """Pin patterns produced by Motor._step() for [(direction, count, period_us)]."""
+    pins = [_RecordingPin() for _ in range(4)]
+    m = motor_cls(*pins)
+    out = []
+    for direction, count, _ in commands:
+        for _ in range(count):
+            m._step(direction)
+            out.append(sum(p.val << i for i, p in enumerate(pins)))
+    return out
+
+
+def emulate(motor_cls, commands):
+    pattern = phase_pattern(motor_cls.states, 0)
+    if pattern is None:
+        return None
+    word, fwd_shift, rev_shift = pattern
+    emu = PioEmulator(assemble(stepper_program_source(fwd_shift, rev_shift)))
+    emu.put(word)
+    for direction, count, period_us in commands:
+        emu.put(encode_command(direction, count, period_us))
+    emu.run()
+    return emu
+
+
+def check(name, motor_cls, commands):
+    expected = reference_sequence(motor_cls, commands)
+    emu = emulate(motor_cls, commands)
+    if emu is None:
+        print(f"[{name}] table not supported by PIO → Python backend (expected for half step)")
+        return True
+    got = [value for _, value in emu.trace]
+    ok = got == expected
+    print(f"[{name}] {len(got)} steps, phases {'OK' if ok else 'MISMATCH'}")
+    if not ok:
+        for i, (g, e) in enumerate(zip(got, expected)):
+            if g != e:
+                print(f"  first mismatch at step {i}: pio={g:04b} python={e:04b}")
+                break
+        return False
+
+    # Timing: within a command every phase lasts exactly period_us
+    # (US_PER_CYCLE µs per cycle); command boundaries add the pull/decode
+    # overhead once.
+    step = 0
+    worst = 0
+    boundary_extra = 0
+    for direction, count, period_us in commands:
+        for k in range(count):
+            if step + 1 < len(emu.trace):
+                spacing = (emu.trace[step + 1][0] - emu.trace[step][0]) * stepper_pio.US_PER_CYCLE
+                if k + 1 < count:
+                    worst = max(worst, abs(spacing - period_us))
+                else:
+                    boundary_extra = max(boundary_extra, (spacing - period_us) // stepper_pio.US_PER_CYCLE)
+            step += 1
+    print(f"  in-command timing error {worst} us, command boundary overhead <= {boundary_extra} cycles")
+    return worst == 0
+
+
+def check_backend(name, motor_cls, commands, base=10):
+    """PioPhaseBackend → sim rp2.StateMachine → recorded GPIO edges (virtual clock)."""
+    from simclock import clock
+    from board import board
+    board.reset()
+    board.trace(*range(base, base + 4))
+    clock.start(cpu_scale=0)
+    try:
+        backend = stepper_pio.PioPhaseBackend(0, tuple(range(base, base + 4)), motor_cls.states)
+        for direction, count, period_us in commands:
+            while not backend.room():
+                clock.advance(100)
+            backend.emit(direction, period_us, count)
+        clock.advance(sum(count * period for _, count, period in commands) + 1000)
+        board.sync()
+        t0 = board.state_machines[0]._origin_us
+    finally:
+        clock.stop()
+    # Pin value per edge time (the 4 coils switch together in one `mov pins`)
+    times = sorted({t for gpio in range(base, base + 4) for t, _ in board.pins[gpio].trace})
+    patterns = []
+    for t in times:
+        value = 0
+        for i in range(4):
+            bits = [v for te, v in board.pins[base + i].trace if te <= t]
+            value |= (bits[-1] if bits else 0) << i
+        patterns.append((t - t0, value))
+    emu = emulate(motor_cls, commands)
+    expected = [(cycle * 1_000_000 // stepper_pio.PIO_FREQ, value) for cycle, value in emu.trace]
+    # Edges only where the value changed (a repeated pattern makes no edge)
+    expected = [e for k, e in enumerate(expected) if k == 0 or e[1] != expected[k - 1][1]]
+    ok = patterns == expected
+    print(f"[{name}] sim rp2.StateMachine: {len(patterns)} pin changes, "
+          f"{'same patterns and times' if ok else 'MISMATCH'}")
+    return ok
+
+
+def main():
+    fwd_rev = [(1, 7, 5000), (-1, 3, 5000), (1, 1, 2500), (-1, 9, 3000), (1, 4, 30000)]
+    single = [(1 if i % 5 else -1, 1, 2000 + 100 * i) for i in range(40)]
+    ok = True
+    ok &= check("FullStepMotor fwd/rev", motor.FullStepMotor, fwd_rev)
+    ok &= check("FullStepMotor single steps", motor.FullStepMotor, single)
+    ok &= check("HalfStepMotor", motor.HalfStepMotor, fwd_rev)
+    ok &= check_backend("FullStepMotor fwd/rev", motor.FullStepMotor, fwd_rev)
+    print(f"PIO loop overhead: {STEP_LOOP_CYCLES} cycles/step at {stepper_pio.PIO_FREQ} Hz")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
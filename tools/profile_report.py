@@ -0,0 +1,106 @@
+# tools/profile_report.py
+# Host-side summary of profiler.dump() output
+# Reads a captured REPL/UART log (other lines are ignored), takes the last
+# dump in it and prints count, mean, p50, p90, p99 and max per probe. Dumps
+# written with reset (main.py's stats job, header ends in "reset") cover one
+# interval each; --sum adds up all of them.
+# Percentiles come from the histogram: the upper edge of the bucket that
+# holds the rank (~25 % resolution); max and mean are exact.
+#
+# Usage (from repo root):
+#   python tools/profile_report.py capture.log
+#   python tools/profile_report.py capture.log --all     # every dump in the log
+#   python tools/profile_report.py capture.log --sum     # all intervals together
+#   mpremote exec "import profiler; profiler.dump()" | python tools/profile_report.py
+
+import sys
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+from profiler import bucket_high, BUCKETS
+
+PERCENTILES = (50, 90, 99)
+
+
+def parse_dumps(lines):
+    """[(header, {name: (count, total, max, {bucket: n})})] for each dump in the log."""
+    dumps = []
+    current = None
+    header = None
+    for line in lines:
+        line = line.strip()
+        if line.startswith("#PROFILE"):
+            header = line
+            current = {}
+        elif line == "#END" and current is not None:
+            dumps.append((header, current))
+            current = None
+        elif line.startswith("P ") and current is not None:
+            parts = line.split()
+            name, count, total, peak = parts[1], int(parts[2]), int(parts[3]), int(parts[4])
+            hist = {}
+            for item in parts[5:]:
+                idx, n = item.split(":")
+                hist[int(idx)] = int(n)
+            current[name] = (count, total, peak, hist)
+    return dumps
+
+
+def merge(dumps):
+    """One dump from interval dumps: counts, totals and histograms added, max of maxes."""
+    merged = {}
+    for _, probes in dumps:
+        for name, (count, total, peak, hist) in probes.items():
+            m_count, m_total, m_peak, m_hist = merged.get(name, (0, 0, 0, {}))
+            for idx, n in hist.items():
+                m_hist[idx] = m_hist.get(idx, 0) + n
+            merged[name] = (m_count + count, m_total + total, max(m_peak, peak), m_hist)
+    return (f"{dumps[0][0]} .. {len(dumps)} dumps", merged)
+
+
+def percentile(hist, count, pct, peak):
+    """Upper bucket edge at rank pct (capped by the exact max)."""
+    if not count:
+        return 0
+    rank = (count * pct + 99) // 100
+    seen = 0
+    for idx in sorted(hist):
+        seen += hist[idx]
+        if seen >= rank:
+            high = bucket_high(idx) if idx < BUCKETS - 1 else peak
+            return min(high, peak)
+    return peak
+
+
+def report(header, probes, out=sys.stdout):
+    out.write(f"{header}\n")
+    out.write(f"{'probe':<22} {'count':>8} {'mean':>9} " +
+              " ".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f" {'max':>9}  (us)\n")
+    for name in sorted(probes):
+        count, total, peak, hist = probes[name]
+        mean = total // count if count else 0
+        cols = " ".join(f"{percentile(hist, count, p, peak):9d}" for p in PERCENTILES)
+        out.write(f"{name:<22} {count:8d} {mean:9d} {cols} {peak:9d}\n")
+
+
+def main(argv):
+    args = [a for a in argv[1:] if not a.startswith("--")]
+    if args:
+        with open(args[0]) as f:
+            dumps = parse_dumps(f)
+    else:
+        dumps = parse_dumps(sys.stdin)
+    if not dumps:
+        print("No profiler dump found (#PROFILE ... #END)")
+        sys.exit(1)
+    if "--sum" in argv:
+        dumps = [merge(dumps)]
+    for header, probes in (dumps if "--all" in argv else dumps[-1:]):
+        report(header, probes)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
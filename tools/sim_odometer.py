@@ -0,0 +1,214 @@
+# tools/sim_odometer.py
+# Host-side long-distance check of the odometer arithmetic
+# Drives a deterministic mixed profile (city / country / motorway, stops) at
+# the pointer job period and accumulates the distance two ways:
+#   int    wheel pulses in SharedTelemetryData (distance.py), as the firmware does
+#   float  the previous float total_km += pulses * mm / 1e6, in float32 like
+#          MicroPython on the RP2040
+# Every stop saves through store_km (journal in a temp dir); reboots reload it.
+# The integer path must match the exact distance and survive every reload.
+#
+# Usage (from repo root):
+#   python tools/sim_odometer.py                 # 300,000 km
+#   python tools/sim_odometer.py 50000           # other distance (km)
+#
+# float32: one addition per 50 ms tick; repeated additions are fast-forwarded
+# within a binade (same ulp → same rounded step), so 300,000 km (~2e8 ticks)
+# run in seconds. Tick order inside one constant-speed segment is not kept,
+# which only matters for the addition that crosses into the next binade.
+
+import math
+import os
+import struct
+import sys
+import tempfile
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+import distance
+import store_km
+
+TICK_MS = 50               # main.py pointer job period
+REBOOT_EVERY = 500         # Saves between simulated reboots (reload from the journal)
+TRIP_RESET_KM = 1000
+MILESTONES_KM = (1000, 10000, 16384, 32768, 65536, 100000, 200000, 300000)
+
+
+class _Lcg:
+    """Deterministic PRNG (same profile on every run)."""
+
+    def __init__(self, seed=12345):
+        self.state = seed
+
+    def next(self, n):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return (self.state >> 8) % n
+
+
+# --- float32 ---
+def f32(x):
+    return struct.unpack("<f", struct.pack("<f", x))[0]
+
+
+def f32_add_repeat(acc, inc, n):
+    """acc after n float32 additions of inc (> 0), fast-forwarded per binade."""
+    while n > 0:
+        if acc < 1.0:
+            acc = f32(acc + inc)
+            n -= 1
+            continue
+        e = math.frexp(acc)[1]             # acc in [2^(e-1), 2^e)
+        top = 2.0 ** e
+        ulp = 2.0 ** (e - 24)
+        q = inc / ulp
+        if q - math.floor(q) == 0.5:       # Tie → round half to even alternates
+            acc = f32(acc + inc)
+            n -= 1
+            continue
+        step = math.floor(q + 0.5) * ulp   # What one addition really adds here
+        if step == 0:
+            return acc                     # Increment below half an ulp: total frozen
+        k = math.ceil((top - acc) / step) - 1  # Additions that stay in this binade
+        if k >= n:
+            return acc + n * step
+        acc += k * step
+        n -= k
+        acc = f32(acc + inc)               # The crossing addition, rounded for real
+        n -= 1
+    return acc
+
+
+def float_increment(pulses):
+    """Old pulsecounter: pulses * _MM_PER_PULSE / MM_PER_KM (float32)."""
+    mm_per_pulse = f32(distance.WHEEL_CIRCUMFERENCE_MM / distance.PULSES_PER_REVOLUTION)
+    return f32(f32(pulses * mm_per_pulse) / distance.MM_PER_KM)
+
+
+# --- Drive profile: (speed km/h, duration s) segments, 0 km/h = stop ---
+def profile(rng):
+    while True:
+        kind = rng.next(10)
+        if kind < 4:                       # City
+            yield 20 + rng.next(31), 60 + rng.next(240)
+        elif kind < 7:                     # Country road
+            yield 60 + rng.next(41), 300 + rng.next(900)
+        elif kind < 9:                     # Motorway
+            yield 100 + rng.next(51), 600 + rng.next(3000)
+        else:                              # Fast motorway: 2 pulses in some ticks
+            yield 140 + rng.next(61), 300 + rng.next(1200)
+        yield 0, 5 + rng.next(120)
+
+
+class Journal:
+    """store_km on a temp dir, with reboots (module state dropped, then load)."""
+
+    def __init__(self, path):
+        store_km.DATA_DIR = path
+        store_km.JOURNAL_FILE = os.path.join(path, "odo.jnl")
+        store_km.FILE_PRIMARY = os.path.join(path, "odo1.txt")
+        store_km.FILE_BACKUP = os.path.join(path, "odo2.txt")
+        self.saves = 0
+        self.reboots = 0
+        self.errors = []
+        self.reboot()
+
+    def reboot(self):
+        store_km._seq = store_km._records = 0
+        store_km._last = None
+        self.reboots += 1
+        return store_km.load_odometer()
+
+    def save(self, total_pulses, trip_pulses):
+        if not store_km.save_odometer(total_pulses, trip_pulses):
+            self.errors.append(f"save failed at {total_pulses} pulses")
+        self.saves += 1
+        if self.saves % REBOOT_EVERY == 0:
+            loaded = self.reboot()
+            if loaded != (total_pulses, trip_pulses):
+                self.errors.append(f"reload {loaded} != {(total_pulses, trip_pulses)}")
+
+
+def run(target_km, journal, out=sys.stdout):
+    rng = _Lcg()
+    ticks_per_s = 1000 // TICK_MS
+    num = 0                                # Exact position: mm * 9 (v km/h → v * 125 / 9 mm per tick)
+    total_pulses = trip_pulses = 0
+    trip_start = 0
+    float_km = 0.0
+    incs = {}
+    milestones = [m for m in MILESTONES_KM if m <= target_km]
+    if target_km not in milestones:
+        milestones.append(target_km)
+    hours = 0.0
+    out.write(f"{'km (exact)':>12} {'int display':>12} {'float32':>14} {'float err km':>13} {'err %':>8}\n")
+
+    for speed, seconds in profile(rng):
+        ticks = seconds * ticks_per_s
+        hours += seconds / 3600
+        if speed == 0:
+            journal.save(total_pulses, trip_pulses)    # main block6: save during a stop
+            continue
+        before = num * distance.PULSES_PER_REVOLUTION // (9 * distance.WHEEL_CIRCUMFERENCE_MM)
+        num += speed * 125 * ticks
+        pulses = num * distance.PULSES_PER_REVOLUTION // (9 * distance.WHEEL_CIRCUMFERENCE_MM) - before
+
+        # Integer path: whole pulses per tick, summed (order irrelevant)
+        total_pulses += pulses
+        trip_pulses += pulses
+
+        # float32 path: per tick floor(m) or floor(m) + 1 pulses, m = pulses / ticks
+        lo = pulses // ticks
+        n_hi = pulses - lo * ticks
+        for k, n in ((lo, ticks - n_hi), (lo + 1, n_hi)):
+            if k and n:
+                inc = incs.get(k)
+                if inc is None:
+                    inc = incs[k] = float_increment(k)
+                float_km = f32_add_repeat(float_km, inc, n)
+
+        if distance.whole_km(trip_pulses) >= TRIP_RESET_KM:
+            trip_pulses = 0
+            trip_start = total_pulses
+
+        exact_km = num / 9 / distance.MM_PER_KM
+        while milestones and exact_km >= milestones[0]:
+            shown = distance.whole_km(total_pulses)
+            err = float_km - exact_km
+            out.write(f"{exact_km:12.3f} {shown:12d} {float_km:14.3f} {err:13.3f} {100 * err / exact_km:8.2f}\n")
+            milestones.pop(0)
+        if not milestones:
+            break
+
+    journal.save(total_pulses, trip_pulses)            # Parked at the end
+    exact_mm = num // 9
+    ok = True
+    checks = (
+        ("pulses → mm within one pulse of the exact distance",
+         0 <= exact_mm - distance.pulses_to_mm(total_pulses) < distance.WHEEL_CIRCUMFERENCE_MM),
+        ("pulse total is a small int (< 2^30)", total_pulses < (1 << 30)),
+        ("journal saves/reloads consistent", not journal.errors),
+        ("final reboot restores the totals", journal.reboot() == (total_pulses, trip_pulses)),
+        ("trip = total since last reset", trip_pulses == total_pulses - trip_start),
+    )
+    out.write(f"\n{hours:.0f} h of driving, {total_pulses} pulses, {journal.saves} saves, "
+              f"{journal.reboots} reboots\n")
+    for name, passed in checks:
+        out.write(f"  {'ok  ' if passed else 'FAIL'} {name}\n")
+        ok = ok and passed
+    for err in journal.errors[:5]:
+        out.write(f"       {err}\n")
+    return ok
+
+
+def main(argv):
+    target_km = int(argv[1]) if len(argv) > 1 else 300000
+    with tempfile.TemporaryDirectory() as path:
+        ok = run(target_km, Journal(path))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
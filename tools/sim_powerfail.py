@@ -0,0 +1,364 @@
+# tools/sim_powerfail.py
+# Host-side harness for the power-fail path (powerfail.py + store_km)
+# Simulates the 12 V rail in 100 µs steps: supply profile, hold-up capacitor
+# behind the reverse-polarity diode discharged by the load (steppers, OLEDs,
+# MCU), ADC readings with noise of the supply side (divider in front of the
+# diode, so a supply loss shows at once while the capacitor is still full).
+# The real PowerMonitor samples it every millisecond on a virtual clock; shed
+# and commit advance that clock by modelled durations (I2C command, flash
+# erase/program), while the rail keeps discharging with the load of the moment.
+# Checks per scenario: detected or not as expected, commit finished before
+# the 5 V buck drops out, shed + commit within COMMIT_BUDGET_US, journal
+# reload = totals at the commit, recovery after a brown-out.
+# Preemption: the timer callback runs between bytecodes, also inside a
+# regular save. A regular save (persist.OdometerSaver._save) is run once per
+# bytecode of persist/store_km code on its path, with the callback (totals
+# moved on, OdometerSaver.final()) fired right before that bytecode; the
+# reload must give the final totals from a journal with consecutive sequence
+# numbers. Once for an append, once for the rewrite of a full journal.
+#
+# Usage (from repo root):
+#   python tools/sim_powerfail.py             # typical flash timing
+#   python tools/sim_powerfail.py --worst     # datasheet maximum timing
+#
+# With the maximum erase time (400 ms) a supply that sags slowly down to
+# FAIL_MV leaves too little charge (~260 ms from 9 V) → reported as FAIL;
+# --worst shows which scenarios lack margin, the typical run must pass.
+#
+# Board assumptions (measure your own and adjust HOLDUP_UF / LOAD_MA):
+
+import os
+import sys
+import tempfile
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+import persist
+import powerfail
+import store_km
+
+HOLDUP_UF = 4700           # Bulk capacitor behind the reverse-polarity diode
+DROPOUT_MV = 6500          # 5 V buck loses regulation below this input
+SUPPLY_MV = 13500          # DC-DC output with ignition on
+LOAD_MA = {                # Current per consumer on the 12 V rail
+    "mcu": 45,             # RP2040 + flash + RS485 transceiver (incl. buck losses)
+    "odo_motor": 50,
+    "temp_motor": 50,
+    "tach": 5,
+    "oled": 15,            # Per panel, mostly lit
+}
+ADC_NOISE_LSB = 12         # ± on the 12-bit reading
+STEP_US = 100
+
+# Durations (µs): I2C display-off command, stepper halt, flash (W25Q16JV)
+SHED_US = {"odo_motor": 30, "temp_motor": 30, "tach": 10, "oled": 250}
+FLASH_TYP = {"erase": 45_000, "page": 400}
+FLASH_MAX = {"erase": 400_000, "page": 3_000}
+PAGE = 256
+COMPACTION_PAGES = 2       # Live metadata rewritten by a compaction (tools/bench_flash.py)
+
+
+class VirtualTime:
+    """utime stand-in on a simulated µs clock."""
+
+    def __init__(self):
+        self.us = 0
+
+    def ticks_us(self):
+        return self.us
+
+    def ticks_ms(self):
+        return self.us // 1000
+
+    def ticks_diff(self, a, b):
+        return a - b
+
+    def ticks_add(self, a, b):
+        return a + b
+
+
+class _Lcg:
+    def __init__(self, seed=1):
+        self.state = seed
+
+    def next(self, n):
+        self.state = (self.state * 1103515245 + 12345) & 0x7FFFFFFF
+        return (self.state >> 8) % n
+
+
+class Rail:
+    """Supply + hold-up capacitor + switchable loads."""
+
+    def __init__(self, clock, supply):
+        self.clock = clock
+        self.supply = supply       # t_us → source mV (0 = disconnected)
+        self.mv = float(SUPPLY_MV)
+        self.on = {"mcu": 1, "odo_motor": 1, "temp_motor": 1, "tach": 1, "oled": 3}
+        self.min_mv = self.mv
+        self.dropout_us = None
+        self.rng = _Lcg()
+
+    def load_ma(self):
+        return sum(LOAD_MA[k] * n for k, n in self.on.items())
+
+    def advance(self, us):
+        """Integrate the rail over `us` (clock moves along)."""
+        end = self.clock.us + us
+        while self.clock.us < end:
+            dt = min(STEP_US, end - self.clock.us)
+            self.clock.us += dt
+            decayed = self.mv - self.load_ma() * dt / HOLDUP_UF   # mA·µs/µF = mV
+            self.mv = max(decayed, self.supply(self.clock.us))
+            if self.mv < self.min_mv:
+                self.min_mv = self.mv
+            if self.dropout_us is None and self.mv < DROPOUT_MV:
+                self.dropout_us = self.clock.us
+
+    def read_u16(self):
+        """ADC on the supply side of the diode (the rail itself once the diode blocks)."""
+        raw12 = powerfail.mv_to_raw(int(self.supply(self.clock.us))) >> 4
+        raw12 += self.rng.next(2 * ADC_NOISE_LSB + 1) - ADC_NOISE_LSB
+        raw12 = min(max(raw12, 0), 4095)
+        return raw12 << 4
+
+
+def flash_commit_us(timing):
+    """
+    Inline journal save: one metadata commit (one page). Worst case, taken
+    every time: the commit fills the metadata block → compaction, one block
+    erase + the live metadata.
+    """
+    return timing["erase"] + (COMPACTION_PAGES + 1) * timing["page"]
+
+
+def run_scenario(name, supply, expect_fail, timing, busy_us=0, recovers=False, out=sys.stdout):
+    """
+    supply: t_us → mV. busy_us: a C call (regular save, I2C window) already in
+    progress when the rail first drops below FAIL_MV delays the first sample.
+    """
+    clock = VirtualTime()
+    powerfail.utime = clock
+    rail = Rail(clock, supply)
+    for k in range(store_km.JOURNAL_MAX_RECORDS):
+        store_km.save_odometer(123_000 + k, 456 + k)    # Regular saves: journal full (rewrite next)
+    totals = (124_000, 2_000)              # Driven since the last regular save
+
+    def shed_fn(key, count=1):
+        def fn():
+            rail.advance(SHED_US[key])
+            rail.on[key] -= count
+        return fn
+
+    shed = [shed_fn("odo_motor"), shed_fn("temp_motor"), shed_fn("tach"),
+            shed_fn("oled"), shed_fn("oled"), shed_fn("oled")]
+    commit_at = {}
+
+    def commit():
+        ok = store_km.save_odometer(*totals, final=True)    # persist.OdometerSaver.final()
+        rail.advance(flash_commit_us(timing))
+        commit_at["us"] = clock.us
+        commit_at["mv"] = rail.mv
+        commit_at["inline"] = (os.path.getsize(store_km.JOURNAL_FILE)
+                               <= store_km.JOURNAL_MAX_RECORDS * store_km.RECORD_SIZE)
+        return ok
+
+    recovered = []
+    monitor = powerfail.PowerMonitor(shed, commit, lambda: recovered.append(clock.us), adc=rail)
+    fail_cross = None
+    blocked = False
+    end_us = 3_000_000
+    while clock.us < end_us and not recovered:
+        rail.advance(powerfail.SAMPLE_PERIOD_MS * 1000)
+        if fail_cross is None and supply(clock.us) < powerfail.FAIL_MV:
+            fail_cross = clock.us
+            if busy_us and not blocked:
+                blocked = True
+                rail.advance(busy_us)      # Callback waits for the C call
+        if rail.dropout_us is not None and not monitor.failed:
+            break                          # Dead before detection
+        monitor.sample()
+        if monitor.failed and not recovers and "us" in commit_at:
+            rail.advance(200_000)          # Watch the rail run down after the commit
+            break
+
+    checks = []
+    if expect_fail:
+        done = "us" in commit_at
+        in_time = done and (rail.dropout_us is None or commit_at["us"] <= rail.dropout_us)
+        checks.append(("detected", monitor.failed))
+        checks.append(("commit before dropout", in_time))
+        checks.append(("shed + commit within budget", monitor.overruns == 0))
+        if done:
+            checks.append(("journal inline (one commit)", commit_at["inline"]))
+            store_km._seq = store_km._records = 0
+            checks.append(("journal reload = totals", store_km.load_odometer() == totals))
+        if recovers:
+            checks.append(("recovery → reset", bool(recovered)))
+        detect = (monitor.fail_ms * 1000 - fail_cross) if fail_cross is not None and monitor.failed else 0
+        # Hold-up left after the commit with the load shed (negative: dropped out before)
+        margin = (commit_at["mv"] - DROPOUT_MV) * HOLDUP_UF / rail.load_ma() if done else 0
+        out.write(f"{name:<28} detect {detect / 1000:6.1f} ms  shed {monitor.shed_us:5d} us  "
+                  f"commit {monitor.commit_us / 1000:6.1f} ms  at {commit_at.get('mv', 0) / 1000:5.2f} V  "
+                  f"margin {margin / 1000:7.1f} ms\n")
+    else:
+        checks.append(("no false trigger", not monitor.failed))
+        out.write(f"{name:<28} min {rail.min_mv / 1000:5.2f} V, no trigger\n")
+    ok = True
+    for check, passed in checks:
+        if not passed:
+            out.write(f"    FAIL {check}\n")
+            ok = False
+    return ok
+
+
+class _Telemetry:
+    """What persist.OdometerSaver reads of SharedTelemetryData."""
+
+    def __init__(self, total_pulses, trip_pulses):
+        self.total_pulses = total_pulses
+        self.trip_pulses = trip_pulses
+        self.speed = 0
+
+
+def _reset_journal(path):
+    for f in os.listdir(path):
+        os.remove(os.path.join(path, f))
+    store_km._seq = store_km._records = 0
+    store_km._last = store_km._pending = None
+    store_km._busy = False
+    store_km.resume()
+
+
+def _journal_seqs():
+    with open(store_km.JOURNAL_FILE, "rb") as f:
+        data = f.read()
+    if len(data) % store_km.RECORD_SIZE:
+        return None
+    seqs = []
+    for i in range(0, len(data), store_km.RECORD_SIZE):
+        rec = store_km._unpack(data[i:i + store_km.RECORD_SIZE])
+        if rec is None:
+            return None
+        seqs.append(rec[0])
+    return seqs
+
+
+def preempt_save(point, full, path):
+    """
+    One regular save with the callback fired before its `point`-th bytecode
+    (persist/store_km frames; _crc16 only reads a buffer the busy flag guards).
+    → (fired, reload == final totals, consecutive seqs).
+    """
+    _reset_journal(path)
+    for k in range(store_km.JOURNAL_MAX_RECORDS if full else 1):
+        store_km.save_odometer(100_000 + k, 500 + k)
+    sd = _Telemetry(110_000, 1_500)
+    saver = persist.OdometerSaver(sd)
+    saver.saved_total = 100_000            # Regular save due
+    files = (store_km.save_odometer.__code__.co_filename, persist.OdometerSaver._save.__code__.co_filename)
+    state = {"count": 0, "fired": False, "inside": False}
+
+    def callback():
+        sd.total_pulses += 100             # Pulses counted meanwhile
+        sd.trip_pulses += 100
+        saver.final()
+
+    def opcode(frame, event, arg):
+        if event == "opcode" and not state["inside"] and not state["fired"]:
+            if state["count"] == point:
+                state["fired"] = state["inside"] = True
+                callback()
+                state["inside"] = False
+            state["count"] += 1
+        return opcode
+
+    def call(frame, event, arg):
+        code = frame.f_code
+        if code.co_filename in files and code.co_name != "_crc16":
+            frame.f_trace_opcodes = True
+            return opcode
+        return None
+
+    sys.settrace(call)
+    try:
+        saver._save(persist.DISTANCE)
+    finally:
+        sys.settrace(None)
+    if not state["fired"]:
+        return False, True, True
+    final = (sd.total_pulses, sd.trip_pulses)
+    seqs = _journal_seqs()
+    store_km._seq = store_km._records = 0
+    store_km._last = None
+    loaded = store_km.load_odometer()
+    consecutive = seqs is not None and seqs == list(range(seqs[0], seqs[0] + len(seqs)))
+    return True, loaded == final, consecutive
+
+
+def run_preemption(name, full, path, out=sys.stdout):
+    wrong = []
+    point = 0
+    while True:
+        fired, reload_ok, seqs_ok = preempt_save(point, full, path)
+        if not fired:
+            break
+        if not (reload_ok and seqs_ok):
+            wrong.append((point, reload_ok, seqs_ok))
+        point += 1
+    out.write(f"{name:<28} callback at {point} points, {len(wrong)} wrong\n")
+    for p, reload_ok, seqs_ok in wrong[:5]:
+        out.write(f"    FAIL at bytecode {p}: "
+                  f"{'' if reload_ok else 'reload != final totals '}{'' if seqs_ok else 'seqs not consecutive'}\n")
+    return point > 0 and not wrong
+
+
+def scenarios(t0=100_000):
+    def power_off(t):
+        return SUPPLY_MV if t < t0 else 0
+
+    def sag(t):                            # Weak supply: 13.5 V → 0 at 20 V/s
+        return max(0, SUPPLY_MV - max(0, t - t0) * 20 // 1000)
+
+    def dip(depth_mv, length_us):
+        def f(t):
+            return depth_mv if t0 <= t < t0 + length_us else SUPPLY_MV
+        return f
+
+    def spike(t):                          # One sample's worth of load spike
+        return 8000 if t0 <= t < t0 + 600 else SUPPLY_MV
+
+    return (
+        ("ignition off", power_off, True, 0, False),
+        ("slow sag", sag, True, 0, False),
+        ("off during regular save", power_off, True, 55_000, False),
+        ("off during I2C window", power_off, True, 3_000, False),
+        ("brown-out 8.5 V / 40 ms", dip(8500, 40_000), True, 0, True),
+        ("dip 9.5 V / 40 ms", dip(9500, 40_000), False, 0, False),
+        ("spike 8 V / 0.6 ms", spike, False, 0, False),
+    )
+
+
+def main(argv):
+    timing = FLASH_MAX if "--worst" in argv else FLASH_TYP
+    print(f"Hold-up {HOLDUP_UF} uF, fail < {powerfail.FAIL_MV} mV, dropout {DROPOUT_MV} mV, "
+          f"flash {'max' if timing is FLASH_MAX else 'typ'} (erase {timing['erase'] // 1000} ms), "
+          f"budget {powerfail.COMMIT_BUDGET_US // 1000} ms")
+    ok = True
+    with tempfile.TemporaryDirectory() as path:
+        store_km.JOURNAL_FILE = os.path.join(path, "odo.jnl")
+        store_km.FILE_PRIMARY = os.path.join(path, "odo1.txt")
+        store_km.FILE_BACKUP = os.path.join(path, "odo2.txt")
+        for name, supply, expect_fail, busy_us, recovers in scenarios():
+            _reset_journal(path)
+            ok = run_scenario(name, supply, expect_fail, timing, busy_us, recovers) and ok
+        ok = run_preemption("preempted save: append", False, path) and ok
+        ok = run_preemption("preempted save: rewrite", True, path) and ok
+    print("ok" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
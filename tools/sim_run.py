@@ -0,0 +1,138 @@
+# tools/sim_run.py
+# Run the firmware (main.py) on the host simulator (sim/runner.py)
+# Boots with the simulated board, drives the wheel sensor from a speed profile,
+# optionally replays an RS485 capture on UART0, and prints the board report and
+# what the three panels show at the end (optionally as PBM images).
+#
+# Usage (from repo root):
+#   python tools/sim_run.py                                  # 30 s standing still
+#   python tools/sim_run.py --seconds 60 --profile 0:0,10:100,60:100
+#   python tools/sim_run.py --capture rs485.bin --loop       # raw bytes as captured
+#   python tools/sim_run.py --images out/ --cpu-scale 0      # deterministic, PBM files
+#   python tools/sim_run.py --log                            # firmware output as well
+#   python tools/sim_run.py --alloc-rate 4000                # heap model: 4 KB/s garbage
+#   python tools/sim_run.py --alloc-budget --seconds 40      # allocation budget mode
+#
+# --alloc-budget boots with main.ALLOC_BUDGET (memory.py) on tracemalloc and
+# fails (exit 1) unless every job and task slice stayed within its budget
+# after the warm-up. tracemalloc sees net CPython heap growth, not what was
+# allocated: garbage freed within the run is invisible, and objects that live
+# from one run into another (asyncio handles, boxed ints, the last dirty rect)
+# count for one job and come back in another. --alloc-slack B per run
+# (default 1024) is added to every budget for that; a run that keeps more
+# (a list or string growing, a report built every time) still fails. Exact
+# per-run figures need the board (gc.mem_alloc with automatic GC off).
+
+import os
+import sys
+import tracemalloc
+
+from benchutil import add_repo_to_path, add_sim_to_path
+
+add_repo_to_path(__file__)
+add_sim_to_path(__file__)
+
+import board
+import mpgc
+import runner
+
+
+def _arg(argv, name, default=None):
+    if name in argv:
+        return argv[argv.index(name) + 1]
+    return default
+
+
+def parse_profile(text):
+    """'t:kmh,t:kmh,...' → piecewise-linear profile."""
+    points = []
+    for item in text.split(","):
+        t, v = item.split(":")
+        points.append((float(t), float(v)))
+    return board.ramp(points)
+
+
+class HostBudgets(dict):
+    """main.ALLOC_BUDGETS plus the host slack for every job/task name."""
+
+    def __init__(self, budgets, slack):
+        super().__init__(budgets)
+        self.slack = slack
+
+    def get(self, name, default=0):
+        return super().get(name, default) + self.slack
+
+
+def alloc_budget_setup(slack):
+    def setup(sim):
+        sim.main.ALLOC_BUDGET = True
+        sim.main.ALLOC_BUDGETS = HostBudgets(sim.main.ALLOC_BUDGETS, slack)
+    return setup
+
+
+def main(argv):
+    seconds = float(_arg(argv, "--seconds", 30))
+    profile = parse_profile(_arg(argv, "--profile", "0:0"))
+    cpu_scale = float(_arg(argv, "--cpu-scale", 1.0))
+    uart = None
+    capture = _arg(argv, "--capture")
+    if capture:
+        with open(capture, "rb") as f:
+            uart = board.UartSource(f.read(), loop="--loop" in argv)
+    mpgc.alloc_rate = int(_arg(argv, "--alloc-rate", 0))
+    budget = "--alloc-budget" in argv
+    if budget:
+        mpgc.use_tracemalloc = True
+        tracemalloc.start()
+    slack = int(_arg(argv, "--alloc-slack", 1024))
+    sim = runner.run(seconds, profile=profile, uart=uart, cpu_scale=cpu_scale,
+                     setup=alloc_budget_setup(slack) if budget else None)
+    if budget:
+        tracemalloc.stop()
+
+    for line in sim.report():
+        print(line)
+    if mpgc.alloc_rate:
+        print(f"GC (heap model {mpgc.alloc_rate} B/s): {mpgc.collections} collections, "
+              f"{mpgc.auto_collections} automatic")
+    sd = sim.shared_data
+    if sd is not None:
+        print(f"Speed {sd.speed:.1f} km/h, {sd.total_pulses} pulses "
+              f"({len(sim.pulses.edges)} edges driven), status "
+              f"{sd.internal_telemetry_data['systemStatus']}")
+    images = _arg(argv, "--images")
+    if images:
+        os.makedirs(images, exist_ok=True)
+    for name, panel in sim.panels.items():
+        print(f"\n[{name}] {'on' if panel.display_on else 'off'}")
+        print(panel.to_text())
+        if images:
+            with open(os.path.join(images, f"{name}.pbm"), "w") as f:
+                f.write(panel.to_pbm())
+    if "--log" in argv:
+        print("\n" + sim.output.getvalue())
+    failed = sim.reason != "time" or sim.task_errors
+    if budget:
+        failed = not check_budgets(sim) or failed
+    if failed:
+        sys.exit(1)
+
+
+def check_budgets(sim):
+    """Budget mode outcome: one line per job/task over budget; True if none."""
+    collector = sim.main.collector
+    if collector is None or not collector.steady:
+        print("\nALLOC BUDGET: no steady state (memory init failed or run shorter "
+              "than the warm-up)")
+        return False
+    for b in collector.failing():
+        print(f"ALLOC BUDGET FAIL: {b.name} {b.violations}/{b.runs} runs over {b.budget} B "
+              f"(max {b.max} B, total {b.total} B)")
+    ok = collector.budget_ok()
+    print(f"\nAlloc budget: {len(collector.budgets)} jobs/tasks checked, "
+          f"{'ok' if ok else 'FAILED'}")
+    return ok
+
+
+if __name__ == "__main__":
+    main(sys.argv)